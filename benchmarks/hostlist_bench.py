@@ -0,0 +1,87 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Cost of idr_torch.hostlist on large nodelists: parsing, len, i-th host,
+index of a host, expansion and compression. The optional `hostlist` package
+(python-hostlist) is timed too when it is installed.
+
+    python benchmarks/hostlist_bench.py [--sizes 10000 100000]
+"""
+
+import argparse
+import timeit
+from typing import Callable, Dict
+
+from idr_torch.hostlist import (
+    Hostlist,
+    compress_hostlist,
+    expand_hostlist,
+    parse_hostlist,
+)
+
+
+def nodelists(size: int) -> Dict[str, str]:
+    """
+    A contiguous range, every other node (one range per host) and a
+    multi-dimensional pattern, of about ``size`` hosts each.
+    """
+    width = len(str(size))
+    racks = max(size // 288, 1)
+    return {
+        "contiguous": f"node[{0:0{width}d}-{size - 1:0{width}d}]",
+        "fragmented": "node["
+        + ",".join(f"{i:0{width + 1}d}" for i in range(0, 2 * size, 2))
+        + "]",
+        "multi-dim": f"r[1-{racks}]i[0-7]n[00-35]",
+    }
+
+
+def best(func: Callable[[], object], /, number: int = 1, repeat: int = 3) -> float:
+    """
+    Best time of one call, in seconds.
+    """
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+
+def line(name: str, seconds: float) -> str:
+    if seconds < 1e-3:
+        return f"{name} {seconds * 1e6:8.1f} µs"
+    return f"{name} {seconds * 1e3:8.1f} ms"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    args = parser.parse_args()
+    try:
+        import hostlist as python_hostlist
+    except ImportError:
+        python_hostlist = None
+
+    for size in args.sizes:
+        for kind, compact in nodelists(size).items():
+            hosts = Hostlist(compact)
+            last = hosts[-1]
+            expanded = expand_hostlist(compact)
+            timings = [
+                line("parse", best(lambda: Hostlist(compact))),
+                line("cached", best(lambda: parse_hostlist(compact), number=1000)),
+                line("len", best(lambda: len(hosts), number=1000)),
+                line("[-1]", best(lambda: hosts[-1], number=1000)),
+                line("index", best(lambda: hosts.index(last), number=100)),
+                line("expand", best(lambda: expand_hostlist(compact))),
+                line("compress", best(lambda: compress_hostlist(expanded))),
+            ]
+            if python_hostlist is not None:
+                timings.append(
+                    line(
+                        "python-hostlist expand",
+                        best(lambda: python_hostlist.expand_hostlist(compact)),
+                    )
+                )
+            print(f"{len(hosts):>7} hosts, {kind:<10} | " + " | ".join(timings))
+
+
+if __name__ == "__main__":
+    main()
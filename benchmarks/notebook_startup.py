@@ -0,0 +1,85 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Time to the first cell of idr_torch.notebook: when the controller is ready,
+when all engines are registered and when a first cell has run on every
+engine, in seconds since launch. Engines run on this machine, started by a
+local stand-in for srun. Needs ipyparallel.
+
+    python benchmarks/notebook_startup.py [--engines 4] [--repeat 3]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+from typing import Dict
+
+# Runs its command $SLURM_NTASKS times locally, like srun within an allocation,
+# and forwards termination signals to the tasks.
+LOCAL_SRUN = """#!{python}
+import os, signal, subprocess, sys
+processes = [
+    subprocess.Popen(sys.argv[1:], env=dict(os.environ, SLURM_PROCID=str(rank)))
+    for rank in range(int(os.environ["SLURM_NTASKS"]))
+]
+def forward(signum, frame):
+    for process in processes:
+        process.send_signal(signum)
+signal.signal(signal.SIGTERM, forward)
+signal.signal(signal.SIGINT, forward)
+sys.exit(max(process.wait() for process in processes))
+"""
+
+
+def time_to_first_cell(num_engines: int, timeout: float) -> Dict[str, float]:
+    from idr_torch import notebook
+
+    interface = notebook._parallel_interface
+    environment = {name: os.environ.get(name) for name in ("PATH", "SLURM_NTASKS")}
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            srun = os.path.join(directory, "srun")
+            with open(srun, "w") as file:
+                file.write(LOCAL_SRUN.format(python=sys.executable))
+            os.chmod(srun, 0o755)
+            os.environ["PATH"] = directory + os.pathsep + os.environ.get("PATH", "")
+            os.environ["SLURM_NTASKS"] = str(num_engines)
+            try:
+                notebook.launch(timeout)
+                return dict(interface.startup_times)
+            finally:
+                if interface.launched:
+                    notebook.cleanup()
+    finally:
+        for name, value in environment.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        # Computed from SLURM_NTASKS.
+        for name in ("num_engines", "cluster_id"):
+            interface.__dict__.pop(name, None)
+
+
+def main() -> None:
+    from IPython.core.interactiveshell import InteractiveShell
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--engines", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=300.0)
+    args = parser.parse_args()
+    # The notebook interface runs its cells in an IPython shell.
+    InteractiveShell.instance()
+    for _ in range(args.repeat):
+        times = time_to_first_cell(args.engines, args.timeout)
+        print(
+            f"{args.engines} engines | "
+            + " | ".join(f"{name} {seconds:6.2f} s" for name, seconds in times.items())
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Per-access cost of idr_torch.rank & co., read from the topology snapshot or
+resolved through the launcher API on every access (as before the snapshot).
+
+    python benchmarks/topology_access.py [--reads N]
+"""
+
+import argparse
+import os
+import timeit
+
+# A SLURM step of 2 nodes × 4 tasks, as seen by rank 5.
+SLURM_ENVIRONMENT = {
+    "SLURM_STEP_ID": "0",
+    "SLURM_JOB_ID": "1234",
+    "SLURM_PROCID": "5",
+    "SLURM_LOCALID": "1",
+    "SLURM_NODEID": "1",
+    "SLURM_STEP_NUM_TASKS": "8",
+    "SLURM_STEP_NUM_NODES": "2",
+    "SLURM_STEP_TASKS_PER_NODE": "4(x2)",
+    "SLURM_STEP_NODELIST": "node[01-02]",
+    "SLURM_CPUS_PER_TASK": "4",
+}
+FIELDS = ("rank", "local_rank", "world_size", "local_world_size")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--reads", type=int, default=200_000)
+    args = parser.parse_args()
+    os.environ.update(SLURM_ENVIRONMENT)
+    os.environ.pop("IDR_TORCH_TOPOLOGY", None)
+
+    import idr_torch
+
+    for name in FIELDS:
+        # The property as it was: detects the launcher and calls its method.
+        resolve = idr_torch.make_new_function(name, as_property=False)
+        assert getattr(idr_torch, name) == resolve(idr_torch)
+        snapshot = timeit.timeit(
+            f"idr_torch.{name}", globals=dict(idr_torch=idr_torch), number=args.reads
+        )
+        resolved = (
+            timeit.timeit(lambda: resolve(idr_torch), number=max(args.reads // 100, 1))
+            * 100
+        )
+        print(
+            f"{name:<17} snapshot {snapshot / args.reads * 1e9:8.0f} ns"
+            f"   resolved {resolved / args.reads * 1e9:8.0f} ns"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Time and peak memory of idr_torch.profiler.trace.rewrite_trace on synthetic
+Kineto-like traces, plain and gzipped, against the previous in-memory
+rewrite. Each rewrite runs in its own process to measure its peak RSS.
+
+    python benchmarks/trace_rewrite.py [--sizes 1 5] [--directory /tmp]
+"""
+
+import argparse
+import gzip
+import json
+import os
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from idr_torch.profiler.trace import rewrite_trace
+
+_GB = 1 << 30
+_EVENTS_PER_BATCH = 10_000
+
+
+def events(start: int):
+    """
+    One batch of host and device events, half of them in a rewritten category.
+    """
+    for index in range(start, start + _EVENTS_PER_BATCH, 4):
+        ts = index * 10
+        yield {
+            "ph": "X",
+            "cat": "user_annotation",
+            "name": "forward",
+            "pid": 1,
+            "tid": 1,
+            "ts": ts,
+            "dur": 40,
+            "args": {"External id": index},
+        }
+        yield {
+            "ph": "X",
+            "cat": "cuda_runtime",
+            "name": "cudaLaunchKernel",
+            "pid": 1,
+            "tid": 1,
+            "ts": ts + 1,
+            "dur": 2,
+            "args": {"correlation": index, "External id": index},
+        }
+        yield {
+            "ph": "X",
+            "cat": "kernel",
+            "name": "ampere_sgemm_128x64_tn",
+            "pid": 0,
+            "tid": 7,
+            "ts": ts + 5,
+            "dur": 20,
+            "args": {"correlation": index, "device": 0, "stream": 7},
+        }
+        yield {
+            "ph": "f",
+            "cat": "ac2g",
+            "id": index,
+            "pid": 0,
+            "tid": 7,
+            "ts": ts + 5,
+            "bp": "e",
+        }
+
+
+def generate(path: str, size: int) -> None:
+    """
+    Writes a trace of about ``size`` uncompressed bytes, gzipped if ``path``
+    ends in .gz.
+    """
+    if path.endswith(".gz"):
+        output = gzip.open(path, "wb", compresslevel=1)
+    else:
+        output = open(path, "wb")
+    with output:
+        output.write(b'{"schemaVersion": 1, "traceEvents": [\n')
+        written, start = 0, 0
+        while written < size:
+            batch = ",\n".join(json.dumps(event) for event in events(start))
+            data = (",\n" if start else "") + batch
+            output.write(data.encode())
+            written += len(data)
+            start += _EVENTS_PER_BATCH
+        output.write(b'\n], "traceName": "' + path.encode() + b'"}\n')
+
+
+def in_memory(path: str) -> None:
+    """
+    The rewrite before streaming: the whole trace is read as text, replaced
+    with re.sub and written back.
+    """
+    with open(path, "r+") as file:
+        content = file.read()
+        file.seek(0)
+        file.truncate()
+        content = re.sub("user_annotation", "cpu_op", content)
+        content = re.sub("cuda_runtime", "runtime", content)
+        file.write(content)
+
+
+def peak_rss() -> int:
+    """
+    Peak resident set size of this process, in bytes (Linux).
+    """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def child(method: str, path: str) -> None:
+    baseline = peak_rss()
+    start = time.perf_counter()
+    if method == "in-memory":
+        in_memory(path)
+    else:
+        rewrite_trace(path)
+    seconds = time.perf_counter() - start
+    print(f"{seconds} {peak_rss()} {baseline}")
+
+
+def measure(method: str, path: str) -> str:
+    result = subprocess.run(
+        [sys.executable, __file__, "--child", method, path],
+        check=False,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode:
+        return f"{method:<9} failed ({result.returncode})"
+    seconds, rss, baseline = map(float, result.stdout.split())
+    return (
+        f"{method:<9} {seconds:6.1f} s, {rss / _GB:5.2f} GB peak RSS"
+        f" (+{(rss - baseline) / _GB:.2f} GB over the imports)"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 5])
+    parser.add_argument("--directory", default=None)
+    parser.add_argument(
+        "--skip-in-memory", action="store_true", help="Only time rewrite_trace."
+    )
+    parser.add_argument("--child", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(*args.child)
+        return
+
+    with tempfile.TemporaryDirectory(dir=args.directory) as directory:
+        for size in args.sizes:
+            for suffix in ("json", "json.gz"):
+                path = os.path.join(directory, f"rank0.{size:g}GB.pt.trace.{suffix}")
+                generate(path, int(size * _GB))
+                on_disk = os.path.getsize(path) / _GB
+                methods = ["streaming"]
+                if suffix == "json" and not args.skip_in_memory:
+                    methods.append("in-memory")
+                for method in methods:
+                    print(
+                        f"{size:g} GB {suffix:<7} ({on_disk:5.2f} GB on disk) | "
+                        + measure(method, path)
+                    )
+                os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
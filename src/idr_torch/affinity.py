@@ -0,0 +1,224 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+from glob import glob
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+SYSFS_ROOT = "/sys/devices/system"
+
+Core = Tuple[int, ...]
+
+# CPUs the process was allowed to run on before being pinned by bind.
+_initial_pool: Optional[Set[int]] = None
+
+
+def parse_cpulist(cpulist: str) -> List[int]:
+    """
+    Example: "0-3,8,10-11" -> [0, 1, 2, 3, 8, 10, 11]
+    """
+    cpus: List[int] = []
+    for element in cpulist.strip().split(","):
+        if not element:
+            continue
+        low, _, high = element.partition("-")
+        cpus.extend(range(int(low), int(high or low) + 1))
+    return cpus
+
+
+def format_cpulist(cpus: Iterable[int]) -> str:
+    """
+    Example: [0, 1, 2, 3, 8, 10, 11] -> "0-3,8,10-11"
+    """
+    ranges: List[List[int]] = []
+    for cpu in sorted(cpus):
+        if ranges and ranges[-1][1] + 1 == cpu:
+            ranges[-1][1] = cpu
+        else:
+            ranges.append([cpu, cpu])
+    return ",".join(
+        str(start) if start == stop else f"{start}-{stop}" for start, stop in ranges
+    )
+
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path, "r") as file:
+            return file.read()
+    except OSError:
+        return None
+
+
+def read_numa_nodes(sysfs_root: str = SYSFS_ROOT) -> Dict[int, List[int]]:
+    """
+    Maps each NUMA node to its CPUs, as described in /sys/devices/system/node.
+    """
+    numa_nodes: Dict[int, List[int]] = {}
+    for path in glob(os.path.join(sysfs_root, "node", "node[0-9]*")):
+        cpulist = _read(os.path.join(path, "cpulist"))
+        if cpulist is not None:
+            numa_nodes[int(os.path.basename(path)[4:])] = parse_cpulist(cpulist)
+    return dict(sorted(numa_nodes.items()))
+
+
+def read_cores(cpus: Iterable[int], sysfs_root: str = SYSFS_ROOT) -> List[Core]:
+    """
+    Groups ``cpus`` by physical core (hyperthreads are siblings), as described
+    in /sys/devices/system/cpu.
+    """
+    cpus = set(cpus)
+    cores: Set[Core] = set()
+    for cpu in cpus:
+        siblings = _read(
+            os.path.join(
+                sysfs_root, "cpu", f"cpu{cpu}", "topology", "thread_siblings_list"
+            )
+        )
+        if siblings is None:
+            cores.add((cpu,))
+        else:
+            cores.add(tuple(sorted(cpus.intersection(parse_cpulist(siblings)))))
+    return sorted(cores)
+
+
+def _split_evenly(items: Sequence, parts: int) -> List[Sequence]:
+    """
+    Splits ``items`` into ``parts`` contiguous chunks. If there are fewer items
+    than parts, items are shared.
+    """
+    if len(items) < parts:
+        return [items[i % len(items) : i % len(items) + 1] for i in range(parts)]
+    quotient, remainder = divmod(len(items), parts)
+    chunks: List[Sequence] = []
+    start = 0
+    for i in range(parts):
+        stop = start + quotient + (i < remainder)
+        chunks.append(items[start:stop])
+        start = stop
+    return chunks
+
+
+def _ranks_per_group(num_ranks: int, sizes: List[int]) -> List[int]:
+    """
+    Distributes ``num_ranks`` (at least one per group) proportionally to sizes.
+    """
+    total = sum(sizes)
+    shares = [num_ranks * size / total for size in sizes]
+    counts = [max(1, int(share)) for share in shares]
+    while sum(counts) > num_ranks:
+        i = max(
+            (i for i in range(len(counts)) if counts[i] > 1),
+            key=lambda i: counts[i] - shares[i],
+        )
+        counts[i] -= 1
+    while sum(counts) < num_ranks:
+        i = max(range(len(counts)), key=lambda i: shares[i] - counts[i])
+        counts[i] += 1
+    return counts
+
+
+class Affinity(object):
+    """
+    CPUs assigned to each local rank, and the NUMA nodes they belong to.
+    """
+
+    __slots__ = ("cpus", "numa_nodes", "num_threads", "local_rank")
+
+    def __init__(
+        self,
+        cpus: List[List[int]],
+        numa_nodes: List[List[int]],
+        num_threads: List[int],
+        local_rank: int,
+    ):
+        self.cpus = cpus
+        self.numa_nodes = numa_nodes
+        self.num_threads = num_threads
+        self.local_rank = local_rank
+
+    def __str__(self) -> str:
+        lines = ["local_rank | numa | threads | cpus"]
+        for local_rank, cpus in enumerate(self.cpus):
+            marker = "*" if local_rank == self.local_rank else " "
+            numa = ",".join(str(node) for node in self.numa_nodes[local_rank])
+            lines.append(
+                f"{marker}{local_rank:>9} | {numa:>4} | "
+                f"{self.num_threads[local_rank]:>7} | {format_cpulist(cpus)}"
+            )
+        return "\n".join(lines)
+
+
+def compute_affinity(
+    local_rank: int,
+    local_world_size: int,
+    /,
+    pool: Optional[Iterable[int]] = None,
+    sysfs_root: str = SYSFS_ROOT,
+) -> Affinity:
+    """
+    Splits ``pool`` (by default the CPUs this process could run on before
+    any call to bind) into disjoint sets of whole cores, one per local rank.
+    When there are at least as many local ranks as NUMA nodes, each set stays
+    within a NUMA node.
+    """
+    global _initial_pool
+    if pool is None:
+        if _initial_pool is None:
+            _initial_pool = os.sched_getaffinity(0)
+        pool = _initial_pool
+    pool = set(pool)
+    numa_nodes = read_numa_nodes(sysfs_root)
+    numa_of_cpu = {cpu: node for node, cpus in numa_nodes.items() for cpu in cpus}
+
+    cores_per_numa: Dict[int, List[Core]] = {}
+    for core in read_cores(pool, sysfs_root):
+        cores_per_numa.setdefault(numa_of_cpu.get(core[0], 0), []).append(core)
+    cores_per_numa = dict(sorted(cores_per_numa.items()))
+
+    chunks: List[Sequence[Core]] = []
+    if local_world_size >= len(cores_per_numa):
+        groups = list(cores_per_numa.values())
+        counts = _ranks_per_group(local_world_size, [len(cores) for cores in groups])
+        for cores, count in zip(groups, counts):
+            chunks.extend(_split_evenly(cores, count))
+    else:
+        all_cores = [core for cores in cores_per_numa.values() for core in cores]
+        chunks = _split_evenly(all_cores, local_world_size)
+
+    cpus = [sorted(cpu for core in chunk for cpu in core) for chunk in chunks]
+    return Affinity(
+        cpus=cpus,
+        numa_nodes=[
+            sorted({numa_of_cpu.get(cpu, 0) for cpu in rank_cpus}) for rank_cpus in cpus
+        ],
+        num_threads=[len(chunk) for chunk in chunks],
+        local_rank=local_rank,
+    )
+
+
+def bind(
+    local_rank: int,
+    local_world_size: int,
+    /,
+    pool: Optional[Iterable[int]] = None,
+    set_num_threads: bool = True,
+    sysfs_root: str = SYSFS_ROOT,
+) -> Affinity:
+    """
+    Pins the current process on its share of the CPUs (see compute_affinity)
+    and sets OMP_NUM_THREADS and torch's number of threads accordingly.
+    """
+    affinity = compute_affinity(
+        local_rank, local_world_size, pool=pool, sysfs_root=sysfs_root
+    )
+    os.sched_setaffinity(0, affinity.cpus[local_rank])
+    if set_num_threads:
+        num_threads = affinity.num_threads[local_rank]
+        os.environ["OMP_NUM_THREADS"] = str(num_threads)
+        try:
+            import torch
+        except ImportError:
+            pass
+        else:
+            torch.set_num_threads(num_threads)
+    return affinity
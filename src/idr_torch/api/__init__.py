@@ -1,15 +1,55 @@
-from .base import API
-from .default import DefaultAPI
-from .modifiers import AutoMasterAddressPort, UndistributedWarning, decorate_methods
-from .slurm import SlurmAPI
-from .torchelastic import TorchElasticAPI
+from importlib import import_module
+from typing import TYPE_CHECKING, Any, Dict, List
+
+if TYPE_CHECKING:
+    from .base import API
+    from .default import DefaultAPI
+    from .local import LocalSpawnAPI
+    from .modifiers import AutoMasterAddressPort, UndistributedWarning, decorate_methods
+    from .slurm import SlurmAPI
+    from .torchelastic import TorchElasticAPI
 
 __all__ = [
     "API",
     "SlurmAPI",
     "DefaultAPI",
     "TorchElasticAPI",
+    "LocalSpawnAPI",
     "AutoMasterAddressPort",
     "UndistributedWarning",
     "decorate_methods",
 ]
+
+# Submodules are only imported when one of their objects is requested.
+_lazy_imports: Dict[str, str] = {
+    "API": ".base",
+    "SlurmAPI": ".slurm",
+    "DefaultAPI": ".default",
+    "TorchElasticAPI": ".torchelastic",
+    "LocalSpawnAPI": ".local",
+    "AutoMasterAddressPort": ".modifiers",
+    "UndistributedWarning": ".modifiers",
+    "decorate_methods": ".modifiers",
+}
+
+# Shipped launchers, crawled by the Interface the first time it needs them.
+shipped_APIs: List[str] = [
+    "LocalSpawnAPI",
+    "SlurmAPI",
+    "TorchElasticAPI",
+    "DefaultAPI",
+]
+
+
+def __getattr__(name: str) -> Any:
+    if name == "modifiers":
+        return import_module(".modifiers", __name__)
+    if name in _lazy_imports:
+        value = getattr(import_module(_lazy_imports[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(__all__))
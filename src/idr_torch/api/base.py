@@ -1,16 +1,24 @@
 #! /usr/bin/env python
 # -*- coding: utf-8 -*-
 
-import socket
 import warnings
 from abc import ABC, abstractmethod
-from typing import TYPE_CHECKING, List, Union
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Union
 
 from ..utils import IdrTorchWarning
 
 if TYPE_CHECKING:
+    from concurrent.futures import Future
+
     import torch
 
+    from ..affinity import Affinity
+    from ..groups import ProcessGroups
+    from ..heartbeat import Watchdog
+    from ..steptimer import StepTimer
+    from ..taskmap import TaskMap
+    from ..timing import InitTimer, NullTimer
+
 
 def keep_as_func(func: callable) -> callable:
     setattr(func, "__keep_as_func__", True)
@@ -98,6 +106,26 @@ class API(ABC):
         """
         raise NotImplementedError()
 
+    def port_if_ready(self) -> Optional[int]:
+        """
+        The port if it can be resolved without waiting, None otherwise.
+        """
+        return self.port()
+
+    def node_rank(self) -> int:
+        """
+        Property containing the index of the node hosting the process.
+        """
+        return self.task_map().node_of(self.rank())
+
+    def task_map(self) -> "TaskMap":
+        """
+        Property containing the placement of every rank on the nodes.
+        """
+        from ..taskmap import TaskMap
+
+        return TaskMap.uniform(self.num_nodes(), self.local_world_size())
+
     def is_master(self) -> bool:
         """
         Detects whether the process is the master (i.e. the rank 0).
@@ -114,16 +142,74 @@ class API(ABC):
 
     @keep_as_func
     def init_process_group(
-        self, *args, force_init: bool = False, **kwargs
+        self,
+        *args,
+        force_init: bool = False,
+        timings: Optional[str] = None,
+        **kwargs,
     ) -> "torch.device":
         r"""
         See https://pytorch.org/docs/stable/distributed.html#torch.distributed.init_process_group
         for more infomation. Also returns the device.
+        If `timings` (or the IDR_TORCH_INIT_TIMINGS environment variable) is a
+        path, each phase of the initialization is timed on every rank. Rank 0
+        writes all timings there (CSV if it ends with .csv, JSON otherwise)
+        and prints a summary. The launcher detection is only timed with
+        IDR_TORCH_INIT_TIMINGS.
+        """
+        timer, _kwargs = self._prepare_init_process_group(force_init, timings, kwargs)
+        if _kwargs is not None:
+            self._init_process_group(timer, *args, **_kwargs)
+        return self.device()
+
+    @keep_as_func
+    def init_process_group_async(
+        self,
+        *args,
+        force_init: bool = False,
+        timings: Optional[str] = None,
+        **kwargs,
+    ) -> "Future[torch.device]":
+        r"""
+        Same as init_process_group, but the rendezvous runs in a background
+        thread so that the model or the data can be prepared meanwhile. Returns
+        a future resolving to the device. The environment is resolved and the
+        warnings are raised before returning.
+        """
+        from concurrent.futures import Future
+        from threading import Thread
+
+        future: Future = Future()
+        timer, _kwargs = self._prepare_init_process_group(force_init, timings, kwargs)
+        if _kwargs is None:
+            future.set_result(self.device())
+            return future
+
+        def run() -> None:
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                self._init_process_group(timer, *args, **_kwargs)
+                future.set_result(self.device())
+            except BaseException as error:
+                future.set_exception(error)
+
+        Thread(target=run, name="idr_torch_init_process_group", daemon=True).start()
+        return future
+
+    def _prepare_init_process_group(
+        self, force_init: bool, timings: Optional[str], kwargs: Dict[str, Any]
+    ) -> Tuple[Union["InitTimer", "NullTimer"], Optional[Dict[str, Any]]]:
+        """
+        Handles an already initialized environment and resolves the arguments.
+        Returns None as arguments if there is nothing to initialize.
         """
         import torch.distributed as dist
 
-        _kwargs = dict(rank=self.rank(), world_size=self.world_size())
-        _kwargs.update(**kwargs)
+        from ..timing import InitTimer, NullTimer, timings_path
+
+        path = timings_path(timings)
+        timer = InitTimer(path) if path else NullTimer()
 
         if dist.is_initialized():
             if force_init:
@@ -134,19 +220,143 @@ class API(ABC):
                         "to destroy the process group before recreating it."
                     ),
                     category=IdrTorchWarning,
-                    stacklevel=4,
+                    stacklevel=5,
                 )
                 dist.destroy_process_group()
-                dist.init_process_group(*args, **_kwargs)
             else:
                 warnings.warn(
                     message="A distributed environment had already been initialized. Moving on.",
                     category=IdrTorchWarning,
-                    stacklevel=4,
+                    stacklevel=5,
                 )
-        else:
-            dist.init_process_group(*args, **_kwargs)
-        return self.device()
+                return timer, None
+
+        with timer.phase("env_resolution"):
+            _kwargs = dict(rank=self.rank(), world_size=self.world_size())
+            # Exports MASTER_ADDR and MASTER_PORT for the env:// init method.
+            # Selecting the port may wait for the master.
+            self.master_address()
+            self.port()
+        _kwargs.update(**kwargs)
+        return timer, _kwargs
+
+    def _init_process_group(
+        self, timer: Union["InitTimer", "NullTimer"], *args, **kwargs
+    ) -> None:
+        import torch.distributed as dist
+
+        if (
+            timer.enabled
+            and len(args) < 2
+            and "init_method" not in kwargs
+            and "store" not in kwargs
+        ):
+            # Connect to the store separately to time it on its own.
+            store_kwargs = {"timeout": kwargs["timeout"]} if "timeout" in kwargs else {}
+            with timer.phase("store_connection"):
+                kwargs["store"] = dist.TCPStore(
+                    self.master_address(),
+                    self.port(),
+                    kwargs["world_size"],
+                    kwargs["rank"] == 0,
+                    **store_kwargs,
+                )
+        with timer.phase("backend_init"):
+            dist.init_process_group(*args, **kwargs)
+        if timer.enabled:
+            if dist.get_backend() == "nccl":
+                import torch
+
+                # Otherwise the collectives below all run on cuda:0.
+                torch.cuda.set_device(self.device())
+            with timer.phase("first_barrier"):
+                dist.barrier()
+            timer.gather_and_report(
+                kwargs["rank"], kwargs["world_size"], self.hostname()
+            )
+
+    @keep_as_func
+    def process_groups(
+        self, *, backend: Optional[str] = None, **kwargs
+    ) -> "ProcessGroups":
+        """
+        Creates (once) the intra-node, inter-node and node leaders sub-groups
+        from the node reported by every rank. Must be called by every rank after
+        init_process_group. Extra keyword arguments are given to
+        `torch.distributed.new_group`.
+        """
+        from ..groups import make_process_groups
+
+        return make_process_groups(
+            self.task_map(),
+            self.rank(),
+            backend=backend,
+            node_rank=self.node_rank(),
+            **kwargs,
+        )
+
+    @keep_as_func
+    def bind(self, **kwargs) -> "Affinity":
+        """
+        Pins the process on a disjoint, NUMA-local set of cores shared between
+        the local ranks and sets the number of threads to match. Returns the
+        resulting affinity map. See `idr_torch.affinity.bind` for the options.
+        """
+        from ..affinity import bind
+
+        return bind(self.local_rank(), self.local_world_size(), **kwargs)
+
+    @keep_as_func
+    def dataloader_kwargs(self, **kwargs) -> Dict[str, Any]:
+        """
+        Keyword arguments for `torch.utils.data.DataLoader` (num_workers,
+        prefetch_factor, pin_memory, persistent_workers, worker_init_fn)
+        computed from the CPUs and the device of the process. See
+        `idr_torch.dataloader.dataloader_kwargs` for the options.
+        """
+        from ..dataloader import dataloader_kwargs
+
+        return dataloader_kwargs(
+            self.cpus(), self.local_rank(), self.device(), **kwargs
+        )
+
+    @keep_as_func
+    def step_timer(self, **kwargs) -> "StepTimer":
+        """
+        Times the steps of the training loop and compares the ranks every few
+        steps on the master. See `idr_torch.steptimer.StepTimer` for the
+        options.
+        """
+        from ..steptimer import StepTimer
+
+        return StepTimer(
+            rank=self.rank(),
+            world_size=self.world_size(),
+            task_map=self.task_map(),
+            **kwargs,
+        )
+
+    @keep_as_func
+    def watchdog(self, **kwargs) -> "Watchdog":
+        """
+        Starts a daemon thread reporting, on the master, the ranks which stop
+        making progress (call `step()` on the returned watchdog at every
+        step). Goes through the rendezvous store, so it must be started after
+        init_process_group. See `idr_torch.heartbeat.Watchdog` for the
+        options.
+        """
+        from ..heartbeat import Watchdog, connect_store
+
+        store = connect_store(self.master_address(), self.port())
+        return Watchdog(
+            store,
+            self.rank(),
+            self.world_size(),
+            task_map=self.task_map(),
+            **kwargs,
+        ).start()
 
     def hostname(self) -> str:
+        import socket
+
         return socket.gethostname()
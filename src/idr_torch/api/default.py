@@ -6,6 +6,7 @@ import socket
 from contextlib import closing
 from typing import List, Optional
 
+from ..taskmap import TaskMap
 from .base import API
 from .modifiers import AutoMasterAddressPort, UndistributedWarning
 
@@ -45,6 +46,12 @@ class DefaultAPI(API):
     def num_nodes(self) -> int:
         return 1
 
+    def node_rank(self) -> int:
+        return 0
+
+    def task_map(self) -> TaskMap:
+        return TaskMap.uniform(1, 1, hosts=["localhost"])
+
     def cpus(self) -> int:
         return len(os.sched_getaffinity(0))
 
@@ -0,0 +1,60 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+from typing import List
+
+from ..taskmap import TaskMap
+from .base import API
+
+
+class LocalSpawnAPI(API):
+    """
+    Ranks started on a single machine by ``python -m idr_torch.run``.
+    """
+
+    # Above SlurmAPI: ranks spawned inside an allocation still see SLURM_*.
+    priority: int = 20000
+    name: str = "LocalSpawn"
+
+    def is_launcher(self) -> bool:
+        return "IDR_TORCH_RUN_ID" in os.environ
+
+    def rank(self) -> int:
+        return int(os.environ["RANK"])
+
+    def local_rank(self) -> int:
+        return int(os.environ["LOCAL_RANK"])
+
+    def world_size(self) -> int:
+        return int(os.environ["WORLD_SIZE"])
+
+    def local_world_size(self) -> int:
+        return int(os.environ["LOCAL_WORLD_SIZE"])
+
+    def num_nodes(self) -> int:
+        return 1
+
+    def node_rank(self) -> int:
+        return 0
+
+    def task_map(self) -> TaskMap:
+        return TaskMap.uniform(1, self.world_size(), hosts=self.nodelist())
+
+    def cpus(self) -> int:
+        return len(os.sched_getaffinity(0)) // self.local_world_size()
+
+    def gpus(self) -> List[str]:
+        visible = os.environ.get("CUDA_VISIBLE_DEVICES", None)
+        if visible is not None:
+            return [gpu for gpu in visible.split(",") if gpu]
+        return [str(i) for i in range(self.local_world_size())]
+
+    def nodelist(self) -> List[str]:
+        return [self.master_address()]
+
+    def master_address(self) -> str:
+        return os.environ["MASTER_ADDR"]
+
+    def port(self) -> int:
+        return int(os.environ["MASTER_PORT"])
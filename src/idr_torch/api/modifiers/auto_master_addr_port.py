@@ -2,6 +2,8 @@
 # -*- coding: utf-8 -*-
 
 import os
+import threading
+from contextlib import suppress
 from functools import wraps
 from typing import Type
 
@@ -9,24 +11,54 @@ from .. import API
 from .decorate_methods import decorate_methods
 
 env_variables_set: bool = False
+# Other threads wait until the variables are actually set (e.g. while
+# init_process_group_async runs in the background). Reentrant because setting
+# the variables calls decorated methods.
+_lock = threading.RLock()
+_setting_in_progress: bool = False
 
 
 def set_master_addr_port_env_variables(func):
     @wraps(func)
     def wrapper(self, *args, **kwargs):
-        global env_variables_set
+        global env_variables_set, _setting_in_progress
         if not env_variables_set:
-            env_variables_set = True  # must be done before actually setting the variable to prevent stackoverflow
-            os.environ["MASTER_ADDR"] = self.master_address()
-            os.environ["MASTER_PORT"] = str(self.port())
-            os.environ["RANK"] = str(self.rank())
-            os.environ["LOCAL_RANK"] = str(self.local_rank())
-            os.environ["WORLD_SIZE"] = str(self.world_size())
-            os.environ["LOCAL_WORLD_SIZE"] = str(self.local_world_size())
+            with _lock:
+                # Checking _setting_in_progress prevents stackoverflow
+                if not env_variables_set and not _setting_in_progress:
+                    _setting_in_progress = True
+                    try:
+                        os.environ["MASTER_ADDR"] = self.master_address()
+                        os.environ["RANK"] = str(self.rank())
+                        os.environ["LOCAL_RANK"] = str(self.local_rank())
+                        os.environ["WORLD_SIZE"] = str(self.world_size())
+                        os.environ["LOCAL_WORLD_SIZE"] = str(self.local_world_size())
+                        # Exported by port() itself, unless it has to wait. An
+                        # error is raised again when the port is really read.
+                        with suppress(Exception):
+                            self.port_if_ready()
+                    finally:
+                        _setting_in_progress = False
+                        env_variables_set = True
         return func(self, *args, **kwargs)
 
     return wrapper
 
 
+def export_master_port(func):
+    @wraps(func)
+    def wrapper(self, *args, **kwargs):
+        port = func(self, *args, **kwargs)
+        os.environ["MASTER_PORT"] = str(port)
+        return port
+
+    return wrapper
+
+
 def AutoMasterAddressPort(cls: Type[API]) -> Type[API]:
-    return decorate_methods(cls, func_to_apply=set_master_addr_port_env_variables)
+    cls = decorate_methods(cls, func_to_apply=set_master_addr_port_env_variables)
+    # Selecting the port may wait for the master (see SlurmAPI.port): the
+    # ranks which would wait only export it once it is needed, e.g. by
+    # init_process_group or idr_torch.master_port.
+    cls.port = export_master_port(cls.port)
+    return cls
@@ -2,8 +2,12 @@
 # -*- coding: utf-8 -*-
 
 import os
-from typing import List, Union
+from typing import List, Optional
 
+from .. import ports
+from ..affinity import Affinity, bind
+from ..hostlist import Hostlist, expand_hostlist, parse_hostlist
+from ..taskmap import TaskMap, parse_distribution, parse_tasks_per_node
 from .base import API
 from .modifiers import AutoMasterAddressPort
 
@@ -13,6 +17,9 @@ class SlurmAPI(API):
     priority: int = 10000
     name: str = "Slurm"
 
+    def __init__(self):
+        self.current_port: Optional[int] = None
+
     def is_launcher(self) -> bool:
         return "SLURM_STEP_ID" in os.environ
 
@@ -26,31 +33,51 @@ class SlurmAPI(API):
         return int(os.environ["SLURM_STEP_NUM_TASKS"])
 
     def local_world_size(self) -> int:
-        lws = os.environ["SLURM_STEP_TASKS_PER_NODE"]
-        lws = lws.split("(")[0]
-        return int(lws)
+        # Without building the task map, which grows with the job.
+        tasks_per_node = parse_tasks_per_node(os.environ["SLURM_STEP_TASKS_PER_NODE"])
+        return tasks_per_node[self.node_rank()]
+
+    def node_rank(self) -> int:
+        return int(os.environ["SLURM_NODEID"])
 
     def num_nodes(self) -> int:
         return int(os.environ["SLURM_STEP_NUM_NODES"])
 
+    def task_map(self) -> TaskMap:
+        return TaskMap.from_slurm(
+            os.environ["SLURM_STEP_TASKS_PER_NODE"],
+            os.environ["SLURM_STEP_NODELIST"],
+            parse_distribution(
+                os.environ.get("SLURM_DISTRIBUTION", None),
+                os.environ.get("SLURM_DIST_PLANESIZE", None),
+            ),
+        )
+
     def cpus(self) -> int:
         cpu = int(os.environ.get("SLURM_CPUS_PER_TASK", 0))
         return cpu or len(os.sched_getaffinity(0))
 
+    def bind(self, **kwargs) -> Affinity:
+        bind_type = os.environ.get("SLURM_CPU_BIND_TYPE", "none")
+        if bind_type and not bind_type.startswith("none"):
+            # srun already gave each task its own CPUs, only set the threads.
+            return bind(0, 1, **kwargs)
+        return bind(self.local_rank(), self.local_world_size(), **kwargs)
+
     def gpus(self) -> List[str]:
         step_gpus = os.environ.get("SLURM_STEP_GPUS", None)
         if step_gpus is not None:
             return step_gpus.split(",")
         return []
 
-    def nodelist(self) -> Union[List[str], str]:
-        compact_nodelist = os.environ["SLURM_STEP_NODELIST"]
-        try:
-            from hostlist import expand_hostlist
-        except ImportError:
-            return compact_nodelist
-        else:
-            return expand_hostlist(compact_nodelist)
+    def hostlist(self) -> Hostlist:
+        """
+        Lazy view over SLURM's nodelist, hosts are not expanded.
+        """
+        return parse_hostlist(os.environ["SLURM_STEP_NODELIST"])
+
+    def nodelist(self) -> List[str]:
+        return expand_hostlist(os.environ["SLURM_STEP_NODELIST"])
 
     @staticmethod
     def get_first_host(hostlist: str) -> str:
@@ -62,23 +89,42 @@ class SlurmAPI(API):
         Returns:
             (str): the first node to host the master process
         """
-        from re import findall, split, sub
-
-        regex = "\[([^[\]]*)\]"
-        all_replacement: list[str] = findall(regex, hostlist)
-        new_values = [split("-|,", element)[0] for element in all_replacement]
-        for i in range(len(new_values)):
-            hostlist = sub(regex, new_values[i], hostlist, count=1)
-        return hostlist.split(",")[0]
+        return parse_hostlist(hostlist)[0]
 
     def master_address(self) -> str:
-        nodelist = self.nodelist()
-        if isinstance(nodelist, list):
-            return nodelist[0]
-        return self.get_first_host(nodelist)
+        return self.hostlist()[0]
 
     def jobid(self) -> int:
         return int(os.environ["SLURM_JOB_ID"])
 
+    def port_key(self) -> str:
+        """
+        Identifies the job step: concurrent steps, array tasks and requeued
+        jobs all get a different key, hence different candidate ports.
+        """
+        return "-".join(
+            [
+                str(self.jobid()),
+                os.environ.get("SLURM_ARRAY_JOB_ID", "x"),
+                os.environ.get("SLURM_ARRAY_TASK_ID", "x"),
+                os.environ.get("SLURM_STEP_ID", "x"),
+                os.environ.get("SLURM_RESTART_COUNT", "0"),
+            ]
+        )
+
+    def port_if_ready(self) -> Optional[int]:
+        # Only the ranks other than the master wait, until it publishes.
+        if self.current_port is None and self.rank() != 0:
+            key = self.port_key()
+            if ports.inherited_port(key) is None:
+                if ports.read_published_port(key) is None:
+                    return None
+        return self.port()
+
     def port(self) -> int:
-        return 10000 + self.jobid() % 20000
+        if self.current_port is None:
+            key = self.port_key()
+            self.current_port = ports.select_port(
+                key, ports.candidate_ports(key), is_master=self.rank() == 0
+            )
+        return self.current_port
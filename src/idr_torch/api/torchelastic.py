@@ -31,6 +31,12 @@ class TorchElasticAPI(API):
     def num_nodes(self) -> int:
         return self.world_size() // self.local_world_size()
 
+    def node_rank(self) -> int:
+        group_rank = os.environ.get("GROUP_RANK", None)
+        if group_rank is not None:
+            return int(group_rank)
+        return self.rank() // self.local_world_size()
+
     def cpus(self) -> int:
         return len(os.sched_getaffinity(0)) // self.local_world_size()
 
@@ -0,0 +1,343 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Collective communications benchmark.
+
+Under a launcher (srun, torchrun...):
+    srun python -m idr_torch.bench --backend nccl --json results.json
+On a single machine, with locally spawned ranks:
+    python -m idr_torch.bench --spawn 4 --backend gloo
+"""
+
+import argparse
+import json
+import time
+from statistics import median
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    import torch
+    import torch.distributed as dist
+
+    from .taskmap import TaskMap
+
+OPERATIONS = ["all_reduce", "all_gather", "reduce_scatter", "broadcast", "all_to_all"]
+GROUPS = ["world", "intra_node", "inter_node"]
+
+# Bus bandwidth factors, following nccl-tests' conventions.
+BUS_FACTORS: Dict[str, Callable[[int], float]] = {
+    "all_reduce": lambda n: 2 * (n - 1) / n,
+    "all_gather": lambda n: (n - 1) / n,
+    "reduce_scatter": lambda n: (n - 1) / n,
+    "broadcast": lambda n: 1.0,
+    "all_to_all": lambda n: (n - 1) / n,
+}
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m idr_torch.bench",
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        "--backend", default=None, help="nccl if CUDA is available, gloo otherwise."
+    )
+    parser.add_argument("--ops", nargs="+", default=OPERATIONS, choices=OPERATIONS)
+    parser.add_argument("--dtypes", nargs="+", default=["float32"])
+    parser.add_argument("--min-bytes", type=int, default=1 << 10)
+    parser.add_argument("--max-bytes", type=int, default=1 << 26)
+    parser.add_argument("--groups", nargs="+", default=GROUPS, choices=GROUPS)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--iters", type=int, default=20)
+    parser.add_argument("--num-slowest", type=int, default=3)
+    parser.add_argument("--json", default=None, help="Writes the results there.")
+    parser.add_argument(
+        "--spawn",
+        type=int,
+        default=0,
+        help="Spawns this many local ranks instead of relying on a launcher.",
+    )
+    return parser.parse_args(argv)
+
+
+def message_sizes(min_bytes: int, max_bytes: int) -> List[int]:
+    sizes: List[int] = []
+    size = min_bytes
+    while size <= max_bytes:
+        sizes.append(size)
+        size *= 2
+    return sizes
+
+
+def make_operation(
+    name: str,
+    num_bytes: int,
+    dtype: "torch.dtype",
+    device: "torch.device",
+    group: Optional["dist.ProcessGroup"],
+    ranks: List[int],
+) -> Callable[[], Any]:
+    """
+    Allocates the buffers of a collective. ``num_bytes`` is the size of the
+    largest buffer, as in nccl-tests.
+    """
+    import torch
+    import torch.distributed as dist
+
+    size = len(ranks)
+    numel = max(num_bytes // torch.tensor([], dtype=dtype).element_size(), size)
+    numel -= numel % size
+    full = torch.ones(numel, dtype=dtype, device=device)
+    chunk = torch.ones(numel // size, dtype=dtype, device=device)
+
+    if name == "all_reduce":
+        return lambda: dist.all_reduce(full, group=group)
+    if name == "all_gather":
+        if hasattr(dist, "all_gather_into_tensor"):
+            return lambda: dist.all_gather_into_tensor(full, chunk, group=group)
+        return lambda: dist.all_gather(list(full.chunk(size)), chunk, group=group)
+    if name == "reduce_scatter":
+        if hasattr(dist, "reduce_scatter_tensor"):
+            return lambda: dist.reduce_scatter_tensor(chunk, full, group=group)
+        return lambda: dist.reduce_scatter(chunk, list(full.chunk(size)), group=group)
+    if name == "broadcast":
+        return lambda: dist.broadcast(full, src=ranks[0], group=group)
+    if name == "all_to_all":
+        output = torch.empty_like(full)
+        return lambda: dist.all_to_all_single(output, full, group=group)
+    raise ValueError(f"Unknown operation {name}.")
+
+
+def time_operation(
+    operation: Callable[[], Any], device: "torch.device", warmup: int, iters: int
+) -> List[float]:
+    import torch
+
+    synchronize = torch.cuda.synchronize if device.type == "cuda" else lambda: None
+    for _ in range(warmup):
+        operation()
+    synchronize()
+    durations: List[float] = []
+    for _ in range(iters):
+        start = time.perf_counter()
+        operation()
+        synchronize()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def benchmark_groups(
+    task_map: "TaskMap", rank: int, names: List[str]
+) -> List[Tuple[str, Optional["dist.ProcessGroup"], List[int]]]:
+    """
+    Groups to benchmark, as (name, group, ranks of my group). Kinds of groups
+    which only contain single ranks are skipped. All the groups of a kind are
+    benchmarked at the same time.
+    """
+    from .groups import enumerate_groups, make_process_groups
+
+    all_groups = enumerate_groups(task_map)
+    all_groups["world"] = [list(range(task_map.world_size))]
+    names = [name for name in names if max(map(len, all_groups[name])) > 1]
+
+    groups: List[Tuple[str, Optional["dist.ProcessGroup"], List[int]]] = []
+    subgroups = None
+    if any(name != "world" for name in names):
+        subgroups = make_process_groups(task_map, rank)
+    for name in names:
+        if name == "world":
+            groups.append((name, None, all_groups["world"][0]))
+        else:
+            groups.append(
+                (name, getattr(subgroups, name), getattr(subgroups, f"{name}_ranks"))
+            )
+    return groups
+
+
+def run(
+    args: argparse.Namespace,
+    rank: int,
+    task_map: "TaskMap",
+    device: "torch.device",
+    hostname: str,
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Runs every benchmark. Returns the results on rank 0, None elsewhere.
+    """
+    import torch
+    import torch.distributed as dist
+
+    world_size = task_map.world_size
+    results: List[Dict[str, Any]] = []
+    for group_name, group, ranks in benchmark_groups(task_map, rank, args.groups):
+        for dtype_name in args.dtypes:
+            dtype = getattr(torch, dtype_name)
+            for name in args.ops:
+                for num_bytes in message_sizes(args.min_bytes, args.max_bytes):
+                    try:
+                        operation = make_operation(
+                            name, num_bytes, dtype, device, group, ranks
+                        )
+                        durations = time_operation(
+                            operation, device, args.warmup, args.iters
+                        )
+                        error = None
+                    except RuntimeError as exception:
+                        # e.g. reduce_scatter or bfloat16 with gloo
+                        durations, error = [], str(exception).splitlines()[0]
+
+                    # Every rank shares its median to find the slowest ones.
+                    local = torch.tensor(
+                        [median(durations) if durations else float("nan")],
+                        dtype=torch.float64,
+                        device=device,
+                    )
+                    gathered = [torch.empty_like(local) for _ in range(world_size)]
+                    dist.all_gather(gathered, local)
+                    if rank != 0:
+                        continue
+                    description = dict(
+                        op=name, group=group_name, dtype=dtype_name, bytes=num_bytes
+                    )
+                    if error is not None:
+                        results.append(dict(description, error=error))
+                        continue
+                    p50 = percentile(durations, 0.5)
+                    algbw = num_bytes / p50 / 1e9
+                    medians = sorted(
+                        ((value.item(), r) for r, value in enumerate(gathered)),
+                        reverse=True,
+                    )
+                    results.append(
+                        dict(
+                            description,
+                            group_size=len(ranks),
+                            p50_us=p50 * 1e6,
+                            p99_us=percentile(durations, 0.99) * 1e6,
+                            algbw_GBps=algbw,
+                            busbw_GBps=algbw * BUS_FACTORS[name](len(ranks)),
+                            slowest_ranks=[
+                                dict(
+                                    rank=r,
+                                    host=_host(task_map, r, hostname),
+                                    p50_us=value * 1e6,
+                                )
+                                for value, r in medians[: args.num_slowest]
+                            ],
+                        )
+                    )
+    return results if rank == 0 else None
+
+
+def _host(task_map: "TaskMap", rank: int, default: str) -> str:
+    try:
+        return task_map.host_of(rank)
+    except ValueError:
+        return default if rank == 0 else f"node{task_map.node_of(rank)}"
+
+
+def format_results(results: List[Dict[str, Any]]) -> str:
+    lines = [
+        f"{'group':<11}{'op':<15}{'dtype':<10}{'bytes':>12}{'p50 (us)':>12}"
+        f"{'p99 (us)':>12}{'algbw (GB/s)':>14}{'busbw (GB/s)':>14}  slowest ranks"
+    ]
+    for result in results:
+        prefix = (
+            f"{result['group']:<11}{result['op']:<15}"
+            f"{result['dtype']:<10}{result['bytes']:>12}"
+        )
+        if "error" in result:
+            lines.append(f"{prefix}  {result['error']}")
+            continue
+        slowest = ", ".join(
+            f"{item['rank']}@{item['host']}" for item in result["slowest_ranks"]
+        )
+        lines.append(
+            f"{prefix}{result['p50_us']:>12.1f}{result['p99_us']:>12.1f}"
+            f"{result['algbw_GBps']:>14.3f}{result['busbw_GBps']:>14.3f}  {slowest}"
+        )
+    return "\n".join(lines)
+
+
+def report(args: argparse.Namespace, results: Optional[List[Dict[str, Any]]]) -> None:
+    if results is None:
+        return
+    print(format_results(results))
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+def default_backend() -> str:
+    import torch
+
+    return "nccl" if torch.cuda.is_available() else "gloo"
+
+
+def spawned_worker(local_rank: int, args: argparse.Namespace, port: int) -> None:
+    import torch
+    import torch.distributed as dist
+
+    from .taskmap import TaskMap
+
+    dist.init_process_group(
+        args.backend,
+        init_method=f"tcp://127.0.0.1:{port}",
+        rank=local_rank,
+        world_size=args.spawn,
+    )
+    device = torch.device("cpu")
+    if args.backend == "nccl":
+        device = torch.device(f"cuda:{local_rank}")
+        torch.cuda.set_device(device)
+    task_map = TaskMap.uniform(1, args.spawn, hosts=["localhost"])
+    try:
+        report(args, run(args, local_rank, task_map, device, "localhost"))
+    finally:
+        dist.destroy_process_group()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    args = parse_args(argv)
+    args.backend = args.backend or default_backend()
+
+    if args.spawn:
+        import torch.multiprocessing as mp
+
+        from .api import DefaultAPI
+
+        mp.spawn(
+            spawned_worker,
+            args=(args, DefaultAPI.find_available_port()),
+            nprocs=args.spawn,
+        )
+        return
+
+    import torch
+    import torch.distributed as dist
+
+    import idr_torch
+
+    device = idr_torch.init_process_group(args.backend)
+    if device.type == "cuda":
+        torch.cuda.set_device(device)
+    try:
+        from .groups import gather_task_map
+
+        # Groups are labelled from the node each rank really runs on.
+        task_map = gather_task_map(idr_torch.task_map, idr_torch.node_rank)
+        results = run(args, idr_torch.rank, task_map, device, idr_torch.hostname)
+        report(args, results)
+    finally:
+        dist.destroy_process_group()
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,8 @@ local_rank = API.local_rank
 world_size = API.world_size
 local_world_size = API.local_world_size
 num_nodes = API.num_nodes
+node_rank = API.node_rank
+task_map = API.task_map
 cpus = API.cpus
 gpu_ids = API.gpus
 nodelist = API.nodelist
@@ -17,6 +19,12 @@ master_port = API.port
 is_master = API.is_master
 device = API.device
 init_process_group = API.init_process_group
+init_process_group_async = API.init_process_group_async
+process_groups = API.process_groups
+bind = API.bind
+dataloader_kwargs = API.dataloader_kwargs
+step_timer = API.step_timer
+watchdog = API.watchdog
 hostname = API.hostname
 
 # Aliases
@@ -37,6 +45,8 @@ __all__ = [
     "world_size",
     "local_world_size",
     "num_nodes",
+    "node_rank",
+    "task_map",
     "cpus",
     "gpu_ids",
     "nodelist",
@@ -54,5 +64,11 @@ __all__ = [
     "init_process_group",
     "init_pg",
     "init",
+    "init_process_group_async",
+    "process_groups",
+    "bind",
+    "dataloader_kwargs",
+    "step_timer",
+    "watchdog",
     "hostname",
 ]
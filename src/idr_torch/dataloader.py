@@ -0,0 +1,196 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional
+
+if TYPE_CHECKING:
+    import torch
+
+
+def cache_file() -> str:
+    cache_home = os.environ.get(
+        "XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")
+    )
+    return os.path.join(cache_home, "idr_torch", "dataloader.json")
+
+
+def cache_key(cpus: int) -> str:
+    """
+    Best settings are stored per (node type, cpus). The node type is the
+    SLURM partition when there is one.
+    """
+    node_type = os.environ.get("SLURM_JOB_PARTITION", "local")
+    return f"{node_type}/{cpus}"
+
+
+def read_cache(path: Optional[str] = None) -> Dict[str, int]:
+    try:
+        with open(path or cache_file(), "r") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_cache(key: str, num_workers: int, path: Optional[str] = None) -> None:
+    path = path or cache_file()
+    content = read_cache(path)
+    content[key] = num_workers
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as file:
+        json.dump(content, file, indent=2)
+    os.replace(tmp_path, path)
+
+
+def rank_cpus(cpus: int, local_rank: int) -> List[int]:
+    """
+    CPUs available to the current rank. If the process is not pinned yet
+    (e.g. it shares the whole node with the other local ranks), the allowed
+    CPUs are split into contiguous, disjoint slices of at least ``cpus`` CPUs,
+    one per rank that fits; the first ranks get the CPUs left over.
+    """
+    from .affinity import _split_evenly
+
+    allowed = sorted(os.sched_getaffinity(0))
+    if len(allowed) > cpus > 0:
+        num_ranks = len(allowed) // cpus
+        allowed = list(_split_evenly(allowed, num_ranks)[local_rank % num_ranks])
+    return allowed
+
+
+class WorkerInitFn(object):
+    """
+    Pins each DataLoader worker on its own CPUs, then calls the user's
+    ``worker_init_fn`` if any. Picklable so it works with every start method.
+    """
+
+    __slots__ = ("cpus_per_worker", "worker_init_fn")
+
+    def __init__(
+        self,
+        cpus_per_worker: List[List[int]],
+        worker_init_fn: Optional[Callable[[int], None]] = None,
+    ):
+        self.cpus_per_worker = cpus_per_worker
+        self.worker_init_fn = worker_init_fn
+
+    def __call__(self, worker_id: int) -> None:
+        if self.cpus_per_worker:
+            cpus = self.cpus_per_worker[worker_id % len(self.cpus_per_worker)]
+            os.sched_setaffinity(0, cpus)
+        if self.worker_init_fn is not None:
+            self.worker_init_fn(worker_id)
+
+
+def dataloader_kwargs(
+    cpus: int,
+    local_rank: int,
+    device: "torch.device",
+    /,
+    num_workers: Optional[int] = None,
+    max_workers: Optional[int] = None,
+    prefetch_factor: int = 2,
+    worker_init_fn: Optional[Callable[[int], None]] = None,
+    use_cache: bool = True,
+) -> Dict[str, Any]:
+    """
+    Keyword arguments for `torch.utils.data.DataLoader` suited to the CPUs of
+    the current rank: one CPU is kept for the main process, every worker gets
+    its own share of the others. The number of workers found by
+    `probe_num_workers` is used if it has been cached for this node type.
+    """
+    available = rank_cpus(cpus, local_rank)
+    if num_workers is None:
+        cached = read_cache().get(cache_key(len(available))) if use_cache else None
+        num_workers = cached if cached is not None else len(available) - 1
+    if max_workers is not None:
+        num_workers = min(num_workers, max_workers)
+    num_workers = max(0, min(num_workers, len(available) - 1))
+
+    cpus_per_worker: List[List[int]] = []
+    if num_workers > 0:
+        quotient, remainder = divmod(len(available) - 1, num_workers)
+        start = 1
+        for worker_id in range(num_workers):
+            stop = start + quotient + (worker_id < remainder)
+            cpus_per_worker.append(available[start:stop])
+            start = stop
+
+    kwargs: Dict[str, Any] = dict(
+        num_workers=num_workers,
+        pin_memory=device.type == "cuda",
+        persistent_workers=num_workers > 0,
+        worker_init_fn=WorkerInitFn(cpus_per_worker, worker_init_fn),
+    )
+    if num_workers > 0:
+        # torch < 2.0 rejects prefetch_factor=None without workers.
+        kwargs["prefetch_factor"] = prefetch_factor
+    return kwargs
+
+
+class SyntheticDataset(object):
+    """
+    Map-style dataset producing random images with some CPU-bound
+    preprocessing, used to measure the throughput of the input pipeline.
+    """
+
+    def __init__(self, length: int = 100_000, shape: Iterable[int] = (3, 224, 224)):
+        self.length = length
+        self.shape = tuple(shape)
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __getitem__(self, index: int) -> "torch.Tensor":
+        import torch
+
+        generator = torch.Generator().manual_seed(index)
+        image = torch.rand(self.shape, generator=generator)
+        return (image - image.mean()) / (image.std() + 1e-6)
+
+
+def probe_num_workers(
+    cpus: int,
+    local_rank: int,
+    device: "torch.device",
+    /,
+    candidates: Optional[Iterable[int]] = None,
+    dataset: Any = None,
+    batch_size: int = 64,
+    num_batches: int = 20,
+    save: bool = True,
+) -> Dict[int, float]:
+    """
+    Measures the throughput (batches per second) of a DataLoader for several
+    numbers of workers and caches the best one for this (node type, cpus).
+    """
+    from torch.utils.data import DataLoader
+
+    available = len(rank_cpus(cpus, local_rank))
+    if candidates is None:
+        candidates = sorted({0, 1, 2, 4, 8, 16, 32, available - 1})
+    candidates = [c for c in candidates if 0 <= c <= max(available - 1, 0)]
+    dataset = SyntheticDataset() if dataset is None else dataset
+
+    throughputs: Dict[int, float] = {}
+    for num_workers in candidates:
+        kwargs = dataloader_kwargs(
+            cpus, local_rank, device, num_workers=num_workers, use_cache=False
+        )
+        kwargs["persistent_workers"] = False
+        loader = DataLoader(dataset, batch_size=batch_size, shuffle=True, **kwargs)
+        iterator = iter(loader)
+        next(iterator)  # Workers startup is not measured
+        start = time.perf_counter()
+        for _ in range(num_batches):
+            next(iterator)
+        throughputs[num_workers] = num_batches / (time.perf_counter() - start)
+        del iterator, loader
+
+    if save and throughputs:
+        best = max(throughputs, key=throughputs.__getitem__)
+        write_cache(cache_key(available), best)
+    return throughputs
@@ -0,0 +1,171 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import inspect
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from .taskmap import TaskMap
+
+if TYPE_CHECKING:
+    import torch.distributed as dist
+
+
+class ProcessGroups(object):
+    """
+    Standard topology-aware sub-groups of the current rank:
+        - intra_node: all ranks of my node.
+        - inter_node: ranks having my local rank on every node.
+        - node_leaders: local rank 0 of every node, None if I am not one of them.
+    """
+
+    __slots__ = (
+        "intra_node",
+        "inter_node",
+        "node_leaders",
+        "intra_node_ranks",
+        "inter_node_ranks",
+        "node_leaders_ranks",
+    )
+
+    def __init__(
+        self,
+        intra_node: "dist.ProcessGroup",
+        inter_node: "dist.ProcessGroup",
+        node_leaders: Optional["dist.ProcessGroup"],
+        intra_node_ranks: List[int],
+        inter_node_ranks: List[int],
+        node_leaders_ranks: List[int],
+    ):
+        self.intra_node = intra_node
+        self.inter_node = inter_node
+        self.node_leaders = node_leaders
+        self.intra_node_ranks = intra_node_ranks
+        self.inter_node_ranks = inter_node_ranks
+        self.node_leaders_ranks = node_leaders_ranks
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(intra_node={self.intra_node_ranks}, "
+            f"inter_node={self.inter_node_ranks}, "
+            f"node_leaders={self.node_leaders_ranks})"
+        )
+
+
+def enumerate_groups(task_map: TaskMap) -> Dict[str, List[List[int]]]:
+    """
+    Lists the ranks of every intra-node, inter-node and node leaders group.
+    """
+    intra_node = [list(task_map.ranks_of(node)) for node in range(task_map.num_nodes)]
+    inter_node = [
+        [
+            task_map.rank_of(node, local_rank)
+            for node in range(task_map.num_nodes)
+            if local_rank < task_map.tasks_per_node[node]
+        ]
+        for local_rank in range(max(task_map.tasks_per_node, default=0))
+    ]
+    node_leaders = [[task_map.rank_of(node, 0) for node in range(task_map.num_nodes)]]
+    return dict(intra_node=intra_node, inter_node=inter_node, node_leaders=node_leaders)
+
+
+def gather_task_map(task_map: TaskMap, node_rank: int) -> TaskMap:
+    """
+    Collective: placement of the ranks as reported by the ranks themselves
+    (``node_rank``, e.g. SLURM_NODEID), whatever the distribution. Returns
+    ``task_map`` when it agrees.
+    """
+    import torch
+    import torch.distributed as dist
+
+    device = torch.device("cpu")
+    if dist.get_backend() == "nccl":
+        device = torch.device("cuda", torch.cuda.current_device())
+    local = torch.tensor([node_rank], dtype=torch.int64, device=device)
+    gathered = torch.empty(dist.get_world_size(), dtype=torch.int64, device=device)
+    dist.all_gather_into_tensor(gathered, local)
+    rank_to_node = gathered.cpu().tolist()
+    if rank_to_node == list(task_map.rank_to_node):
+        return task_map
+    hosts = task_map.hosts
+    if hosts is not None and len(hosts) <= max(rank_to_node):
+        hosts = None
+    return TaskMap.from_nodes(rank_to_node, hosts)
+
+
+def _supports_local_synchronization() -> bool:
+    import torch.distributed as dist
+
+    return "use_local_synchronization" in inspect.signature(dist.new_group).parameters
+
+
+def _create_groups(
+    all_ranks: List[List[int]], rank: int, **kwargs: Any
+) -> Optional["dist.ProcessGroup"]:
+    """
+    Creates the group containing ``rank`` among ``all_ranks``.
+    When torch allows it, only the members create their group, so each rank
+    makes a constant number of calls. Otherwise every rank has to create every
+    group, in the same order.
+    """
+    import torch.distributed as dist
+
+    if _supports_local_synchronization():
+        for ranks in all_ranks:
+            if rank in ranks:
+                return dist.new_group(ranks, use_local_synchronization=True, **kwargs)
+        return None
+    group, _ = dist.new_subgroups_by_enumeration(all_ranks, **kwargs)
+    return group
+
+
+# backend -> (default process group, groups built on top of it)
+_cache: Dict[Optional[str], Tuple[Any, ProcessGroups]] = {}
+
+
+def make_process_groups(
+    task_map: TaskMap,
+    rank: int,
+    /,
+    backend: Optional[str] = None,
+    node_rank: Optional[int] = None,
+    **kwargs: Any,
+) -> ProcessGroups:
+    """
+    Creates the intra-node, inter-node and node leaders groups. This is a
+    collective: every rank must call it. Groups are cached as long as the
+    default process group is not destroyed. With ``node_rank``, the node of
+    each rank is gathered first (see gather_task_map), so groups follow the
+    real placement rather than ``task_map``.
+    """
+    import torch.distributed as dist
+
+    if not dist.is_initialized():
+        raise RuntimeError(
+            "The distributed environment must be initialized before creating "
+            "sub-groups. You should call idr_torch.init_process_group first."
+        )
+    world = dist.group.WORLD
+    cached = _cache.get(backend, None)
+    if cached is not None and cached[0] is world:
+        return cached[1]
+
+    if node_rank is not None:
+        task_map = gather_task_map(task_map, node_rank)
+    all_groups = enumerate_groups(task_map)
+    node, local_rank = task_map.locate(rank)
+    groups = ProcessGroups(
+        intra_node=_create_groups(
+            all_groups["intra_node"], rank, backend=backend, **kwargs
+        ),
+        inter_node=_create_groups(
+            all_groups["inter_node"], rank, backend=backend, **kwargs
+        ),
+        node_leaders=_create_groups(
+            all_groups["node_leaders"], rank, backend=backend, **kwargs
+        ),
+        intra_node_ranks=all_groups["intra_node"][node],
+        inter_node_ranks=all_groups["inter_node"][local_rank],
+        node_leaders_ranks=all_groups["node_leaders"][0],
+    )
+    _cache[backend] = (world, groups)
+    return groups
@@ -0,0 +1,267 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import atexit
+import random
+import sys
+import threading
+import time
+import traceback
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Set, Tuple
+
+if TYPE_CHECKING:
+    import torch.distributed as dist
+
+    from .taskmap import TaskMap
+
+# Keys of the watchdog in the store.
+PREFIX = "idr_torch/watchdog"
+DONE = b"done"
+# The master reads the heartbeats by batches of this many keys.
+_READ_BATCH = 1024
+
+
+def heartbeat_key(rank: int) -> str:
+    return f"beat/{rank}"
+
+
+def stacks_key(rank: int) -> str:
+    return f"stacks/{rank}"
+
+
+def format_stacks(skip: Optional[int] = None) -> str:
+    """
+    Python stacks of every thread of the process, except ``skip``.
+    """
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    lines: List[str] = []
+    for ident, frame in sys._current_frames().items():
+        if ident == skip:
+            continue
+        lines.append(f"Thread {names.get(ident, ident)}:\n")
+        lines += traceback.format_stack(frame)
+    return "".join(lines)
+
+
+class Watchdog(object):
+    """
+    Detects ranks which stop making progress, long before the collectives
+    time out. The training loop calls ``step()``, which only increments a
+    counter. A daemon thread publishes that counter every ``interval``
+    seconds (one store write per rank and interval, whatever the number of
+    steps) along with a heartbeat. A rank whose counter did not move for
+    ``timeout / 2`` seconds also publishes its Python stacks.
+
+    The master reads every heartbeat by batches. Ranks whose counter did not
+    move for ``timeout`` seconds are reported once per stall with their
+    node, the ranks behind the others first, along with their stacks. Ranks
+    whose heartbeat stopped are reported as unresponsive (dead process, or
+    stuck in C code holding the GIL). The report is printed on stderr and
+    given to ``on_stall``.
+    """
+
+    def __init__(
+        self,
+        store: "dist.Store",
+        rank: int,
+        world_size: int,
+        interval: float = 10.0,
+        timeout: float = 300.0,
+        task_map: Optional["TaskMap"] = None,
+        dump_stacks: bool = True,
+        num_stacks: int = 4,
+        on_stall: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ):
+        self.store = store
+        self.rank = rank
+        self.world_size = world_size
+        self.interval = interval
+        self.timeout = timeout
+        self.task_map = task_map
+        self.dump_stacks = dump_stacks
+        self.num_stacks = num_stacks
+        self.on_stall = on_stall
+        self.is_master = rank == 0
+        self.progress = 0
+        self.reports: List[Dict[str, Any]] = []
+        self._beat = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # Master side: last value seen for each rank and when it changed.
+        self._seen: Dict[int, Tuple[int, int]] = {}
+        self._progress_since: Dict[int, float] = {}
+        self._beat_since: Dict[int, float] = {}
+        self._reported: Set[int] = set()
+
+    def step(self) -> None:
+        self.progress += 1
+
+    def start(self) -> "Watchdog":
+        if self._thread is None:
+            self._publish()
+            self._thread = threading.Thread(
+                target=self._run, name="idr_torch_watchdog", daemon=True
+            )
+            self._thread.start()
+            atexit.register(self.close)
+        return self
+
+    def close(self) -> None:
+        """
+        Stops the thread and tells the master this rank is done.
+        """
+        thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._stop.set()
+        thread.join()
+        atexit.unregister(self.close)
+        try:
+            self.store.set(heartbeat_key(self.rank), DONE)
+        except Exception:
+            pass
+
+    def _publish(self) -> None:
+        self._beat += 1
+        self.store.set(heartbeat_key(self.rank), f"{self.progress},{self._beat}")
+
+    def _run(self) -> None:
+        last_progress, since, dumped = self.progress, time.monotonic(), False
+        # Spread the writes of the ranks over the interval.
+        delay = random.uniform(0, self.interval)
+        while not self._stop.wait(delay):
+            delay = self.interval
+            now = time.monotonic()
+            progress = self.progress
+            if progress != last_progress:
+                last_progress, since, dumped = progress, now, False
+            try:
+                self._publish()
+                if self.dump_stacks and not dumped and now - since > self.timeout / 2:
+                    self.store.set(
+                        stacks_key(self.rank), format_stacks(skip=threading.get_ident())
+                    )
+                    dumped = True
+                if self.is_master:
+                    self.check(now)
+            except Exception as error:
+                print(f"idr_torch watchdog: {error}", file=sys.stderr, flush=True)
+
+    def _read(self) -> Dict[int, Optional[bytes]]:
+        """
+        Heartbeat of every rank, None for ranks which did not start yet.
+        """
+        values: Dict[int, Optional[bytes]] = {}
+        for first in range(0, self.world_size, _READ_BATCH):
+            ranks = list(range(first, min(first + _READ_BATCH, self.world_size)))
+            keys = [heartbeat_key(rank) for rank in ranks]
+            if not self.store.check(keys):
+                # Some ranks did not start: get would wait for them.
+                values.update(dict.fromkeys(ranks))
+                started = [key for key in keys if self.store.check([key])]
+                ranks = [int(key.rsplit("/", 1)[1]) for key in started]
+                keys = started
+            if hasattr(self.store, "multi_get"):
+                values.update(zip(ranks, self.store.multi_get(keys)))
+            else:
+                values.update(zip(ranks, map(self.store.get, keys)))
+        return values
+
+    def check(self, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Master side: reads the heartbeats and reports the ranks which became
+        stalled since the last check, if any.
+        """
+        now = time.monotonic() if now is None else now
+        stalled: List[Dict[str, Any]] = []
+        alive_progress: List[int] = []
+        for rank, value in self._read().items():
+            if value is None or value == DONE:
+                continue
+            progress, beat = map(int, value.decode().split(","))
+            alive_progress.append(progress)
+            previous = self._seen.get(rank, None)
+            if previous is None or previous[0] != progress:
+                self._progress_since[rank] = now
+                self._reported.discard(rank)
+            if previous is None or previous[1] != beat:
+                self._beat_since[rank] = now
+            self._seen[rank] = (progress, beat)
+            stalled_for = now - self._progress_since[rank]
+            if stalled_for >= self.timeout and rank not in self._reported:
+                self._reported.add(rank)
+                stalled.append(
+                    dict(
+                        rank=rank,
+                        host=self._host(rank),
+                        progress=progress,
+                        stalled_for=stalled_for,
+                        responsive=now - self._beat_since[rank] < self.timeout,
+                    )
+                )
+        if not stalled:
+            return None
+        # Ranks behind the others are the likely culprits.
+        stalled.sort(key=lambda entry: (entry["progress"], entry["rank"]))
+        if self.dump_stacks:
+            for entry in stalled[: self.num_stacks]:
+                key = stacks_key(entry["rank"])
+                if self.store.check([key]):
+                    entry["stacks"] = self.store.get(key).decode()
+        report = dict(
+            stalled=stalled,
+            max_progress=max(alive_progress),
+            num_alive=len(alive_progress),
+        )
+        self.reports.append(report)
+        print(format_report(report, self.timeout), file=sys.stderr, flush=True)
+        if self.on_stall is not None:
+            self.on_stall(report)
+        return report
+
+    def _host(self, rank: int) -> Optional[str]:
+        if self.task_map is None or self.task_map.hosts is None:
+            return None
+        return self.task_map.host_of(rank)
+
+
+def format_report(report: Dict[str, Any], timeout: float) -> str:
+    stalled = report["stalled"]
+    lines = [
+        f"idr_torch watchdog: {len(stalled)} rank(s) made no progress for more "
+        f"than {timeout:g}s (most advanced rank at step {report['max_progress']}):"
+    ]
+    nodes: Dict[Optional[str], List[str]] = {}
+    for entry in stalled:
+        description = f"{entry['rank']} (step {entry['progress']}"
+        if not entry["responsive"]:
+            description += ", unresponsive"
+        nodes.setdefault(entry["host"], []).append(description + ")")
+    for host, ranks in nodes.items():
+        lines.append(f"    {host or 'unknown node'}: {', '.join(ranks)}")
+    for entry in stalled:
+        if "stacks" in entry:
+            lines.append(f"Stacks of rank {entry['rank']}:")
+            lines.append(entry["stacks"].rstrip())
+    return "\n".join(lines)
+
+
+def connect_store(
+    master_addr: str, master_port: int, timeout: float = 60.0
+) -> "dist.Store":
+    """
+    Dedicated client of the rendezvous TCPStore hosted by the master, so the
+    watchdog never competes with the process group for its connection.
+    """
+    from datetime import timedelta
+
+    import torch.distributed as dist
+
+    store = dist.TCPStore(
+        master_addr,
+        master_port,
+        is_master=False,
+        timeout=timedelta(seconds=timeout),
+        wait_for_workers=False,
+    )
+    return dist.PrefixStore(PREFIX, store)
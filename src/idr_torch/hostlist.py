@@ -0,0 +1,291 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import re
+from bisect import bisect_right
+from functools import lru_cache
+from itertools import product
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+_group_regex = re.compile(r"\[([^\[\]]*)\]")
+_trailing_number_regex = re.compile(r"^(.*?)(\d+)(\D*)$")
+
+
+def _cumulative(counts: Iterable[int]) -> Tuple[int, ...]:
+    offsets = [0]
+    for count in counts:
+        offsets.append(offsets[-1] + count)
+    return tuple(offsets)
+
+
+class RangeSet(object):
+    """
+    Content of one bracket of a nodelist, such as ``[00-35,40]``.
+    Each range is stored as (start, stop, width) with ``stop`` included.
+    """
+
+    __slots__ = ("ranges", "offsets", "count")
+
+    def __init__(self, ranges: Tuple[Tuple[int, int, int], ...]):
+        self.ranges = ranges
+        self.offsets = _cumulative(stop - start + 1 for start, stop, _ in ranges)
+        self.count = self.offsets[-1]
+
+    @classmethod
+    def parse(cls, text: str) -> "RangeSet":
+        ranges: List[Tuple[int, int, int]] = []
+        for element in text.split(","):
+            low, _, high = element.strip().partition("-")
+            if not low.isdigit() or not (high or low).isdigit():
+                raise ValueError(f"Invalid range '{element}' in nodelist.")
+            start, stop = int(low), int(high or low)
+            if stop < start:
+                raise ValueError(f"Invalid range '{element}' in nodelist.")
+            ranges.append((start, stop, len(low)))
+        return cls(tuple(ranges))
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, index: int) -> str:
+        i = bisect_right(self.offsets, index) - 1
+        start, _, width = self.ranges[i]
+        return f"{start + index - self.offsets[i]:0{width}d}"
+
+    def __iter__(self) -> Iterator[str]:
+        for start, stop, width in self.ranges:
+            for value in range(start, stop + 1):
+                yield f"{value:0{width}d}"
+
+    def index(self, token: str) -> int:
+        """
+        Position of ``token`` in the bracket, -1 if it is not part of it.
+        """
+        value = int(token)
+        for (start, stop, width), offset in zip(self.ranges, self.offsets):
+            if start <= value <= stop and f"{value:0{width}d}" == token:
+                return offset + value - start
+        return -1
+
+
+class HostPattern(object):
+    """
+    One element of a nodelist, such as ``r[1-3]i[0-7]n[00-35]``.
+    Hosts are ordered with the last bracket varying the fastest.
+    """
+
+    __slots__ = ("literals", "groups", "count", "_regex")
+
+    def __init__(self, literals: Tuple[str, ...], groups: Tuple[RangeSet, ...]):
+        self.literals = literals
+        self.groups = groups
+        self.count = 1
+        for group in groups:
+            self.count *= group.count
+        self._regex: Optional[re.Pattern] = None
+
+    @classmethod
+    def parse(cls, text: str) -> "HostPattern":
+        literals: List[str] = []
+        groups: List[RangeSet] = []
+        position = 0
+        for match in _group_regex.finditer(text):
+            literals.append(text[position : match.start()])
+            groups.append(RangeSet.parse(match.group(1)))
+            position = match.end()
+        literals.append(text[position:])
+        if any("[" in literal or "]" in literal for literal in literals):
+            raise ValueError(f"Unbalanced brackets in nodelist element '{text}'.")
+        return cls(tuple(literals), tuple(groups))
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, index: int) -> str:
+        tokens: List[str] = []
+        for group in reversed(self.groups):
+            index, position = divmod(index, group.count)
+            tokens.append(group[position])
+        tokens.reverse()
+        return self._join(tokens)
+
+    def __iter__(self) -> Iterator[str]:
+        for tokens in product(*self.groups):
+            yield self._join(tokens)
+
+    def _join(self, tokens: Iterable[str]) -> str:
+        parts = [self.literals[0]]
+        for token, literal in zip(tokens, self.literals[1:]):
+            parts.append(token)
+            parts.append(literal)
+        return "".join(parts)
+
+    def index(self, host: str) -> int:
+        """
+        Position of ``host`` in the pattern, -1 if it is not part of it.
+        """
+        if self._regex is None:
+            self._regex = re.compile(
+                r"(\d+)".join(re.escape(literal) for literal in self.literals)
+            )
+        match = self._regex.fullmatch(host)
+        if match is None:
+            return -1
+        index = 0
+        for group, token in zip(self.groups, match.groups()):
+            position = group.index(token)
+            if position < 0:
+                return -1
+            index = index * group.count + position
+        return index
+
+
+class Hostlist(object):
+    """
+    Lazy, read-only sequence of the hosts described by a compact nodelist
+    (e.g. ``node[1-4,7],gpu[01-10]``). Hosts are never expanded unless
+    iterated over: indexing and lookups only walk the ranges.
+    """
+
+    __slots__ = ("compact", "patterns", "offsets")
+
+    def __init__(self, compact: str):
+        self.compact = compact
+        self.patterns = tuple(
+            HostPattern.parse(element) for element in split_nodelist(compact)
+        )
+        self.offsets = _cumulative(pattern.count for pattern in self.patterns)
+
+    def __len__(self) -> int:
+        return self.offsets[-1]
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[str, List[str]]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Hostlist index out of range")
+        i = bisect_right(self.offsets, index) - 1
+        return self.patterns[i][index - self.offsets[i]]
+
+    def __iter__(self) -> Iterator[str]:
+        for pattern in self.patterns:
+            yield from pattern
+
+    def __contains__(self, host: object) -> bool:
+        return isinstance(host, str) and self.find(host) >= 0
+
+    def find(self, host: str) -> int:
+        """
+        Position of ``host`` in the nodelist, -1 if it is not part of it.
+        """
+        for pattern, offset in zip(self.patterns, self.offsets):
+            position = pattern.index(host)
+            if position >= 0:
+                return offset + position
+        return -1
+
+    def index(self, host: str) -> int:
+        position = self.find(host)
+        if position < 0:
+            raise ValueError(f"{host!r} is not in the nodelist")
+        return position
+
+    def __str__(self) -> str:
+        return self.compact
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.compact!r})"
+
+
+def split_nodelist(compact: str) -> List[str]:
+    """
+    Splits a compact nodelist on the commas which are not inside brackets.
+    """
+    elements: List[str] = []
+    depth = 0
+    start = 0
+    for i, char in enumerate(compact):
+        if char == "[":
+            depth += 1
+        elif char == "]":
+            depth -= 1
+        elif char == "," and depth == 0:
+            elements.append(compact[start:i])
+            start = i + 1
+    elements.append(compact[start:])
+    return [element.strip() for element in elements if element.strip()]
+
+
+@lru_cache(maxsize=32)
+def parse_hostlist(compact: str) -> Hostlist:
+    """
+    Parses a compact nodelist. Results are cached per nodelist string.
+    """
+    return Hostlist(compact)
+
+
+class ExpandedHostlist(list):
+    """
+    Plain list of hosts which remembers the compact nodelist it comes from.
+    """
+
+    __slots__ = ("compact",)
+
+    def __init__(self, compact: str):
+        super().__init__(parse_hostlist(compact))
+        self.compact = compact
+
+
+def expand_hostlist(compact: str) -> List[str]:
+    """
+    Example: "node[1-3],gpu07" -> ["node1", "node2", "node3", "gpu07"]
+    """
+    return ExpandedHostlist(compact)
+
+
+def compress_hostlist(hosts: Iterable[str]) -> str:
+    """
+    Example: ["node1", "node2", "node3", "gpu07"] -> "node[1-3],gpu07"
+    The order of the hosts is kept: only consecutive hosts sharing the same
+    prefix, suffix and padding are merged.
+    """
+    # Each entry is [prefix, suffix, width, ranges] or [host, None, 0, None]
+    entries: List[list] = []
+    for host in hosts:
+        match = _trailing_number_regex.match(host)
+        if match is None:
+            entries.append([host, None, 0, None])
+            continue
+        prefix, digits, suffix = match.groups()
+        value = int(digits)
+        last = entries[-1] if entries else None
+        if (
+            last is not None
+            and last[:2] == [prefix, suffix]
+            and f"{value:0{last[2]}d}" == digits
+        ):
+            ranges = last[3]
+            if ranges[-1][1] + 1 == value:
+                ranges[-1][1] = value
+            else:
+                ranges.append([value, value])
+        else:
+            width = len(digits) if digits.startswith("0") else 1
+            entries.append([prefix, suffix, width, [[value, value]]])
+
+    elements: List[str] = []
+    for prefix, suffix, width, ranges in entries:
+        if ranges is None:
+            elements.append(prefix)
+            continue
+        formatted = [
+            f"{start:0{width}d}" + ("" if start == stop else f"-{stop:0{width}d}")
+            for start, stop in ranges
+        ]
+        if len(formatted) == 1 and ranges[0][0] == ranges[0][1]:
+            elements.append(f"{prefix}{formatted[0]}{suffix}")
+        else:
+            elements.append(f"{prefix}[{','.join(formatted)}]{suffix}")
+    return ",".join(elements)
@@ -1,19 +1,30 @@
 #! /usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import os
 import warnings
 from collections.abc import Iterable
 from functools import wraps
-from importlib.metadata import version
-from inspect import isclass
-from pathlib import Path
-from typing import Any, List, Union
+from importlib import import_module
+from typing import Any, Dict, List, Optional, Union
 
 from . import __name__, __path__
-from .api import API, AutoMasterAddressPort, DefaultAPI, decorate_methods
+from .api.base import API
+from .topology import Topology
 from .utils import IdrTorchWarning, warning_filter
 
-__version__ = version(__name__)
+
+def get_version() -> str:
+    # importlib.metadata crawls sys.path, which is slow on shared filesystems.
+    from importlib.metadata import version
+
+    return version(__name__)
+
+
+def __getattr__(name: str) -> Any:
+    if name == "__version__":
+        return get_version()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 class EmptyClass(object):
@@ -22,8 +33,9 @@ class EmptyClass(object):
 
 class Interface(object):
     def __init__(self):
-        self._available_APIs: List[API] = []
-        self.crawl_shipped_APIs()
+        self._available_APIs: Optional[List[API]] = None
+        self._topology: Optional[Topology] = None
+        self._pending_warnings: Dict[str, List[warnings.WarningMessage]] = {}
         self.add_other_object_for_easy_access()
         self.add_API_functions()
         self.make_dir()
@@ -57,22 +69,23 @@ class Interface(object):
     def crawl_shipped_APIs(self) -> None:
         from . import api
 
-        self.crawl_module_for_APIs(api)
+        for api_name in api.shipped_APIs:
+            self.register_API(getattr(api, api_name)())
 
-    def add_other_object_for_easy_access(self) -> None:
-        from . import api
-        from .api import modifiers
+    # Objects only imported the first time they are accessed.
+    _lazy_attributes: Dict[str, str] = {
+        "API": ".api",
+        "AutoMasterAddressPort": ".api",
+        "decorate_methods": ".api",
+        "modifiers": ".api",
+        "Topology": ".topology",
+    }
 
-        self.api = api
-        self.API = API
-        self.AutoMasterAddressPort = AutoMasterAddressPort
-        self.decorate_methods = decorate_methods
+    def add_other_object_for_easy_access(self) -> None:
         self.IdrTorchWarning = IdrTorchWarning
-        self.modifiers = modifiers
-        self.__file__ = str(Path(__file__).parent / "__init__.py")
+        self.__file__ = os.path.join(os.path.dirname(__file__), "__init__.py")
         self.__path__ = __path__
         self.__name__ = __name__
-        self.__version__ = __version__
         self.__spec__ = __spec__
         self.__all__ = [
             "api",
@@ -87,8 +100,24 @@ class Interface(object):
             "all_APIs",
             "crawl_module_for_APIs",
             "summary",
+            "topology",
+            "refresh",
         ]
 
+    def __getattr__(self, name: str) -> Any:
+        # Only called when the attribute was not found the usual way.
+        if name == "__version__":
+            value = get_version()
+        elif name == "api":
+            value = import_module(".api", __name__)
+        elif name in self._lazy_attributes:
+            module = import_module(self._lazy_attributes[name], __name__)
+            value = getattr(module, name)
+        else:
+            raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+        setattr(self, name, value)
+        return value
+
     def __repr__(self) -> str:
         return f"<module '{self.__name__}' from '{self.__file__}'"
 
@@ -107,39 +136,113 @@ class Interface(object):
                 warning_filter.warn(warning_list)
             return output
 
-        if as_property:
+        if as_property and dest_name in Topology.api_fields:
+
+            @wraps(getattr(API, dest_name))
+            def snapshot(self: Interface) -> Any:
+                topology = self._topology
+                if topology is None:
+                    topology = self.refresh(inherit=True)
+                try:
+                    value = getattr(topology, dest_name)
+                except AttributeError:
+                    value = redirect
+                # Lazy fields record their warnings when read above.
+                if self._pending_warnings:
+                    warning_list = self._pending_warnings.pop(dest_name, None)
+                    if warning_list:
+                        warning_filter.warn(warning_list)
+                if value is redirect:
+                    # Resolution failed, let the API raise the actual error.
+                    return redirect(self)
+                return value
+
+            return property(snapshot)
+        elif as_property:
             return property(redirect)
         else:
             return redirect
 
+    @property
+    def _APIs(self) -> List[API]:
+        if self._available_APIs is None:
+            self._available_APIs = []
+            self.crawl_shipped_APIs()
+        return self._available_APIs
+
     def register_API(self, new_API: API) -> None:
-        for i, api in enumerate(self._available_APIs):
+        for i, api in enumerate(self._APIs):
             if api.priority > new_API.priority:
                 continue
             else:
-                self._available_APIs.insert(i, new_API)
+                self._APIs.insert(i, new_API)
                 break
         else:
-            self._available_APIs.append(new_API)
+            self._APIs.append(new_API)
+        self._topology = None
 
     def get_launcher_API(self) -> API:
-        for api in self._available_APIs:
+        # Timed only when timings are requested through the environment, the
+        # launcher being detected long before init_process_group is called.
+        if not os.environ.get("IDR_TORCH_INIT_TIMINGS", None):
+            return self.detect_launcher_API()
+        from time import perf_counter
+
+        from .timing import startup_phases
+
+        start = perf_counter()
+        launcher = self.detect_launcher_API()
+        startup_phases["launcher_detection"] = perf_counter() - start
+        return launcher
+
+    def detect_launcher_API(self) -> API:
+        for api in self._APIs:
             if api.is_launcher():
                 return api
+        from .api import DefaultAPI
+
         return DefaultAPI()
 
+    @property
+    def topology(self) -> Topology:
+        """
+        Snapshot of the values resolved from the launcher API.
+        """
+        if self._topology is None:
+            return self.refresh(inherit=True)
+        return self._topology
+
+    def refresh(self, /, inherit: bool = False) -> Topology:
+        """
+        Resolves the launcher API again and replaces the current snapshot.
+        Should be called whenever the environment changes (e.g. elastic restart).
+        With ``inherit``, the topology exported by a parent process of the same
+        rank is reused if there is one. Otherwise the new snapshot is exported
+        for the child processes.
+        """
+        topology = Topology.inherited() if inherit else None
+        pending_warnings: Dict[str, List[warnings.WarningMessage]] = {}
+        if topology is None:
+            topology = Topology.from_api(
+                self.get_launcher_API(), warnings_per_field=pending_warnings
+            )
+            topology.export()
+        self._pending_warnings = pending_warnings
+        self._topology = topology
+        return topology
+
     @property
     def current_API(self) -> str:
-        return self.get_launcher_API().name
+        return self.topology.launcher
 
     @property
     def all_APIs(self) -> List[API]:
-        return self._available_APIs
+        return self._APIs
 
     def crawl_module_for_APIs(self, module) -> None:
         for obj_name in dir(module):
             obj = getattr(module, obj_name)
-            if isclass(obj) and issubclass(obj, API) and obj is not API:
+            if isinstance(obj, type) and issubclass(obj, API) and obj is not API:
                 # obj is the class so we instanciate it
                 self.register_API(obj())
             elif isinstance(obj, API) and obj.__class__ is not API:
@@ -153,6 +256,7 @@ class Interface(object):
             "local_rank": self.local_rank,
             "world_size": self.world_size,
             "local_world_size": self.local_world_size,
+            "node_rank": self.node_rank,
             "cpus_per_task": self.cpus,
             "nodelist": self.nodelist,
             "hostname": self.hostname,
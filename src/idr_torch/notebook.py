@@ -3,13 +3,27 @@
 
 import atexit
 import inspect
+import io
+import mmap
 import os
+import pickle
+import selectors
 import signal
+import socket
+import struct
 import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
 import warnings
+from collections import deque
+from concurrent.futures import Future
+from contextlib import suppress
 from functools import cached_property, wraps
 from textwrap import dedent
-from typing import Any, Callable
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 from IPython import get_ipython
 
@@ -27,6 +41,15 @@ else:
 __spec__ = None
 __IS_MASTER__: bool = True
 
+# Seconds given to the controller and the engines to start.
+STARTUP_TIMEOUT: float = 300.0
+# Layout of the files shared by push_shared: number of buffers and size of the
+# pickle, size of each buffer, the pickle, then the aligned buffers.
+_SHARED_HEADER = struct.Struct("<QQ")
+_SHARED_ALIGNMENT = 64
+# Reductions done by pull through the process group of the engines.
+REDUCTIONS = ("sum", "mean", "cat")
+
 
 def getsource(func: Callable, /, ignore_first_n_lines: int = 0) -> str:
     src = inspect.getsource(func)
@@ -85,6 +108,241 @@ def only_on_master(func: Callable) -> Callable:
     return wrapper
 
 
+class ProcessOutput(object):
+    """
+    Line-buffered, non-blocking reader of the stderr of a subprocess. Only
+    the last ``max_lines`` lines are kept, to explain failures.
+    """
+
+    def __init__(self, name: str, process: subprocess.Popen, max_lines: int = 20):
+        self.name = name
+        self.process = process
+        self.fd = process.stderr.fileno()
+        os.set_blocking(self.fd, False)
+        self.tail: deque = deque(maxlen=max_lines)
+        self._partial = b""
+
+    def read_lines(self) -> Optional[List[str]]:
+        """
+        Complete lines available without blocking, None at end of file.
+        """
+        try:
+            data = os.read(self.fd, 1 << 16)
+        except BlockingIOError:
+            return []
+        if not data:
+            return None
+        *lines, self._partial = (self._partial + data).split(b"\n")
+        decoded = [line.decode("utf-8", "replace") for line in lines]
+        self.tail.extend(decoded)
+        return decoded
+
+    def drain(self) -> None:
+        """
+        Keeps reading in a daemon thread, so the process never blocks on a
+        full pipe.
+        """
+
+        def run() -> None:
+            os.set_blocking(self.fd, True)
+            while self.read_lines() is not None:
+                pass
+
+        threading.Thread(target=run, name=f"drain_{self.name}", daemon=True).start()
+
+    def failure(self, message: str) -> str:
+        lines = "\n".join(self.tail)
+        return f"{self.name} {message}. Last lines of its output:\n{lines}"
+
+
+def shared_dir() -> str:
+    """
+    Node-local directory through which the engines of a node share pushed
+    objects: $IDR_TORCH_NOTEBOOK_SHM, /dev/shm if available, else $TMPDIR.
+    """
+    directory = os.environ.get("IDR_TORCH_NOTEBOOK_SHM", None)
+    if directory:
+        return directory
+    if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK):
+        return "/dev/shm"
+    return tempfile.gettempdir()
+
+
+def _rebuild_tensor(data, dtype, shape, requires_grad, cls=None, state=None):
+    import torch
+
+    tensor = torch.from_numpy(data).view(dtype).reshape(shape)
+    if cls is not None:
+        tensor = tensor.as_subclass(cls)
+        tensor.__dict__.update(state or {})
+    return tensor.requires_grad_() if requires_grad else tensor
+
+
+class _SharedPickler(pickle.Pickler):
+    """
+    Pickles CPU tensors as their raw bytes, in NumPy arrays, so their data
+    goes out-of-band like the data of NumPy arrays. Subclasses keeping the
+    default pickling of tensors are rebuilt with their attributes; others
+    (such as nn.Parameter, which pickles its plain ``data``) use their own.
+    """
+
+    def reducer_override(self, obj: Any) -> Any:
+        torch = sys.modules.get("torch", None)
+        if torch is None or not isinstance(obj, torch.Tensor):
+            return NotImplemented
+        cls = type(obj)
+        if (
+            cls is not torch.Tensor
+            and cls.__reduce_ex__ is not torch.Tensor.__reduce_ex__
+        ):
+            return NotImplemented
+        if obj.device.type != "cpu" or obj.layout != torch.strided:
+            return NotImplemented
+        tensor = obj.as_subclass(torch.Tensor).detach()
+        data = tensor.contiguous().reshape(-1).view(torch.uint8).numpy()
+        args = (data, obj.dtype, tuple(obj.shape), obj.requires_grad)
+        if cls is not torch.Tensor:
+            args += (cls, dict(obj.__dict__))
+        return _rebuild_tensor, args
+
+
+def dumps_shared(obj: Any) -> Tuple[bytes, List[pickle.PickleBuffer]]:
+    """
+    Pickles ``obj`` with protocol 5, keeping the data of arrays and tensors
+    out-of-band, without copying it.
+    """
+    buffers: List[pickle.PickleBuffer] = []
+    file = io.BytesIO()
+    _SharedPickler(file, protocol=5, buffer_callback=buffers.append).dump(obj)
+    return file.getvalue(), buffers
+
+
+def write_shared(path: str, payload: bytes, buffers: List[Any]) -> None:
+    lengths = [memoryview(buffer).nbytes for buffer in buffers]
+    with open(path, "wb") as file:
+        file.write(_SHARED_HEADER.pack(len(buffers), len(payload)))
+        file.write(struct.pack(f"<{len(lengths)}Q", *lengths))
+        file.write(payload)
+        for buffer in buffers:
+            file.write(bytes(-file.tell() % _SHARED_ALIGNMENT))
+            file.write(buffer)
+
+
+def load_shared(path: str) -> Any:
+    """
+    Unpickles a file written by write_shared. Arrays and tensors are views
+    of a copy-on-write mapping of the file: pages are shared by the engines
+    of the node until they are written to.
+    """
+    with open(path, "rb") as file:
+        mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY)
+    view = memoryview(mapping)
+    num_buffers, payload_size = _SHARED_HEADER.unpack_from(view)
+    offset = _SHARED_HEADER.size
+    lengths = struct.unpack_from(f"<{num_buffers}Q", view, offset)
+    offset += 8 * num_buffers
+    payload = view[offset : offset + payload_size]
+    offset += payload_size
+    buffers = []
+    for length in lengths:
+        offset += -offset % _SHARED_ALIGNMENT
+        buffers.append(view[offset : offset + length])
+        offset += length
+    return pickle.loads(payload, buffers=buffers)
+
+
+def _row_chunks(shape, chunk_size):
+    """
+    (start, stop) rows of each chunk, the whole value without chunk_size.
+    """
+    if not shape:
+        return [(None, None)]
+    rows = shape[0]
+    step = chunk_size or rows or 1
+    return [(start, min(start + step, rows)) for start in range(0, rows or 1, step)]
+
+
+# Run on the engines.
+def _engine_hostname():
+    return socket.gethostname()
+
+
+def _write_shared_on_engine(name, payload, *buffers):
+    path = os.path.join(shared_dir(), name)
+    write_shared(path, payload, buffers)
+    return path
+
+
+def _load_shared_on_engine(path):
+    get_ipython().user_ns.update(load_shared(path))
+
+
+def _remove_shared_on_engine(path):
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def _describe_on_engine(name, as_tensor):
+    """
+    Rank of the engine, with the shape and dtype of variable ``name`` seen as
+    a tensor if ``as_tensor``.
+    """
+    import torch
+    import torch.distributed as dist
+
+    if not (dist.is_available() and dist.is_initialized()):
+        raise RuntimeError(
+            "pull(..., reduce=...) goes through the process group of the engines. "
+            "Call idr_torch.init_process_group() on the engines first."
+        )
+    if not as_tensor:
+        return dist.get_rank(), None, None
+    tensor = torch.as_tensor(get_ipython().user_ns[name])
+    return dist.get_rank(), tuple(tensor.shape), tensor.dtype
+
+
+def _reduce_on_engine(name, reduce, pieces):
+    """
+    Reduces variable ``name`` of every rank on rank 0, which alone returns
+    the result. ``pieces`` lists the (rank, start, stop, shape) slices of
+    rows to reduce: all ranks for sum and mean, one after the other for cat.
+    """
+    import torch
+    import torch.distributed as dist
+
+    rank = dist.get_rank()
+    value = get_ipython().user_ns[name]
+    if callable(reduce):
+        values = [None] * dist.get_world_size() if rank == 0 else None
+        dist.gather_object(value, values, dst=0)
+        return reduce(values) if rank == 0 else None
+    device = torch.device("cpu")
+    if dist.get_backend() == "nccl":
+        device = torch.device("cuda", torch.cuda.current_device())
+    tensor = torch.as_tensor(value)
+    if reduce != "cat":
+        _, start, stop, _ = pieces[0]
+        if start is not None:
+            tensor = tensor[start:stop]
+        tensor = tensor.to(device, copy=True)
+        dist.reduce(tensor, dst=0)
+        if rank != 0:
+            return None
+        return (tensor / dist.get_world_size() if reduce == "mean" else tensor).cpu()
+    tensor = tensor.reshape(1) if tensor.dim() == 0 else tensor
+    received = []
+    for src, start, stop, shape in pieces:
+        if src == rank == 0:
+            received.append(tensor[start:stop].to("cpu", copy=True))
+        elif src == rank:
+            dist.send(tensor[start:stop].to(device).contiguous(), dst=0)
+        elif rank == 0:
+            buffer = torch.empty(shape, dtype=tensor.dtype, device=device)
+            dist.recv(buffer, src=src)
+            received.append(buffer.cpu())
+    return torch.cat(received) if rank == 0 else None
+
+
 class ParallelInterface:
     def __init__(self):
         super().__init__()
@@ -93,6 +351,7 @@ class ParallelInterface:
         self.setup_signal_handlers()
         self.controller_process = None
         self.engine_process = None
+        self.startup_times: Dict[str, float] = {}
 
     @cached_property
     def host(self) -> str:
@@ -114,6 +373,14 @@ class ParallelInterface:
         ipython = get_ipython()
         return ipython.magics_manager.magics["line"]["autopx"].__self__
 
+    @cached_property
+    def engines_per_node(self) -> Dict[str, List[int]]:
+        hosts = self.rc[:].apply_async(_engine_hostname).get_dict()
+        nodes: Dict[str, List[int]] = {}
+        for engine, host in sorted(hosts.items()):
+            nodes.setdefault(host, []).append(engine)
+        return nodes
+
     def kill_process(self, process: subprocess.Popen) -> None:
         if process and process.poll() is None:
             process.terminate()
@@ -134,6 +401,9 @@ class ParallelInterface:
 
             self.controller_process = self.kill_process(self.controller_process)
             self.engine_process = self.kill_process(self.engine_process)
+            # Bound to the client and engines which were just shut down.
+            self.__dict__.pop("ipp_magics_manager", None)
+            self.__dict__.pop("engines_per_node", None)
             self.launched = False
 
     def setup_signal_handlers(self):
@@ -142,46 +412,104 @@ class ParallelInterface:
             signal.signal(signum, signal.SIG_DFL)
             os.kill(os.getpid(), signum)
 
-        atexit.register(self.cleanup)
+        atexit.register(lambda: self.cleanup() if self.launched else None)
         signal.signal(signal.SIGTERM, handler)
         signal.signal(signal.SIGINT, handler)
 
+    def remove_connection_files(self) -> None:
+        """
+        Connection files left by a controller which did not exit cleanly
+        would be picked up by the engines started alongside the new one.
+        """
+        from IPython.paths import get_ipython_dir
+
+        security = os.path.join(get_ipython_dir(), "profile_default", "security")
+        for kind in ("client", "engine"):
+            name = f"ipcontroller-{self.cluster_id}-{kind}.json"
+            path = os.path.join(security, name)
+            if os.path.exists(path):
+                os.remove(path)
+
     def launch_controller(self) -> None:
         self.controller_process = subprocess.Popen(
             ["ipcontroller", "--ip", self.host, "--cluster-id", self.cluster_id],
             stderr=subprocess.PIPE,
         )
-        buffer_accumulator = ""
-        while True:
-            new_output = self.controller_process.stderr.read(1).decode("utf-8")
-            if new_output == "\n":
-                if "subscription started" in buffer_accumulator:
-                    break
-            else:
-                buffer_accumulator += new_output
-        print("Controller started")
-
-    def launch_engines(self) -> None:
+
+    def launch_engines(self, timeout: float = STARTUP_TIMEOUT) -> None:
+        # Engines wait for the connection file of the controller, so they can
+        # be started at the same time.
         self.engine_process = subprocess.Popen(
-            ["srun", "ipengine", "--cluster-id", self.cluster_id],
+            [
+                "srun",
+                "ipengine",
+                "--cluster-id",
+                self.cluster_id,
+                f"--IPEngine.wait_for_url_file={timeout}",
+            ],
             stderr=subprocess.PIPE,
         )
-        buffer_accumulator = ""
-        num_registered_engines = 0
-        while True:
-            new_output = self.engine_process.stderr.read(1).decode("utf-8")
-            if new_output == "\n":
-                if "Completed registration" in buffer_accumulator:
-                    num_registered_engines += 1
-                    if num_registered_engines == int(os.environ["SLURM_NTASKS"]):
-                        break
-            else:
-                buffer_accumulator += new_output
-        print("All Engines started")
 
-    def launch_client(self) -> ipp.Client:
+    def launch_client(self) -> Future:
+        """
+        Connects to the controller. Returns a future resolved once every
+        engine has registered, as notified by the controller.
+        """
         self.rc = ipp.Client(cluster_id=self.cluster_id)
-        self.rc.wait_for_engines(n=self.num_engines, interactive=False)
+        # Only the first client of a session activates the magics by itself.
+        self.rc.activate()
+        return self.rc.wait_for_engines(
+            n=self.num_engines, block=False, interactive=False
+        )
+
+    def wait_for_startup(self, start: float, deadline: float) -> None:
+        """
+        Follows the output of the controller and of the engines until the
+        controller is ready, then connects the client while the engines keep
+        starting and waits for their registration. Fails as soon as one of
+        the processes exits, or at ``deadline``.
+        """
+        controller = ProcessOutput("ipcontroller", self.controller_process)
+        engines = ProcessOutput("srun ipengine", self.engine_process)
+        registered: Optional[Future] = None
+        # Written to by the client once every engine has registered.
+        wake_up, notify = socket.socketpair()
+
+        def notify_registered(_: Future) -> None:
+            with suppress(OSError):
+                notify.send(b"\0")
+
+        with selectors.DefaultSelector() as selector, wake_up, notify:
+            selector.register(controller.fd, selectors.EVENT_READ, controller)
+            selector.register(engines.fd, selectors.EVENT_READ, engines)
+            selector.register(wake_up, selectors.EVENT_READ, None)
+            while registered is None or not registered.done():
+                remaining = deadline - time.perf_counter()
+                events = selector.select(remaining) if remaining > 0 else []
+                if not events:
+                    late = controller if registered is None else engines
+                    raise TimeoutError(
+                        late.failure(f"did not start within {deadline - start:.0f}s")
+                    )
+                for output in (key.data for key, _ in events if key.data):
+                    lines = output.read_lines()
+                    if lines is None:
+                        code = output.process.poll()
+                        raise RuntimeError(
+                            output.failure(f"exited (code {code}) during startup")
+                        )
+                    if registered is None and output is controller:
+                        if any("subscription started" in line for line in lines):
+                            now = time.perf_counter()
+                            self.startup_times["controller"] = now - start
+                            print("Controller started")
+                            registered = self.launch_client()
+                            registered.add_done_callback(notify_registered)
+            registered.result()
+        controller.drain()
+        engines.drain()
+        self.startup_times["engines"] = time.perf_counter() - start
+        print("All Engines started")
 
     @staticmethod
     def on_client_start() -> None:
@@ -191,12 +519,24 @@ class ParallelInterface:
         idr_torch.notebook.__IS_MASTER__ = False
 
     @dependent_on_ipyparallel
-    def launch(self) -> None:
+    def launch(self, timeout: float = STARTUP_TIMEOUT) -> None:
+        start = time.perf_counter()
+        self.startup_times = {}
+        self.remove_connection_files()
         self.launch_controller()
-        self.launch_engines()
-        self.launch_client()
+        self.launch_engines(timeout)
+        try:
+            self.wait_for_startup(start, start + timeout)
+        except BaseException:
+            if self.rc is not None:
+                self.rc.close()
+                self.rc = None
+            self.controller_process = self.kill_process(self.controller_process)
+            self.engine_process = self.kill_process(self.engine_process)
+            raise
         on_client_start = getsource(self.on_client_start, ignore_first_n_lines=2)
-        self.ipp_magics_manager.parallel_execute(on_client_start)
+        self.ipp_magics_manager.parallel_execute(on_client_start, block=True)
+        self.startup_times["first_cell"] = time.perf_counter() - start
         self.launched = True
         self.enable()
 
@@ -217,7 +557,67 @@ class ParallelInterface:
     @dependent_on_ipyparallel
     @only_if_launched
     @only_on_master
-    def pull(self, *names: str) -> dict[str, list[Any]]:
+    def push_shared(self, D: dict[str, Any] = {}, **kwargs: Any) -> None:
+        """
+        Same as push, for large objects. They are pickled once (protocol 5)
+        and sent once per node, to one of its engines which writes them to
+        shared memory (see shared_dir). Every engine of the node then maps
+        them: NumPy arrays and CPU tensors are zero-copy views, copied on
+        write. Tensor subclasses are too, unless they define their own
+        pickling: nn.Parameter is, as it pickles a plain tensor.
+        """
+        _dict: dict[str, Any] = {}
+        _dict.update(D)
+        _dict.update(kwargs)
+        payload, buffers = dumps_shared(_dict)
+        raw_buffers = [buffer.raw() for buffer in buffers]
+        name = f"idr_torch_push_{uuid.uuid4().hex}"
+        nodes = self.engines_per_node
+        writes = {
+            host: self.rc[engines[0]].apply_async(
+                _write_shared_on_engine, name, payload, *raw_buffers
+            )
+            for host, engines in nodes.items()
+        }
+        paths = {host: write.get() for host, write in writes.items()}
+        try:
+            loads = [
+                self.rc[engines].apply_async(_load_shared_on_engine, paths[host])
+                for host, engines in nodes.items()
+            ]
+            for load in loads:
+                load.get()
+        finally:
+            # Mappings outlive the files.
+            removals = [
+                self.rc[nodes[host][0]].apply_async(_remove_shared_on_engine, path)
+                for host, path in paths.items()
+            ]
+            for removal in removals:
+                removal.get()
+
+    @dependent_on_ipyparallel
+    @only_if_launched
+    @only_on_master
+    def pull(
+        self,
+        *names: str,
+        reduce: Union[str, Callable[[List[Any]], Any], None] = None,
+        chunk_size: Optional[int] = None,
+    ) -> dict[str, Any]:
+        """
+        Gathers each variable from every engine, as a list in engine order.
+
+        With ``reduce``, the variables are reduced on the engines through
+        their process group (see idr_torch.init_process_group) and only the
+        result comes back: "sum" or "mean" over the ranks, "cat" of the
+        ranks along the first dimension, in rank order, or a callable given
+        the list of every rank's value. With ``chunk_size`` (sum, mean and
+        cat only), each variable is an iterator over the result, at most
+        ``chunk_size`` rows at a time, reduced as it is consumed.
+        """
+        if reduce is not None:
+            return {name: self._reduce(name, reduce, chunk_size) for name in names}
         gathered = self.rc[:].pull(names, block=True)
         output: dict[str, list[Any]] = {}
         for idx, name in enumerate(names):
@@ -226,11 +626,58 @@ class ParallelInterface:
                 output[name].append(gathered[rank][idx])
         return output
 
+    def _reduce(
+        self,
+        name: str,
+        reduce: Union[str, Callable[[List[Any]], Any]],
+        chunk_size: Optional[int],
+    ) -> Any:
+        if not callable(reduce) and reduce not in REDUCTIONS:
+            raise ValueError(f"reduce must be one of {REDUCTIONS} or a callable.")
+        if chunk_size is not None and (callable(reduce) or chunk_size < 1):
+            raise ValueError("chunk_size must be positive, for sum, mean or cat.")
+        view = self.rc[:]
+        described = view.apply_async(
+            _describe_on_engine, name, not callable(reduce)
+        ).get_dict()
+        root = next(engine for engine, (rank, *_) in described.items() if rank == 0)
+        shapes = {rank: shape for rank, shape, _ in described.values()}
+        dtypes = {dtype for _, _, dtype in described.values()}
+        if len(dtypes) > 1:
+            raise ValueError(
+                f"{name} does not have the same dtype on all ranks: "
+                f"{', '.join(sorted(map(str, dtypes)))}."
+            )
+        if callable(reduce):
+            pieces = []
+        elif reduce == "cat":
+            pieces = [
+                (rank, start, stop, (stop - start,) + shape[1:])
+                for rank, shape in sorted(shapes.items())
+                for start, stop in _row_chunks(shape or (1,), chunk_size)
+            ]
+        else:
+            if len(set(shapes.values())) > 1:
+                raise ValueError(f"{name} does not have the same shape on all ranks.")
+            pieces = [
+                (0, start, stop, None)
+                for start, stop in _row_chunks(shapes[0], chunk_size)
+            ]
+
+        def reduced(pieces: List[Tuple]) -> Any:
+            result = view.apply_async(_reduce_on_engine, name, reduce, pieces)
+            return result.get_dict()[root]
+
+        if chunk_size is None:
+            return reduced(pieces)
+        return (reduced([piece]) for piece in pieces)
+
 
 _parallel_interface = ParallelInterface()
 
 enable = _parallel_interface.enable
 launch = _parallel_interface.launch
 push = _parallel_interface.push
+push_shared = _parallel_interface.push_shared
 pull = _parallel_interface.pull
 cleanup = _parallel_interface.cleanup
@@ -0,0 +1,134 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import socket
+import time
+import zlib
+from contextlib import closing
+from typing import Iterable, Iterator, Optional
+
+PORT_RANGE_START: int = 10000
+PORT_RANGE_SIZE: int = 20000
+# Published ports older than this are removed by the next master.
+STALE_AFTER: float = 7 * 24 * 3600
+# "<key>=<port>" selected by this process, inherited by its children.
+ENV_VARIABLE = "IDR_TORCH_MASTER_PORT"
+
+
+def port_dir() -> str:
+    """
+    Directory shared by all nodes in which the master publishes its port.
+    Can be changed with IDR_TORCH_PORT_DIR.
+    """
+    default = os.path.join(os.path.expanduser("~"), ".cache", "idr_torch", "ports")
+    return os.environ.get("IDR_TORCH_PORT_DIR", default)
+
+
+def port_timeout() -> float:
+    return float(os.environ.get("IDR_TORCH_PORT_TIMEOUT", 60))
+
+
+def candidate_ports(key: str, /, num_candidates: int = 64) -> Iterator[int]:
+    """
+    Deterministic sequence of ports derived from ``key``. Different keys
+    (jobs, steps, array tasks) start at different points of the range.
+    """
+    start = zlib.crc32(key.encode("utf-8"))
+    for i in range(num_candidates):
+        yield PORT_RANGE_START + (start + i) % PORT_RANGE_SIZE
+
+
+def is_port_available(port: int, /, host: str = "") -> bool:
+    with closing(socket.socket(socket.AF_INET, socket.SOCK_STREAM)) as sock:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            sock.bind((host, port))
+        except OSError:
+            return False
+    return True
+
+
+def read_published_port(key: str) -> Optional[int]:
+    try:
+        with open(os.path.join(port_dir(), key), "r") as file:
+            return int(file.read())
+    except (OSError, ValueError):
+        return None
+
+
+def publish_port(key: str, port: int) -> None:
+    directory = port_dir()
+    os.makedirs(directory, exist_ok=True)
+    now = time.time()
+    for entry in os.scandir(directory):
+        try:
+            if now - entry.stat().st_mtime > STALE_AFTER:
+                os.remove(entry.path)
+        except OSError:
+            pass
+    path = os.path.join(directory, key)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as file:
+        file.write(str(port))
+    os.replace(tmp_path, path)
+
+
+def wait_for_published_port(key: str, /, timeout: float) -> Optional[int]:
+    deadline = time.monotonic() + timeout
+    delay = 0.01
+    while True:
+        port = read_published_port(key)
+        if port is not None or time.monotonic() > deadline:
+            return port
+        time.sleep(delay)
+        delay = min(delay * 2, 0.5)
+
+
+def inherited_port(key: str) -> Optional[int]:
+    """
+    Port selected for ``key`` by a parent process (e.g. a DataLoader worker or
+    an mp.spawn child of the master), if any.
+    """
+    inherited_key, _, port = os.environ.get(ENV_VARIABLE, "").rpartition("=")
+    if inherited_key != key or not port.isdigit():
+        return None
+    return int(port)
+
+
+def select_port(key: str, candidates: Iterable[int], /, is_master: bool) -> int:
+    """
+    The master takes the first available candidate and publishes it, replacing
+    whatever was published before for this key. The other ranks wait for it
+    and raise a TimeoutError after IDR_TORCH_PORT_TIMEOUT seconds. Child
+    processes reuse the port selected by their parent.
+    """
+    port = inherited_port(key)
+    if port is not None:
+        return port
+
+    candidates = list(candidates)
+    if is_master:
+        for port in candidates:
+            if is_port_available(port):
+                break
+        else:
+            raise RuntimeError(f"None of the ports {candidates} is available.")
+        try:
+            publish_port(key, port)
+        except OSError as error:
+            raise RuntimeError(
+                f"Could not publish the master port in {port_dir()}, the other "
+                "ranks cannot find it. Set IDR_TORCH_PORT_DIR to a directory "
+                "shared by all nodes."
+            ) from error
+    else:
+        port = wait_for_published_port(key, timeout=port_timeout())
+        if port is None:
+            raise TimeoutError(
+                f"The master did not publish its port in {port_dir()} within "
+                f"{port_timeout()}s (see IDR_TORCH_PORT_TIMEOUT). Is "
+                "IDR_TORCH_PORT_DIR shared by all nodes?"
+            )
+    os.environ[ENV_VARIABLE] = f"{key}={port}"
+    return port
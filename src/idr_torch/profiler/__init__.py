@@ -1,3 +1,27 @@
+from typing import TYPE_CHECKING, Any
+
 from torch.profiler import *  # noqa: F403
 
+from .clock import clock_sync as clock_sync
 from .patch_kineto import tensorboard_trace_handler as tensorboard_trace_handler
+from .selective import NullProfiler as NullProfiler
+from .selective import profiled_ranks as profiled_ranks
+from .selective import selective_profile as selective_profile
+
+if TYPE_CHECKING:
+    from .analyze import analyze_traces as analyze_traces
+    from .merge import merge_traces as merge_traces
+
+# Also run as scripts (python -m idr_torch.profiler.merge ...): only imported
+# when used, so runpy does not find them already loaded.
+_lazy_attributes = {"analyze_traces": ".analyze", "merge_traces": ".merge"}
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _lazy_attributes:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+
+    value = getattr(import_module(_lazy_attributes[name], __name__), name)
+    globals()[name] = value
+    return value
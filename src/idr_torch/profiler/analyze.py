@@ -0,0 +1,289 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Summarizes traces written by idr_torch.profiler: hot operators, GPU time per
+kernel category, step times, communication/computation overlap and ranks
+deviating from the median.
+
+    python -m idr_torch.profiler.analyze logs/rank*.10.pt.trace.json.gz --json a.json
+"""
+
+import argparse
+import json
+from array import array
+from statistics import median
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .trace import HEADER_KEY, iter_trace
+
+# GPU kernels are split into these categories.
+KERNEL_CATEGORIES = ("communication", "gemm", "other")
+_GEMM_MARKERS = ("gemm", "cutlass", "cublas", "matmul", "wgmma")
+STEP_PREFIX = "ProfilerStep#"
+# Metrics compared across ranks.
+RANK_METRICS = ("step_mean_us", "compute_us", "communication_us", "exposed_comm_us")
+
+
+def kernel_category(name: str) -> str:
+    name = name.lower()
+    if "nccl" in name:
+        return "communication"
+    if any(marker in name for marker in _GEMM_MARKERS):
+        return "gemm"
+    return "other"
+
+
+class IntervalSet(object):
+    """
+    Union of time intervals, stored in arrays. Intervals are merged every
+    ``compact_every`` additions, so memory is proportional to the number of
+    disjoint busy periods rather than to the number of events.
+    """
+
+    def __init__(self, compact_every: int = 1 << 20):
+        self.starts = array("d")
+        self.ends = array("d")
+        self.compact_every = compact_every
+        self._sorted = 0
+
+    def add(self, start: float, end: float) -> None:
+        self.starts.append(start)
+        self.ends.append(end)
+        if len(self.starts) - self._sorted >= self.compact_every:
+            self.compact()
+
+    def compact(self) -> None:
+        order = sorted(range(len(self.starts)), key=self.starts.__getitem__)
+        starts, ends = array("d"), array("d")
+        for i in order:
+            start, end = self.starts[i], self.ends[i]
+            if ends and start <= ends[-1]:
+                ends[-1] = max(ends[-1], end)
+            else:
+                starts.append(start)
+                ends.append(end)
+        self.starts, self.ends = starts, ends
+        self._sorted = len(starts)
+
+    def total(self) -> float:
+        self.compact()
+        return sum(end - start for start, end in zip(self.starts, self.ends))
+
+    def intersection(self, other: "IntervalSet") -> float:
+        self.compact()
+        other.compact()
+        total, i, j = 0.0, 0, 0
+        while i < len(self.starts) and j < len(other.starts):
+            start = max(self.starts[i], other.starts[j])
+            end = min(self.ends[i], other.ends[j])
+            if end > start:
+                total += end - start
+            if self.ends[i] < other.ends[j]:
+                i += 1
+            else:
+                j += 1
+        return total
+
+
+def analyze_trace(path: str, /, top: int = 20) -> Dict[str, Any]:
+    """
+    Summary of a single trace, computed in one streaming pass.
+    """
+    header: Dict[str, Any] = {}
+    ops: Dict[str, List[float]] = {}
+    categories: Dict[str, float] = {}
+    kernels: Dict[str, float] = dict.fromkeys(KERNEL_CATEGORIES, 0.0)
+    steps: List[float] = []
+    busy = {category: IntervalSet() for category in ("communication", "compute")}
+
+    for key, event in iter_trace(path):
+        if key == HEADER_KEY:
+            header = event
+            continue
+        if key != "traceEvents" or event.get("ph", None) != "X":
+            continue
+        duration = event.get("dur", None)
+        if not isinstance(duration, (int, float)):
+            continue
+        category = event.get("cat", "")
+        name = event.get("name", "")
+        categories[category] = categories.get(category, 0.0) + duration
+        if category in ("cpu_op", "user_annotation"):
+            if name.startswith(STEP_PREFIX):
+                steps.append(duration)
+                continue
+            total = ops.get(name, None)
+            if total is None:
+                ops[name] = [duration, 1]
+            else:
+                total[0] += duration
+                total[1] += 1
+        elif category == "kernel":
+            kind = kernel_category(name)
+            kernels[kind] += duration
+            start = event.get("ts", 0.0)
+            busy["communication" if kind == "communication" else "compute"].add(
+                start, start + duration
+            )
+
+    communication = busy["communication"].total()
+    overlap = busy["communication"].intersection(busy["compute"])
+    hot_ops = sorted(ops.items(), key=lambda item: item[1][0], reverse=True)[:top]
+    return dict(
+        path=path,
+        rank=header.get("rank", None),
+        hostname=header.get("hostname", None),
+        ops=[
+            dict(name=name, total_us=total, count=int(count))
+            for name, (total, count) in hot_ops
+        ],
+        categories=dict(sorted(categories.items(), key=lambda item: -item[1])),
+        kernels=kernels,
+        steps_us=steps,
+        step_mean_us=sum(steps) / len(steps) if steps else None,
+        compute_us=busy["compute"].total(),
+        communication_us=communication,
+        overlap_us=overlap,
+        exposed_comm_us=communication - overlap,
+    )
+
+
+def _deviations(summaries: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Median of each metric over the ranks and relative deviation of each rank.
+    """
+    deviations: Dict[str, Dict[str, Any]] = {}
+    for metric in RANK_METRICS:
+        values = [(s[metric], s["rank"]) for s in summaries if s[metric] is not None]
+        if not values:
+            continue
+        middle = median(value for value, _ in values)
+        per_rank = {
+            rank: (value - middle) / middle if middle else 0.0 for value, rank in values
+        }
+        deviations[metric] = dict(
+            median=middle,
+            per_rank=dict(sorted(per_rank.items(), key=lambda item: -abs(item[1]))),
+        )
+    return deviations
+
+
+def analyze_traces(
+    paths: Sequence[str], /, workers: Optional[int] = None, top: int = 20
+) -> Dict[str, Any]:
+    """
+    Analyzes every trace (one per rank) in a pool of processes, then compares
+    the ranks with each other.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    if workers == 1 or len(paths) == 1:
+        summaries = [analyze_trace(path, top=top) for path in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            summaries = list(
+                pool.map(analyze_trace, paths, [top] * len(paths), chunksize=1)
+            )
+    for index, summary in enumerate(summaries):
+        if summary["rank"] is None:
+            summary["rank"] = index
+    summaries.sort(key=lambda summary: summary["rank"])
+    return dict(ranks=summaries, deviations=_deviations(summaries))
+
+
+def _table(rows: List[Tuple], header: Tuple) -> List[str]:
+    widths = [max(len(str(cell)) for cell in column) for column in zip(header, *rows)]
+    return [
+        "  ".join(
+            str(cell).ljust(width) if i == 0 else str(cell).rjust(width)
+            for i, (cell, width) in enumerate(zip(row, widths))
+        )
+        for row in [header, *rows]
+    ]
+
+
+def format_report(report: Dict[str, Any], /, top: int = 10) -> str:
+    ranks = report["ranks"]
+    lines: List[str] = ["Per rank (us)"]
+    lines += _table(
+        [
+            (
+                summary["rank"],
+                f"{summary['step_mean_us'] or 0:.0f}",
+                len(summary["steps_us"]),
+                f"{summary['compute_us']:.0f}",
+                f"{summary['communication_us']:.0f}",
+                f"{summary['overlap_us']:.0f}",
+                f"{summary['exposed_comm_us']:.0f}",
+            )
+            for summary in ranks
+        ],
+        ("rank", "mean step", "steps", "compute", "comm", "overlap", "exposed comm"),
+    )
+
+    lines += ["", "Deviation from the median"]
+    rows = []
+    for metric, deviation in report["deviations"].items():
+        worst = list(deviation["per_rank"].items())[:3]
+        rows.append(
+            (
+                metric,
+                f"{deviation['median']:.0f}",
+                ", ".join(f"{rank}: {value:+.1%}" for rank, value in worst),
+            )
+        )
+    lines += _table(rows, ("metric", "median", "largest deviations"))
+
+    ops: Dict[str, List[float]] = {}
+    categories: Dict[str, float] = {}
+    kernels: Dict[str, float] = {}
+    for summary in ranks:
+        for op in summary["ops"]:
+            total = ops.setdefault(op["name"], [0.0, 0])
+            total[0] += op["total_us"]
+            total[1] += op["count"]
+        for name, value in summary["categories"].items():
+            categories[name] = categories.get(name, 0.0) + value
+        for name, value in summary["kernels"].items():
+            kernels[name] = kernels.get(name, 0.0) + value
+
+    lines += ["", "Hot operators (all ranks)"]
+    hot_ops = sorted(ops.items(), key=lambda item: -item[1][0])[:top]
+    lines += _table(
+        [(name[:60], f"{total:.0f}", count) for name, (total, count) in hot_ops],
+        ("operator", "total (us)", "calls"),
+    )
+    lines += ["", "Time per category (all ranks)"]
+    lines += _table(
+        [(name, f"{value:.0f}") for name, value in categories.items()]
+        + [(f"kernel/{name}", f"{value:.0f}") for name, value in kernels.items()],
+        ("category", "total (us)"),
+    )
+    return "\n".join(lines)
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m idr_torch.profiler.analyze",
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("paths", nargs="+", help="Traces to analyze, one per rank.")
+    parser.add_argument("--json", default=None, help="Writes the full report there.")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--top", type=int, default=20)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    args = parse_args(argv)
+    report = analyze_traces(args.paths, workers=args.workers, top=args.top)
+    print(format_report(report, top=args.top))
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import time
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    import torch.distributed as dist
+
+_clock_sync_ns: Optional[int] = None
+
+
+def clock_sync(group: Optional["dist.ProcessGroup"] = None) -> int:
+    """
+    Collective: every rank leaves a barrier at (almost) the same instant and
+    records the wall-clock time it sees then. This time is stored in the
+    header of the next traces written by tensorboard_trace_handler and lets
+    merge_traces align the clocks of the ranks. Should be called by every
+    rank once profiling starts.
+    """
+    import torch.distributed as dist
+
+    global _clock_sync_ns
+    if dist.is_available() and dist.is_initialized():
+        dist.barrier(group=group)
+    # Same clock as Kineto's timestamps (Unix time).
+    _clock_sync_ns = time.time_ns()
+    return _clock_sync_ns
+
+
+def last_clock_sync() -> Optional[int]:
+    return _clock_sync_ns
@@ -0,0 +1,144 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from bisect import bisect_right
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+STEP_PREFIX = "ProfilerStep#"
+# Pseudo-category selecting collectives (CPU ops and kernels) by their name.
+NCCL_CATEGORY = "nccl"
+# Flows linking a launch to its kernel, their id is the correlation id.
+LAUNCH_FLOW_CATEGORY = "ac2g"
+
+
+class EventFilter(object):
+    """
+    Selects the events kept when a trace is rewritten:
+
+    - ``min_duration_us``: complete events shorter than that are dropped,
+    - ``categories``: only events of these categories are kept, as named
+      after the category rewrite (``cpu_op``, ``kernel``, ``gpu_memcpy``...).
+      ``"nccl"`` selects the events whose name contains nccl, whatever their
+      category,
+    - ``sample_steps``: only one profiler step out of ``sample_steps`` is
+      kept. Device events follow the step which launched them.
+
+    Metadata events (process and thread names...) and the ProfilerStep#
+    events of the kept steps are always kept, so the trace stays readable by
+    TensorBoard.
+    """
+
+    def __init__(
+        self,
+        min_duration_us: Optional[float] = None,
+        categories: Optional[Iterable[str]] = None,
+        sample_steps: int = 1,
+    ):
+        if sample_steps < 1:
+            raise ValueError(f"sample_steps must be positive, got {sample_steps}.")
+        self.min_duration_us = min_duration_us
+        self.categories = None if categories is None else frozenset(categories)
+        self.sample_steps = sample_steps
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(min_duration_us={self.min_duration_us}, "
+            f"categories={self.categories}, sample_steps={self.sample_steps})"
+        )
+
+    def predicate(self) -> Callable[[Dict[str, Any]], bool]:
+        """
+        Function telling whether an event is kept, to be called on the events
+        of a trace in order, in a single pass.
+        """
+        min_duration = self.min_duration_us
+        categories = self.categories
+        nccl = categories is not None and NCCL_CATEGORY in categories
+        in_kept_step = StepSampler(self.sample_steps) if self.sample_steps > 1 else None
+
+        def keep(event: Dict[str, Any]) -> bool:
+            phase = event.get("ph", None)
+            if phase == "M":
+                return True
+            if in_kept_step is not None and not in_kept_step(event):
+                return False
+            name = event.get("name", None)
+            if isinstance(name, str) and name.startswith(STEP_PREFIX):
+                return True
+            if categories is not None and event.get("cat", None) not in categories:
+                if not (nccl and isinstance(name, str) and "nccl" in name.lower()):
+                    return False
+            if min_duration is not None and phase == "X":
+                duration = event.get("dur", None)
+                if isinstance(duration, (int, float)) and duration < min_duration:
+                    return False
+            return True
+
+        return keep
+
+
+class StepSampler(object):
+    """
+    Tells whether an event belongs to one of the kept profiler steps (one out
+    of ``sample_steps``), while the events of a trace are read in order.
+
+    Kineto writes host events sorted by start time, so each ProfilerStep#
+    event comes before the events it contains, and device events come after
+    the launch sharing their correlation id. Correlation ids grow with the
+    launches: a new id is a launch, decided from the step it falls in, and
+    an id already seen follows its launch. Launches are only remembered as
+    runs of consecutive ids sharing the same decision, so memory grows with
+    the number of steps, not of events.
+    """
+
+    __slots__ = (
+        "sample_steps",
+        "starts",
+        "ends",
+        "run_starts",
+        "run_kept",
+        "last_launch",
+    )
+
+    def __init__(self, sample_steps: int):
+        self.sample_steps = sample_steps
+        # Steps seen so far, sorted by start.
+        self.starts: List[float] = []
+        self.ends: List[float] = []
+        # First correlation id of each run of launches, and their decision.
+        self.run_starts: List[int] = []
+        self.run_kept: List[bool] = []
+        self.last_launch = -1
+
+    def __call__(self, event: Dict[str, Any]) -> bool:
+        args = event.get("args", None)
+        correlation = args.get("correlation", None) if args else None
+        if correlation is None and event.get("cat", None) == LAUNCH_FLOW_CATEGORY:
+            correlation = event.get("id", None)
+        if isinstance(correlation, int) and correlation <= self.last_launch:
+            run = bisect_right(self.run_starts, correlation) - 1
+            if run >= 0:
+                return self.run_kept[run]
+
+        ts = event.get("ts", None)
+        name = event.get("name", None)
+        if isinstance(name, str) and name.startswith(STEP_PREFIX) and ts is not None:
+            self._add_step(float(ts), float(ts) + float(event.get("dur", 0)))
+        kept = self._in_kept_step(ts)
+        if isinstance(correlation, int) and correlation > self.last_launch:
+            self.last_launch = correlation
+            if not self.run_kept or kept != self.run_kept[-1]:
+                self.run_starts.append(correlation)
+                self.run_kept.append(kept)
+        return kept
+
+    def _add_step(self, start: float, end: float) -> None:
+        index = bisect_right(self.starts, start)
+        if index == 0 or self.starts[index - 1] != start:
+            self.starts.insert(index, start)
+            self.ends.insert(index, end)
+
+    def _in_kept_step(self, ts: Optional[float]) -> bool:
+        index = -1 if ts is None else bisect_right(self.starts, ts) - 1
+        # Events outside of every known step (setup, gaps) are kept.
+        return index < 0 or ts >= self.ends[index] or index % self.sample_steps == 0
@@ -0,0 +1,186 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Merges the per-rank traces written by idr_torch.profiler's
+tensorboard_trace_handler into a single timeline, with one group of lanes
+per rank.
+
+    python -m idr_torch.profiler.merge -o merged.json.gz logs/rank*.10.pt.trace.json.gz
+"""
+
+import argparse
+import json
+import warnings
+from typing import Any, Dict, List, Optional, Sequence
+
+from ..utils import IdrTorchWarning
+from .trace import EventWriter, iter_trace, open_trace, read_header
+
+# Lanes of rank r get the pids r * PID_STRIDE, r * PID_STRIDE + 1...
+PID_STRIDE: int = 1000
+# Flow ids (arrows between events) are made unique across ranks.
+FLOW_ID_STRIDE: int = 1 << 32
+_FLOW_PHASES = ("s", "t", "f")
+
+
+def rank_label(header: Dict[str, Any]) -> str:
+    label = f"rank {header['rank']}"
+    if header.get("node_rank") is not None:
+        label += f" | node {header['node_rank']}"
+        if header.get("hostname"):
+            label += f" ({header['hostname']})"
+    if header.get("local_rank") is not None:
+        label += f" | local_rank {header['local_rank']}"
+    return label
+
+
+def clock_shift(header: Dict[str, Any], reference: Dict[str, Any]) -> float:
+    """
+    Shift (in µs) bringing the timestamps of a rank, relative to its own
+    base time, into the clock of ``reference`` relative to the reference's
+    base time. Clocks are aligned on the clock_sync records when both ranks
+    have one, otherwise wall clocks are trusted.
+    """
+    shift_ns = header.get("base_time_ns") or 0
+    shift_ns -= reference.get("base_time_ns") or 0
+    sync = header.get("clock_sync_ns")
+    reference_sync = reference.get("clock_sync_ns")
+    if sync is not None and reference_sync is not None:
+        shift_ns += reference_sync - sync
+    return shift_ns / 1000
+
+
+def _merge_rank(
+    path: str, rank: int, label: str, shift: float, writer: EventWriter
+) -> int:
+    pids: Dict[Any, int] = {}
+
+    def lane(pid: Any) -> int:
+        new_pid = pids.get(pid, None)
+        if new_pid is None:
+            new_pid = pids[pid] = rank * PID_STRIDE + len(pids)
+            writer.write(
+                dict(
+                    ph="M",
+                    name="process_name",
+                    pid=new_pid,
+                    tid=0,
+                    args=dict(name=f"{label} | {pid}"),
+                )
+            )
+            writer.write(
+                dict(
+                    ph="M",
+                    name="process_sort_index",
+                    pid=new_pid,
+                    tid=0,
+                    args=dict(sort_index=new_pid),
+                )
+            )
+        return new_pid
+
+    num_events = 0
+    for key, event in iter_trace(path):
+        if key != "traceEvents" or not isinstance(event, dict):
+            continue
+        phase = event.get("ph", None)
+        if "pid" in event:
+            event["pid"] = lane(event["pid"])
+        if phase == "M":
+            name = event.get("name", None)
+            if name == "process_sort_index":
+                continue
+            if name == "process_name":
+                original = (event.get("args") or {}).get("name", "")
+                event["args"] = dict(name=f"{label} | {original}")
+        if isinstance(event.get("ts", None), (int, float)):
+            event["ts"] = round(event["ts"] + shift, 3)
+        if phase in _FLOW_PHASES and isinstance(event.get("id", None), int):
+            event["id"] += rank * FLOW_ID_STRIDE
+        writer.write(event)
+        num_events += 1
+    return num_events
+
+
+def merge_traces(
+    paths: Sequence[str], destination: str, /, compresslevel: int = 6
+) -> List[Dict[str, Any]]:
+    """
+    Streams the traces of several ranks (gzipped or not) into a single trace
+    (gzipped if ``destination`` ends with .gz), one rank at a time so memory
+    does not depend on their number or size. Each rank gets its own lanes,
+    labelled with its rank, node and local_rank, and its timestamps are
+    shifted into the clock of the lowest rank. Returns the header of every
+    rank, completed with the shift applied (in µs) and the number of events.
+    """
+    headers: List[Dict[str, Any]] = []
+    for index, path in enumerate(paths):
+        header = read_header(path)
+        if header is None:
+            warnings.warn(
+                message=(
+                    f"{path} was not written by idr_torch.profiler, it is "
+                    f"merged as rank {index} without clock alignment."
+                ),
+                category=IdrTorchWarning,
+                stacklevel=2,
+            )
+            header = dict(rank=index)
+        headers.append(dict(header, path=path))
+    headers.sort(key=lambda header: header["rank"])
+    if any(header.get("clock_sync_ns") is None for header in headers):
+        warnings.warn(
+            message=(
+                "Some ranks did not call idr_torch.profiler.clock_sync, their "
+                "clocks are assumed to be synchronized."
+            ),
+            category=IdrTorchWarning,
+            stacklevel=2,
+        )
+
+    reference = headers[0] if headers else {}
+    footer: Dict[str, Any] = dict(displayTimeUnit="ms")
+    if reference.get("base_time_ns") is not None:
+        footer["baseTimeNanoseconds"] = reference["base_time_ns"]
+    with open_trace(destination, "wb", compresslevel=compresslevel) as output:
+        output.write(b'{"schemaVersion":1,"traceEvents":[\n')
+        writer = EventWriter(output)
+        for header in headers:
+            header["shift_us"] = clock_shift(header, reference)
+            header["num_events"] = _merge_rank(
+                header["path"],
+                header["rank"],
+                rank_label(header),
+                header["shift_us"],
+                writer,
+            )
+        writer.flush()
+        output.write(b"\n]," + json.dumps(footer)[1:].encode("utf-8"))
+    return headers
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m idr_torch.profiler.merge",
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("-o", "--output", required=True)
+    parser.add_argument("paths", nargs="+", help="Traces of the ranks to merge.")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    args = parse_args(argv)
+    headers = merge_traces(args.paths, args.output)
+    print(f"{'rank':>6}{'shift (us)':>14}{'events':>12}  path")
+    for header in headers:
+        print(
+            f"{header['rank']:>6}{header['shift_us']:>14.1f}"
+            f"{header['num_events']:>12}  {header['path']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -2,82 +2,152 @@
 # -*- coding: utf-8 -*-
 
 import os
-import sys
-from functools import wraps
-from re import sub
-from typing import Optional
+import time
+import warnings
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, Optional
 
 import torch.profiler
 from packaging.version import Version
 
+from .clock import last_clock_sync
+from .filters import EventFilter
+from .trace import HEADER_KEY, read_base_time, rewrite_trace
+from .writer import BackgroundTraceWriter, staging_dir
 
-class persistent_locals(object):
+
+def trace_file_name(worker_name: str, step: int, /, use_gzip: bool = False) -> str:
     """
-    Allows access to local variables of a function.
-    Shamelessly stolen from
-    https://stackoverflow.com/questions/9186395/python-is-there-a-way-to-get-a-local-function-variable-from-within-a-decorator
+    Follows the <worker>.<span>.pt.trace.json pattern TensorBoard expects,
+    the span being the step at which the trace was ready.
     """
+    return f"{worker_name}.{step}.pt.trace.json" + (".gz" if use_gzip else "")
 
-    def __init__(self, func):
-        self._locals = {}
-        self.func = func
-
-    def __call__(self, *args, **kwargs):
-        def tracer(frame, event, arg):
-            if event == "return":
-                self._locals = frame.f_locals.copy()
-
-        # tracer is activated on next call, return or exception
-        sys.setprofile(tracer)
-        try:
-            # trace the function call
-            res = self.func(*args, **kwargs)
-        finally:
-            # disable tracer and replace with old one
-            sys.setprofile(None)
-        return res
-
-    def clear_locals(self):
-        self._locals = {}
 
-    @property
-    def locals(self):
-        return self._locals
+@lru_cache(maxsize=None)
+def run_id() -> str:
+    """
+    Identifies the run, so that successive runs writing their traces in the
+    same directory do not overwrite each other: the SLURM job step (and its
+    restart), the torchelastic run, or else the time the first trace of this
+    process was written.
+    """
+    if "SLURM_JOB_ID" in os.environ:
+        parts = [f"job{os.environ['SLURM_JOB_ID']}"]
+        parts.append(os.environ.get("SLURM_STEP_ID", "x"))
+        restarts = os.environ.get("SLURM_RESTART_COUNT", "0")
+    else:
+        parts = [os.environ.get("TORCHELASTIC_RUN_ID", "none")]
+        restarts = os.environ.get("TORCHELASTIC_RESTART_COUNT", "0")
+    if parts[0] == "none":
+        # torchrun's default run id is "none", it does not identify anything.
+        parts = [time.strftime("%Y%m%d-%H%M%S")]
+    if restarts != "0":
+        parts.append(f"r{restarts}")
+    # TensorBoard splits the file name on dots.
+    return "-".join(parts).replace(".", "-")
+
+
+def default_worker_name() -> str:
+    import idr_torch
+
+    # Profiling a non distributed run is fine.
+    with warnings.catch_warnings(action="ignore", category=idr_torch.IdrTorchWarning):
+        return f"rank{idr_torch.rank}_{run_id()}"
+
+
+def trace_header(raw_path: str) -> Dict[str, Any]:
+    """
+    Placement and clock information of the current rank, stored first in its
+    traces so they can be merged (see merge.merge_traces).
+    """
+    import idr_torch
+
+    with warnings.catch_warnings(action="ignore", category=idr_torch.IdrTorchWarning):
+        return dict(
+            rank=idr_torch.rank,
+            world_size=idr_torch.world_size,
+            node_rank=idr_torch.node_rank,
+            local_rank=idr_torch.local_rank,
+            hostname=idr_torch.hostname,
+            base_time_ns=read_base_time(raw_path),
+            clock_sync_ns=last_clock_sync(),
+        )
 
 
 if Version(torch.__version__) >= Version("1.12.0"):
 
-    @wraps(torch.profiler.tensorboard_trace_handler)
     def tensorboard_trace_handler(
-        dir_name: str, worker_name: Optional[str] = None, use_gzip: bool = False
-    ):
-        handler_fn = torch.profiler.tensorboard_trace_handler(
-            dir_name=dir_name,
-            worker_name=worker_name,
-            use_gzip=use_gzip,
-        )
-        handler_fn = persistent_locals(handler_fn)
-
-        @wraps(handler_fn)
-        def wrapper(prof):
-            handler_fn(prof)
-            file_name = handler_fn._locals["file_name"]
-            dir_name = handler_fn._locals["dir_name"]
-            handler_fn.clear_locals()
-            with open(os.path.join(dir_name, file_name), "r+") as file:
-                content = file.read()
-                file.seek(0)
-                file.truncate()
-
-                # Restore profiler steps and dataloader
-                new_content = sub("user_annotation", "cpu_op", content)
-
-                # Restore runtime category
-                new_content = sub("cuda_runtime", "runtime", new_content)
-
-                file.write(new_content)
-
-        return wrapper
+        dir_name: str,
+        worker_name: Optional[str] = None,
+        use_gzip: bool = False,
+        background: bool = False,
+        max_pending: int = 2,
+        staging: Optional[str] = None,
+        min_duration_us: Optional[float] = None,
+        categories: Optional[Iterable[str]] = None,
+        sample_steps: int = 1,
+    ) -> Callable[[torch.profiler.profile], None]:
+        """
+        Same as torch.profiler.tensorboard_trace_handler, except that the
+        categories are fixed for TensorBoard and the files are named
+        ``rank<rank>_<run>.<step>.pt.trace.json[.gz]`` unless ``worker_name``
+        is given, ``<run>`` being the job (see run_id). Existing traces are
+        never overwritten: a FileExistsError is raised instead. The placement of the rank and its clock
+        offset (see clock_sync) are stored at the top of each trace, so that
+        they can be merged into a single timeline (see merge_traces).
+        With ``background``, the trace is only exported to ``staging`` (by
+        default a node-local directory, see writer.staging_dir) during
+        on_trace_ready. It is then rewritten, compressed and written to
+        ``dir_name`` by a background thread. At most ``max_pending`` traces
+        can wait, further exports block until one of them is written.
+        ``min_duration_us``, ``categories`` and ``sample_steps`` drop events
+        during the rewrite, see filters.EventFilter.
+        """
+        event_filter = None
+        if min_duration_us is not None or categories is not None or sample_steps > 1:
+            event_filter = EventFilter(min_duration_us, categories, sample_steps)
+        writer = None
+        if background:
+            writer = BackgroundTraceWriter(
+                max_pending, rewrite_kwargs=dict(event_filter=event_filter)
+            )
+
+        def handler_fn(prof: torch.profiler.profile) -> None:
+            nonlocal worker_name
+            os.makedirs(dir_name, exist_ok=True)
+            if not worker_name:
+                worker_name = default_worker_name()
+            file_name = trace_file_name(worker_name, prof.step_num, use_gzip=use_gzip)
+            path = os.path.join(dir_name, file_name)
+            if os.path.exists(path):
+                raise FileExistsError(
+                    f"{path} already exists. Use another dir_name or worker_name "
+                    "to keep the traces of several runs."
+                )
+            # Kineto writes plain JSON, compression happens during the rewrite.
+            raw_dir = dir_name
+            if writer is not None:
+                raw_dir = staging or staging_dir()
+                os.makedirs(raw_dir, exist_ok=True)
+            raw_path = os.path.join(raw_dir, f".{file_name}.{os.getpid()}.raw.json")
+            prof.export_chrome_trace(raw_path)
+            header = {HEADER_KEY: trace_header(raw_path)}
+            if writer is not None:
+                writer.submit(raw_path, path, header=header)
+                return
+            try:
+                rewrite_trace(
+                    raw_path,
+                    destination=path,
+                    header=header,
+                    event_filter=event_filter,
+                )
+            finally:
+                os.remove(raw_path)
+
+        handler_fn.writer = writer
+        return handler_fn
 
 else:
     tensorboard_trace_handler = torch.profiler.tensorboard_trace_handler
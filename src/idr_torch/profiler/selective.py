@@ -0,0 +1,180 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import random
+import warnings
+from typing import TYPE_CHECKING, Any, Iterable, List, Optional, Union
+
+import torch.profiler
+from torch.autograd.profiler_util import EventList
+
+from .clock import clock_sync
+
+if TYPE_CHECKING:
+    from ..topology import Topology
+
+Policy = Union[str, Iterable[int]]
+POLICIES = ("all", "master", "local_rank", "sample")
+
+
+def _topology() -> "Topology":
+    import idr_torch
+
+    # Profiling a non distributed run is fine.
+    with warnings.catch_warnings(action="ignore", category=idr_torch.IdrTorchWarning):
+        return idr_torch.topology
+
+
+def profiled_ranks(
+    policy: Policy = "all",
+    /,
+    topology: Optional["Topology"] = None,
+    local_rank: int = 0,
+    num_samples: int = 1,
+    seed: int = 0,
+) -> List[int]:
+    """
+    Ranks selected by ``policy``:
+
+    - ``"all"``: every rank,
+    - ``"master"``: the rank 0,
+    - ``"local_rank"``: the rank of local rank ``local_rank`` on each node,
+    - ``"sample"``: ``num_samples`` ranks drawn with ``seed``,
+    - explicit ranks.
+
+    Only depends on the topology, so every rank computes the same selection
+    without communicating.
+    """
+    topology = topology or _topology()
+    world_size = topology.world_size
+    if not isinstance(policy, str):
+        ranks = sorted(set(policy))
+        if ranks and not (0 <= ranks[0] and ranks[-1] < world_size):
+            raise ValueError(f"Ranks {ranks} are not all in [0, {world_size}).")
+        return ranks
+    if policy == "all":
+        return list(range(world_size))
+    if policy == "master":
+        return [0]
+    if policy == "local_rank":
+        task_map = topology.task_map
+        return [
+            task_map.rank_of(node, local_rank)
+            for node in range(task_map.num_nodes)
+            if local_rank < task_map.tasks_per_node[node]
+        ]
+    if policy == "sample":
+        return sorted(
+            random.Random(seed).sample(range(world_size), min(num_samples, world_size))
+        )
+    raise ValueError(f"Unknown policy {policy!r}, expected one of {POLICIES}.")
+
+
+def is_profiled(
+    policy: Policy = "all",
+    /,
+    topology: Optional["Topology"] = None,
+    local_rank: int = 0,
+    num_samples: int = 1,
+    seed: int = 0,
+) -> bool:
+    """
+    Whether the current rank is selected by ``policy`` (see profiled_ranks).
+    """
+    topology = topology or _topology()
+    if policy == "all":
+        return True
+    if policy == "master":
+        return topology.rank == 0
+    if policy == "local_rank":
+        return topology.local_rank == local_rank
+    ranks = profiled_ranks(
+        policy,
+        topology=topology,
+        local_rank=local_rank,
+        num_samples=num_samples,
+        seed=seed,
+    )
+    return topology.rank in ranks
+
+
+class NullProfiler(object):
+    """
+    Stands for torch.profiler.profile on the ranks which are not profiled:
+    every method does nothing.
+    """
+
+    __slots__ = ()
+    enabled: bool = False
+    step_num: int = 0
+
+    def __enter__(self) -> "NullProfiler":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        pass
+
+    def start(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+    def step(self) -> None:
+        pass
+
+    def key_averages(self, *args: Any, **kwargs: Any) -> EventList:
+        return EventList()
+
+    def events(self) -> EventList:
+        return EventList()
+
+    def export_chrome_trace(self, path: str) -> None:
+        pass
+
+    def export_stacks(self, path: str, metric: str = "self_cpu_time_total") -> None:
+        pass
+
+    def add_metadata(self, key: str, value: str) -> None:
+        pass
+
+    def add_metadata_json(self, key: str, value: str) -> None:
+        pass
+
+
+def selective_profile(
+    *args: Any,
+    ranks: Policy = "all",
+    local_rank: int = 0,
+    num_samples: int = 1,
+    seed: int = 0,
+    sync_clocks: Optional[bool] = None,
+    **kwargs: Any,
+) -> Union[torch.profiler.profile, NullProfiler]:
+    """
+    torch.profiler.profile(*args, **kwargs) on the ranks selected by
+    ``ranks`` (see profiled_ranks), a NullProfiler on the others:
+
+        with idr_torch.profiler.selective_profile(
+            ranks="local_rank",
+            schedule=torch.profiler.schedule(wait=5, warmup=1, active=3),
+            on_trace_ready=idr_torch.profiler.tensorboard_trace_handler("logs"),
+        ) as prof:
+            for batch in loader:
+                ...
+                prof.step()
+
+    With ``sync_clocks`` (the default unless every rank is profiled), every
+    rank must call this function: they meet in clock_sync, so schedules
+    count steps from the same instant and the traces can be merged.
+    """
+    if sync_clocks is None:
+        sync_clocks = ranks != "all"
+    if sync_clocks:
+        clock_sync()
+    selected = is_profiled(
+        ranks, local_rank=local_rank, num_samples=num_samples, seed=seed
+    )
+    if not selected:
+        return NullProfiler()
+    return torch.profiler.profile(*args, **kwargs)
@@ -0,0 +1,379 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import codecs
+import gzip
+import json
+import os
+import re
+import shutil
+import tempfile
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+if TYPE_CHECKING:
+    from .filters import EventFilter
+
+# Restore profiler steps, dataloader and runtime categories.
+CATEGORY_REPLACEMENTS: Tuple[Tuple[bytes, bytes], ...] = (
+    (b"user_annotation", b"cpu_op"),
+    (b"cuda_runtime", b"runtime"),
+)
+CHUNK_SIZE: int = 16 * 1024 * 1024
+# Chunk size used when parsing traces.
+PARSE_CHUNK_SIZE: int = 1024 * 1024
+# Top-level key under which the handler stores the rank's metadata.
+HEADER_KEY = "idr_torch"
+# Chunks are only cut after a quote: no JSON key or value spans one.
+_DELIMITER = b'"'
+# Events are written by batches of this size.
+_BATCH_SIZE = 4096
+
+
+def open_trace(
+    path: str,
+    mode: str = "rb",
+    /,
+    compressed: Optional[bool] = None,
+    compresslevel: int = 6,
+) -> BinaryIO:
+    """
+    Opens a trace in binary mode, gzipped if ``compressed`` or, by default,
+    if its name ends with .gz.
+    """
+    if compressed is None:
+        compressed = path.endswith(".gz")
+    if compressed:
+        return gzip.open(path, mode, compresslevel=compresslevel)
+    return open(path, mode)
+
+
+def _replace(data: bytes, replacements: Sequence[Tuple[bytes, bytes]]) -> bytes:
+    for old, new in replacements:
+        data = data.replace(old, new)
+    return data
+
+
+def replace_stream(
+    source: BinaryIO,
+    destination: BinaryIO,
+    /,
+    replacements: Sequence[Tuple[bytes, bytes]] = CATEGORY_REPLACEMENTS,
+    chunk_size: int = CHUNK_SIZE,
+    header: Optional[Dict[str, Any]] = None,
+) -> None:
+    """
+    Copies ``source`` into ``destination`` applying ``replacements`` in order,
+    holding at most about two chunks in memory. The entries of ``header`` are
+    inserted first in the top-level JSON object.
+    """
+    for old, new in replacements:
+        if _DELIMITER in old or _DELIMITER in new:
+            raise ValueError(f"Replacements cannot contain {_DELIMITER!r}.")
+    pending = b"".join(
+        json.dumps({key: value}, separators=(",", ":"))[1:-1].encode() + b","
+        for key, value in (header or {}).items()
+    )
+    carry = b""
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            break
+        buffer = carry + chunk
+        if pending:
+            start = buffer.find(b"{") + 1
+            if start:
+                following = buffer[start:].lstrip()
+                if not following:
+                    # Wait for the next token to know if the object is empty.
+                    carry = buffer
+                    continue
+                if following.startswith(b"}"):
+                    pending = pending[:-1]
+                destination.write(_replace(buffer[:start], replacements) + pending)
+                buffer, pending = buffer[start:], b""
+        cut = buffer.rfind(_DELIMITER) + 1
+        carry = buffer[cut:]
+        destination.write(_replace(buffer[:cut], replacements))
+    destination.write(_replace(carry, replacements))
+
+
+class EventWriter(object):
+    """
+    Writes the events of a trace by batches.
+    """
+
+    def __init__(self, output: BinaryIO):
+        self.output = output
+        self.batch: List[str] = []
+        self.empty = True
+
+    def write(self, event: Dict[str, Any]) -> None:
+        self.batch.append(json.dumps(event, separators=(",", ":")))
+        if len(self.batch) >= _BATCH_SIZE:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.batch:
+            prefix = "" if self.empty else ",\n"
+            self.output.write((prefix + ",\n".join(self.batch)).encode("utf-8"))
+            self.batch.clear()
+            self.empty = False
+
+
+def _dump(key: str, value: Any) -> bytes:
+    return json.dumps({key: value}, separators=(",", ":"))[1:-1].encode("utf-8")
+
+
+def transform_events(
+    path: str,
+    output: BinaryIO,
+    /,
+    replacements: Sequence[Tuple[bytes, bytes]] = CATEGORY_REPLACEMENTS,
+    header: Optional[Dict[str, Any]] = None,
+    keep: Optional[Callable[[Dict[str, Any]], bool]] = None,
+) -> Tuple[int, int]:
+    """
+    Event-level counterpart of replace_stream: the trace is parsed
+    incrementally, ``replacements`` are applied to the categories and only
+    the events accepted by ``keep`` are written. Returns the number of kept
+    and read events.
+    """
+    replacements = [(old.decode(), new.decode()) for old, new in replacements]
+    header = header or {}
+    output.write(b"{" + b",".join(_dump(key, value) for key, value in header.items()))
+    separator = b"," if header else b""
+    writer: Optional[EventWriter] = None
+    kept = total = 0
+    for key, value in iter_trace(path):
+        if key == "traceEvents":
+            if writer is None:
+                output.write(separator + b'"traceEvents":[\n')
+                writer = EventWriter(output)
+                separator = b","
+            total += 1
+            if not isinstance(value, dict):
+                continue
+            category = value.get("cat", None)
+            if isinstance(category, str):
+                for old, new in replacements:
+                    category = category.replace(old, new)
+                value["cat"] = category
+            if keep is None or keep(value):
+                writer.write(value)
+                kept += 1
+            continue
+        if writer is not None:
+            writer.flush()
+            output.write(b"\n]")
+            writer = None
+        if key not in header:
+            output.write(separator + _dump(key, value))
+            separator = b","
+    if writer is not None:
+        writer.flush()
+        output.write(b"\n]")
+    output.write(b"}")
+    return kept, total
+
+
+def rewrite_trace(
+    path: str,
+    /,
+    destination: Optional[str] = None,
+    replacements: Sequence[Tuple[bytes, bytes]] = CATEGORY_REPLACEMENTS,
+    chunk_size: int = CHUNK_SIZE,
+    compresslevel: int = 6,
+    header: Optional[Dict[str, Any]] = None,
+    event_filter: Optional["EventFilter"] = None,
+) -> None:
+    """
+    Applies ``replacements`` to the trace at ``path`` and writes the result
+    to ``destination`` (by default, ``path`` itself). Either can be gzipped,
+    depending on its extension. The result is streamed into a temporary file
+    next to ``destination``, which then atomically replaces it. See
+    replace_stream for ``header``. With an ``event_filter``, the trace is
+    parsed instead of copied, in the same single pass (see transform_events).
+    """
+    destination = destination or path
+    directory, name = os.path.split(destination)
+    fd, tmp_path = tempfile.mkstemp(
+        prefix=f".{name}.", suffix=".tmp", dir=directory or "."
+    )
+    os.close(fd)
+    try:
+        with open_trace(
+            tmp_path,
+            "wb",
+            compressed=destination.endswith(".gz"),
+            compresslevel=compresslevel,
+        ) as output:
+            if event_filter is None:
+                with open_trace(path, "rb") as source:
+                    replace_stream(
+                        source,
+                        output,
+                        replacements=replacements,
+                        chunk_size=chunk_size,
+                        header=header,
+                    )
+            else:
+                transform_events(
+                    path,
+                    output,
+                    replacements=replacements,
+                    header=header,
+                    keep=event_filter.predicate(),
+                )
+        shutil.copymode(path, tmp_path)
+        os.replace(tmp_path, destination)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+_base_time_regex = re.compile(rb'"baseTimeNanoseconds"\s*:\s*(\d+)')
+
+
+def read_base_time(path: str, /, tail_size: int = 64 * 1024) -> Optional[int]:
+    """
+    Kineto writes timestamps relative to ``baseTimeNanoseconds``, stored at
+    the end of the trace. Only the tail of a plain JSON trace is read.
+    """
+    with open(path, "rb") as file:
+        file.seek(max(0, os.path.getsize(path) - tail_size))
+        match = _base_time_regex.search(file.read())
+    return None if match is None else int(match.group(1))
+
+
+class _JSONReader(object):
+    """
+    Decodes JSON values one at a time from a binary file, keeping only a
+    window of the text in memory.
+    """
+
+    _decoder = json.JSONDecoder()
+    _separators = re.compile(r"[\s,]*")
+
+    def __init__(self, file: BinaryIO, chunk_size: int):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.text = ""
+        self.position = 0
+        self.eof = False
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+
+    def fill(self) -> bool:
+        if self.eof:
+            return False
+        data = self.file.read(self.chunk_size)
+        self.eof = not data
+        self.text = self.text[self.position :] + self._utf8.decode(data, self.eof)
+        self.position = 0
+        return True
+
+    def peek(self) -> str:
+        """
+        Next significant character, skipping whitespace and commas.
+        """
+        while True:
+            self.position = self._separators.match(self.text, self.position).end()
+            if self.position < len(self.text):
+                return self.text[self.position]
+            if not self.fill():
+                raise ValueError("Unexpected end of the trace.")
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            context = self.text[self.position : self.position + 50]
+            raise ValueError(f"Expected {char!r} at {context!r}.")
+        self.position += 1
+
+    def decode(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.text, self.position)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+            # A number may continue in the next chunk.
+            if end == len(self.text) and self.fill():
+                continue
+            self.position = end
+            return value
+
+    def iter_array(self) -> Iterator[Any]:
+        """
+        Decodes the values of the array at the current position one by one.
+        """
+        self.expect("[")
+        scan = self._decoder.scan_once
+        skip = self._separators.match
+        while True:
+            text, position = self.text, self.position
+            end = len(text)
+            while True:
+                position = skip(text, position).end()
+                if position == end:
+                    break
+                if text[position] == "]":
+                    self.position = position + 1
+                    return
+                try:
+                    value, next_position = scan(text, position)
+                except (StopIteration, json.JSONDecodeError):
+                    # Truncated value, the rest is in the next chunk.
+                    break
+                if next_position == end:
+                    break
+                position = self.position = next_position
+                yield value
+            self.position = position
+            if not self.fill():
+                raise ValueError("Unexpected end of the trace.")
+
+
+def iter_trace(
+    path: str, /, chunk_size: int = PARSE_CHUNK_SIZE
+) -> Iterator[Tuple[str, Any]]:
+    """
+    Incrementally parses a Chrome trace (gzipped or not). Yields (key, value)
+    for every top-level entry, except traceEvents whose events are yielded one
+    at a time as ("traceEvents", event). Memory is bounded by the chunk size
+    and the largest single value, whatever the size of the trace.
+    """
+    with open_trace(path, "rb") as file:
+        reader = _JSONReader(file, chunk_size)
+        reader.expect("{")
+        while reader.peek() != "}":
+            key = reader.decode()
+            reader.expect(":")
+            if key == "traceEvents" and reader.peek() == "[":
+                for event in reader.iter_array():
+                    yield key, event
+            else:
+                yield key, reader.decode()
+
+
+def read_header(path: str) -> Optional[Dict[str, Any]]:
+    """
+    Metadata written first by tensorboard_trace_handler, None if missing.
+    """
+    entries = iter_trace(path)
+    try:
+        key, value = next(entries, (None, None))
+    finally:
+        entries.close()
+    return value if key == HEADER_KEY else None
@@ -0,0 +1,93 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import atexit
+import os
+import queue
+import tempfile
+import threading
+import warnings
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..utils import IdrTorchWarning
+from .trace import rewrite_trace
+
+
+def staging_dir() -> str:
+    """
+    Node-local directory where traces are exported before being processed.
+    Can be changed with IDR_TORCH_PROFILER_STAGING, defaults to $TMPDIR.
+    """
+    return os.environ.get("IDR_TORCH_PROFILER_STAGING", None) or tempfile.gettempdir()
+
+
+class BackgroundTraceWriter(object):
+    """
+    Rewrites exported traces in a background thread, streaming them from the
+    staging directory to their final destination (compressing them if it ends
+    with .gz). At most ``max_pending`` traces wait to be processed: beyond
+    that, ``submit`` blocks so the staging disk usage stays bounded. Pending
+    traces are flushed at exit.
+    """
+
+    def __init__(self, max_pending: int = 2, rewrite_kwargs: Optional[Dict] = None):
+        self.rewrite_kwargs: Dict[str, Any] = rewrite_kwargs or {}
+        self.errors: List[BaseException] = []
+        self._queue: "queue.Queue[Optional[Tuple[str, str, Dict]]]"
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, raw_path: str, destination: str, /, **rewrite_kwargs: Any) -> None:
+        """
+        Processes ``raw_path`` into ``destination`` and removes it.
+        ``rewrite_kwargs`` complete the ones given at construction.
+        """
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="idr_torch_trace_writer", daemon=True
+                )
+                self._thread.start()
+                atexit.register(self.close)
+        self._queue.put((raw_path, destination, rewrite_kwargs))
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                raw_path, destination, rewrite_kwargs = item
+                try:
+                    rewrite_trace(
+                        raw_path,
+                        destination=destination,
+                        **{**self.rewrite_kwargs, **rewrite_kwargs},
+                    )
+                except Exception as error:
+                    self.errors.append(error)
+                    warnings.warn(
+                        message=f"Could not write the trace {destination}: {error}",
+                        category=IdrTorchWarning,
+                    )
+                finally:
+                    if os.path.exists(raw_path):
+                        os.remove(raw_path)
+            finally:
+                self._queue.task_done()
+
+    def flush(self) -> None:
+        """
+        Waits until every submitted trace has been written.
+        """
+        if self._thread is not None:
+            self._queue.join()
+
+    def close(self) -> None:
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+            atexit.unregister(self.close)
@@ -0,0 +1,174 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Local multi-process launcher. Ranks are detected by idr_torch as LocalSpawn.
+
+    python -m idr_torch.run -n 4 train.py --epochs 10
+    python -m idr_torch.run -n 4 -m my_package.train --epochs 10
+"""
+
+import argparse
+import os
+import runpy
+import signal
+import sys
+from typing import Dict, List, Optional, Sequence
+
+# Imported once by the forkserver, then inherited by every forked rank.
+DEFAULT_PRELOAD = ["torch", "torch.distributed"]
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m idr_torch.run",
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("-n", "--nproc", type=int, required=True)
+    parser.add_argument(
+        "-m",
+        dest="module",
+        action="store_true",
+        help="Runs the target as a module, like python -m.",
+    )
+    parser.add_argument("--master-addr", default="127.0.0.1")
+    parser.add_argument(
+        "--master-port", type=int, default=None, help="A free port by default."
+    )
+    parser.add_argument(
+        "--start-method", default="forkserver", choices=["forkserver", "spawn"]
+    )
+    parser.add_argument(
+        "--preload",
+        type=lambda value: [name for name in value.split(",") if name],
+        default=DEFAULT_PRELOAD,
+        help="Comma-separated modules imported once by the forkserver.",
+    )
+    parser.add_argument("target", help="Script (or module with -m) to run.")
+    parser.add_argument("args", nargs=argparse.REMAINDER)
+    return parser.parse_args(argv)
+
+
+def rank_environment(
+    rank: int, nproc: int, master_addr: str, master_port: int, run_id: str
+) -> Dict[str, str]:
+    """
+    Same variables as set_master_addr_port_env_variables, plus the marker
+    LocalSpawnAPI looks for.
+    """
+    return dict(
+        IDR_TORCH_RUN_ID=run_id,
+        MASTER_ADDR=master_addr,
+        MASTER_PORT=str(master_port),
+        RANK=str(rank),
+        LOCAL_RANK=str(rank),
+        WORLD_SIZE=str(nproc),
+        LOCAL_WORLD_SIZE=str(nproc),
+    )
+
+
+def _run_rank(env: Dict[str, str], target: str, args: List[str], module: bool):
+    os.environ.update(env)
+    sys.argv = [target] + args
+    if module:
+        runpy.run_module(target, run_name="__main__", alter_sys=True)
+    else:
+        sys.path.insert(0, os.path.dirname(os.path.abspath(target)))
+        runpy.run_path(target, run_name="__main__")
+
+
+def _exit_code(exitcode: Optional[int]) -> int:
+    if exitcode is None:
+        return 1
+    # Killed by a signal: same convention as the shell.
+    return 128 - exitcode if exitcode < 0 else exitcode
+
+
+def launch(
+    nproc: int,
+    target: str,
+    args: Sequence[str] = (),
+    /,
+    module: bool = False,
+    master_addr: str = "127.0.0.1",
+    master_port: Optional[int] = None,
+    start_method: str = "forkserver",
+    preload: Sequence[str] = DEFAULT_PRELOAD,
+) -> int:
+    """
+    Runs ``target`` in ``nproc`` local ranks and waits for them. If a rank
+    fails, the others are terminated. Returns the exit code of the first rank
+    which failed, 0 otherwise.
+    """
+    import multiprocessing as mp
+    from multiprocessing.connection import wait
+
+    from .api import DefaultAPI
+
+    context = mp.get_context(start_method)
+    if start_method == "forkserver":
+        # Modules which cannot be imported are silently skipped.
+        context.set_forkserver_preload(list(preload))
+    if master_port is None:
+        master_port = DefaultAPI.find_available_port()
+    run_id = f"{os.uname().nodename}-{os.getpid()}"
+
+    processes = []
+    for rank in range(nproc):
+        env = rank_environment(rank, nproc, master_addr, master_port, run_id)
+        process = context.Process(
+            target=_run_rank,
+            args=(env, target, list(args), module),
+            name=f"rank{rank}",
+        )
+        process.start()
+        processes.append(process)
+
+    exit_code = 0
+    try:
+        running = {process.sentinel: process for process in processes}
+        while running:
+            for sentinel in wait(list(running)):
+                process = running.pop(sentinel)
+                process.join()
+                if process.exitcode != 0 and exit_code == 0:
+                    exit_code = _exit_code(process.exitcode)
+                    print(
+                        f"idr_torch.run: {process.name} exited with code "
+                        f"{process.exitcode}, terminating the other ranks.",
+                        file=sys.stderr,
+                    )
+                    for other in running.values():
+                        other.terminate()
+    except KeyboardInterrupt:
+        exit_code = 128 + signal.SIGINT
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+            process.join(timeout=10)
+            if process.is_alive():
+                process.kill()
+                process.join()
+    return exit_code
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    args = parse_args(argv)
+    sys.exit(
+        launch(
+            args.nproc,
+            args.target,
+            args.args,
+            module=args.module,
+            master_addr=args.master_addr,
+            master_port=args.master_port,
+            start_method=args.start_method,
+            preload=args.preload,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
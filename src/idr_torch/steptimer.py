@@ -0,0 +1,297 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import math
+import time
+from array import array
+from statistics import median
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    TypeVar,
+)
+
+if TYPE_CHECKING:
+    import torch.distributed as dist
+
+    from .taskmap import TaskMap
+
+T = TypeVar("T")
+
+METRICS = ("step", "forward", "backward", "data")
+# Statistics computed on each rank and gathered, per metric.
+STATISTICS = ("mean", "median", "max")
+
+
+class _Phase(object):
+    """
+    Times a block into the current row of the timer's ring buffer. Entering
+    and leaving only stores a float in preallocated arrays.
+    """
+
+    __slots__ = ("timer", "index", "start")
+
+    def __init__(self, timer: "StepTimer", index: int):
+        self.timer = timer
+        self.index = index
+        self.start = 0.0
+
+    def __enter__(self) -> "_Phase":
+        if self.timer.synchronize is not None:
+            self.timer.synchronize()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        if self.timer.synchronize is not None:
+            self.timer.synchronize()
+        self.timer.record(self.index, time.perf_counter() - self.start)
+
+    def __call__(self, func: Callable[..., T]) -> Callable[..., T]:
+        from functools import wraps
+
+        @wraps(func)
+        def timed(*args: Any, **kwargs: Any) -> T:
+            with self:
+                return func(*args, **kwargs)
+
+        return timed
+
+
+class _Step(_Phase):
+    __slots__ = ()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        super().__exit__(*exc_info)
+        self.timer.next_step()
+
+
+class StepTimer(object):
+    """
+    Records the duration of each step, and of its forward, backward and data
+    loading phases, in a ring buffer of the last ``capacity`` steps:
+
+        timer = idr_torch.step_timer(every=100)
+        for batch in timer.iterate(loader):
+            with timer.step:
+                with timer.forward:
+                    loss = model(batch)
+                with timer.backward:
+                    loss.backward()
+
+    Phases can also decorate functions (``@timer.forward``). Every ``every``
+    steps, each rank summarizes its last steps and a single all_gather brings
+    the summaries to every rank. The master keeps the rank × metric table in
+    ``last_report`` and reports the ranks whose mean step is longer than
+    ``slow_factor`` times the median. This is a collective: every rank must
+    run the same number of steps. Without an initialized process group, only
+    the local rank is summarized. With a ``group``, only its members take
+    part, its rank 0 is the master and the table is indexed by global rank.
+
+    CUDA kernels run asynchronously: phases measure the time spent by the
+    host, and a kernel is accounted to the phase which waits for it (often
+    the optimizer step or a later ``.item()``). With ``cuda_sync=True``, the
+    device is synchronized at the edges of every phase, which gives device
+    times at the cost of stalling the host once per phase.
+    """
+
+    # One phase per metric.
+    step: _Phase
+    forward: _Phase
+    backward: _Phase
+    data: _Phase
+
+    def __init__(
+        self,
+        capacity: int = 1024,
+        every: int = 100,
+        slow_factor: float = 1.2,
+        metrics: Sequence[str] = METRICS,
+        rank: int = 0,
+        world_size: int = 1,
+        task_map: Optional["TaskMap"] = None,
+        group: Optional["dist.ProcessGroup"] = None,
+        report: Optional[Callable[[Dict[str, Any]], None]] = None,
+        cuda_sync: bool = False,
+    ):
+        if "step" not in metrics:
+            raise ValueError("'step' must be one of the metrics.")
+        for name in metrics:
+            if hasattr(self, name):
+                raise ValueError(f"{name!r} cannot be used as a metric name.")
+        self.capacity = capacity
+        self.every = every
+        self.slow_factor = slow_factor
+        self.metrics = tuple(metrics)
+        self.rank = rank
+        self.world_size = world_size
+        self.task_map = task_map
+        self.group = group
+        self.report = print_report if report is None else report
+        self.is_master = rank == 0
+        if group is not None:
+            import torch.distributed as dist
+
+            self.is_master = dist.get_rank(group) == 0
+        self.synchronize: Optional[Callable[[], None]] = None
+        if cuda_sync:
+            import torch
+
+            if torch.cuda.is_available():
+                self.synchronize = torch.cuda.synchronize
+        self.num_steps = 0
+        self.last_report: Optional[Dict[str, Any]] = None
+        # One array per metric, NaN when a phase was not timed during a step.
+        self.buffers = [array("d", [math.nan]) * capacity for _ in self.metrics]
+        self._row = 0
+        for index, name in enumerate(self.metrics):
+            phase = _Step(self, index) if name == "step" else _Phase(self, index)
+            setattr(self, name, phase)
+        self._data_index = self.metrics.index("data") if "data" in metrics else None
+
+    def record(self, index: int, duration: float) -> None:
+        self.buffers[index][self._row] = duration
+
+    def next_step(self) -> None:
+        self.num_steps += 1
+        self._row = row = self.num_steps % self.capacity
+        for buffer in self.buffers:
+            buffer[row] = math.nan
+        if self.every and self.num_steps % self.every == 0:
+            self.aggregate()
+
+    def iterate(self, iterable: Iterable[T]) -> Iterator[T]:
+        """
+        Yields the items of ``iterable``, timing how long each one was waited
+        for as the data phase of the step it is used in.
+        """
+        if self._data_index is None:
+            yield from iterable
+            return
+        index = self._data_index
+        iterator = iter(iterable)
+        clock = time.perf_counter
+        while True:
+            start = clock()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            self.record(index, clock() - start)
+            yield item
+
+    def summary(self, last: Optional[int] = None) -> List[float]:
+        """
+        STATISTICS of each metric over the ``last`` steps (by default, the
+        steps since the previous aggregation), flattened metric by metric.
+        NaN when a metric was not recorded.
+        """
+        last = min(last or self.every or self.capacity, self.num_steps, self.capacity)
+        rows = [(self._row - i - 1) % self.capacity for i in range(last)]
+        values: List[float] = []
+        for buffer in self.buffers:
+            samples = [buffer[row] for row in rows]
+            samples = [sample for sample in samples if sample == sample]
+            if samples:
+                values += [sum(samples) / len(samples), median(samples), max(samples)]
+            else:
+                values += [math.nan] * len(STATISTICS)
+        return values
+
+    def _global_ranks(self, count: int) -> List[int]:
+        """
+        Global rank of each gathered summary.
+        """
+        if self.group is None:
+            return list(range(count))
+        import torch.distributed as dist
+
+        return [dist.get_global_rank(self.group, rank) for rank in range(count)]
+
+    def _gather(self, values: List[float]) -> List[List[float]]:
+        import torch
+        import torch.distributed as dist
+
+        if not (dist.is_available() and dist.is_initialized()):
+            return [values]
+        device = torch.device("cpu")
+        if dist.get_backend(self.group) == "nccl":
+            device = torch.device("cuda", torch.cuda.current_device())
+        local = torch.tensor(values, dtype=torch.float64, device=device)
+        world_size = dist.get_world_size(self.group)
+        gathered = [torch.empty_like(local) for _ in range(world_size)]
+        dist.all_gather(gathered, local, group=self.group)
+        return torch.stack(gathered).cpu().tolist()
+
+    def aggregate(self) -> Optional[Dict[str, Any]]:
+        """
+        Collective: gathers the summary of every rank. Returns the report on
+        the master, None elsewhere.
+        """
+        summaries = self._gather(self.summary())
+        if not self.is_master:
+            return None
+        table: List[Dict[str, Any]] = []
+        for rank, values in zip(self._global_ranks(len(summaries)), summaries):
+            row: Dict[str, Any] = dict(rank=rank)
+            if self.task_map is not None and self.task_map.hosts is not None:
+                row["host"] = self.task_map.host_of(rank)
+            for i, metric in enumerate(self.metrics):
+                for j, statistic in enumerate(STATISTICS):
+                    value = values[i * len(STATISTICS) + j]
+                    row[f"{metric}_{statistic}"] = None if value != value else value
+            table.append(row)
+        steps = [row["step_mean"] for row in table if row["step_mean"] is not None]
+        middle = median(steps) if steps else None
+        slow_ranks = [
+            row["rank"]
+            for row in table
+            if middle is not None
+            and row["step_mean"] is not None
+            and row["step_mean"] > self.slow_factor * middle
+        ]
+        self.last_report = dict(
+            num_steps=self.num_steps,
+            median_step=middle,
+            slow_ranks=slow_ranks,
+            table=table,
+        )
+        self.report(self.last_report)
+        return self.last_report
+
+
+def print_report(report: Dict[str, Any], /, num_slowest: int = 5) -> None:
+    """
+    Default report: median of each metric over the ranks and slowest ranks.
+    """
+    table = report["table"]
+    line = f"[idr_torch] step {report['num_steps']}:"
+    for key in table[0]:
+        if not key.endswith("_mean"):
+            continue
+        values = [row[key] for row in table if row[key] is not None]
+        if values:
+            line += f" {key[:-5]} {median(values) * 1000:.1f} ms"
+    print(line)
+    slow_ranks = report["slow_ranks"]
+    if slow_ranks:
+        rows = sorted(
+            (row for row in table if row["rank"] in slow_ranks),
+            key=lambda row: -row["step_mean"],
+        )
+        print(
+            f"[idr_torch] {len(slow_ranks)} slow rank(s): "
+            + ", ".join(
+                f"{row['rank']}"
+                + (f"@{row['host']}" if "host" in row else "")
+                + f" ({row['step_mean'] / report['median_step']:.2f}x)"
+                for row in rows[:num_slowest]
+            )
+        )
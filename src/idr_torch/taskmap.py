@@ -0,0 +1,266 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import re
+from array import array
+from functools import lru_cache
+from typing import List, Optional, Sequence, Tuple
+
+from .hostlist import parse_hostlist
+
+_tasks_regex = re.compile(r"^(\d+)(?:\(x(\d+)\))?$")
+
+
+def _typecode(max_value: int) -> str:
+    """
+    Smallest unsigned array typecode able to hold ``max_value``.
+    """
+    for typecode in ("B", "H", "I", "L", "Q"):
+        if max_value < 1 << (8 * array(typecode).itemsize):
+            return typecode
+    raise OverflowError(f"{max_value} does not fit in an array.")
+
+
+def parse_tasks_per_node(tasks_per_node: str) -> array:
+    """
+    Expands SLURM's compressed task count syntax.
+    Example: "4(x3),2" -> array([4, 4, 4, 2])
+    """
+    counts = array("I")
+    for element in tasks_per_node.split(","):
+        match = _tasks_regex.match(element.strip())
+        if match is None:
+            raise ValueError(f"Invalid task count '{element}' in '{tasks_per_node}'.")
+        count, repetitions = match.groups()
+        counts.extend(array("I", [int(count)]) * int(repetitions or 1))
+    return counts
+
+
+def format_tasks_per_node(counts: Sequence[int]) -> str:
+    """
+    Inverse of parse_tasks_per_node.
+    Example: [4, 4, 4, 2] -> "4(x3),2"
+    """
+    elements: List[str] = []
+    previous, repetitions = None, 0
+    for count in list(counts) + [None]:
+        if count == previous:
+            repetitions += 1
+            continue
+        if previous is not None:
+            elements.append(
+                str(previous) if repetitions == 1 else f"{previous}(x{repetitions})"
+            )
+        previous, repetitions = count, 1
+    return ",".join(elements)
+
+
+def parse_distribution(distribution: Optional[str], plane_size: Optional[str]) -> str:
+    """
+    Node-level part of SLURM_DISTRIBUTION, normalized to "block", "cyclic"
+    or "plane=<size>". Example: ("cyclic:block", None) -> "cyclic"
+    """
+    method = (distribution or "block").split(":")[0].split(",")[0].strip()
+    if method in ("", "*", "block"):
+        return "block"
+    if method == "cyclic":
+        return "cyclic"
+    if method.startswith("plane"):
+        size = method.partition("=")[2] or plane_size
+        if not size or not size.isdigit() or int(size) < 1:
+            raise ValueError(f"Invalid plane size for distribution {distribution!r}.")
+        return f"plane={int(size)}"
+    raise ValueError(
+        f"The {distribution!r} distribution is not supported: the placement of "
+        "the ranks cannot be computed."
+    )
+
+
+def _distribute(tasks_per_node: Sequence[int], block_size: int) -> array:
+    """
+    Node of each rank when ranks are dealt to the nodes ``block_size`` at a
+    time, skipping the nodes which are full (SLURM's cyclic and plane).
+    """
+    remaining = list(tasks_per_node)
+    rank_to_node: List[int] = []
+    nodes = [node for node, count in enumerate(remaining) if count]
+    while nodes:
+        if block_size == 1:
+            rank_to_node += nodes
+            for node in nodes:
+                remaining[node] -= 1
+        else:
+            for node in nodes:
+                count = min(block_size, remaining[node])
+                rank_to_node += [node] * count
+                remaining[node] -= count
+        nodes = [node for node in nodes if remaining[node]]
+    return array(_typecode(len(remaining)), rank_to_node)
+
+
+class TaskMap(object):
+    """
+    Placement of the ranks on the nodes. By default, ranks are distributed by
+    blocks (SLURM's default): node ``n`` hosts ranks ``first_rank[n]`` to
+    ``first_rank[n + 1] - 1``. With a cyclic or plane ``distribution``,
+    the ranks of node ``n`` are ``node_ranks[first_rank[n]:first_rank[n + 1]]``.
+    All lookups are O(1) and the tables are stored in arrays of the smallest
+    possible integer type.
+    This object is shared and must be considered read-only.
+    """
+
+    __slots__ = (
+        "tasks_per_node",
+        "first_rank",
+        "rank_to_node",
+        "hosts",
+        "distribution",
+        "node_ranks",
+        "local_ranks",
+    )
+
+    def __init__(
+        self,
+        tasks_per_node: Sequence[int],
+        hosts: Optional[Sequence[str]] = None,
+        distribution: str = "block",
+    ):
+        if hosts is not None and len(hosts) != len(tasks_per_node):
+            raise ValueError(
+                f"{len(tasks_per_node)} task counts were given for {len(hosts)} nodes."
+            )
+        num_nodes = len(tasks_per_node)
+        world_size = sum(tasks_per_node)
+        self.tasks_per_node = array(
+            _typecode(max(tasks_per_node, default=0)), list(tasks_per_node)
+        )
+        self.first_rank = array(_typecode(world_size), [0])
+        for count in self.tasks_per_node:
+            self.first_rank.append(self.first_rank[-1] + count)
+        self.hosts = hosts
+        self.distribution = distribution = parse_distribution(distribution, None)
+        # Only needed when ranks are not laid out by blocks.
+        self.node_ranks: Optional[array] = None
+        self.local_ranks: Optional[array] = None
+        if distribution == "block":
+            self.rank_to_node = array(_typecode(num_nodes))
+            for node, count in enumerate(self.tasks_per_node):
+                typecode = self.rank_to_node.typecode
+                self.rank_to_node.extend(array(typecode, [node]) * count)
+            return
+        block_size = 1 if distribution == "cyclic" else int(distribution[6:])
+        self._index(_distribute(self.tasks_per_node, block_size))
+
+    def _index(self, rank_to_node: array) -> None:
+        """
+        Tables of a placement which is not by blocks.
+        """
+        world_size = len(rank_to_node)
+        self.rank_to_node = rank_to_node
+        self.node_ranks = array(_typecode(world_size), [0]) * world_size
+        self.local_ranks = array(self.tasks_per_node.typecode, [0]) * world_size
+        filled = list(self.first_rank[:-1])
+        node_ranks, local_ranks = self.node_ranks, self.local_ranks
+        first_rank = self.first_rank
+        for rank, node in enumerate(self.rank_to_node):
+            position = filled[node]
+            filled[node] = position + 1
+            node_ranks[position] = rank
+            local_ranks[rank] = position - first_rank[node]
+
+    @classmethod
+    def from_nodes(
+        cls, rank_to_node: Sequence[int], hosts: Optional[Sequence[str]] = None
+    ) -> "TaskMap":
+        """
+        Map of any placement, given the node of every rank (e.g. gathered
+        from the ranks themselves). Its distribution is "arbitrary" unless
+        ranks are laid out by blocks.
+        """
+        num_nodes = len(hosts) if hosts is not None else max(rank_to_node) + 1
+        tasks_per_node = [0] * num_nodes
+        for node in rank_to_node:
+            tasks_per_node[node] += 1
+        task_map = cls(tasks_per_node, hosts)
+        if any(a > b for a, b in zip(rank_to_node, rank_to_node[1:])):
+            task_map.distribution = "arbitrary"
+            task_map._index(array(_typecode(num_nodes), rank_to_node))
+        return task_map
+
+    @classmethod
+    def uniform(
+        cls,
+        num_nodes: int,
+        local_world_size: int,
+        hosts: Optional[Sequence[str]] = None,
+    ) -> "TaskMap":
+        return cls([local_world_size] * num_nodes, hosts=hosts)
+
+    @classmethod
+    def from_slurm(
+        cls, tasks_per_node: str, nodelist: str, distribution: str = "block"
+    ) -> "TaskMap":
+        """
+        Builds the map from SLURM_STEP_TASKS_PER_NODE, SLURM_STEP_NODELIST and
+        the distribution (see parse_distribution). Results are cached.
+        """
+        return _task_map_from_slurm(tasks_per_node, nodelist, distribution)
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.tasks_per_node)
+
+    @property
+    def world_size(self) -> int:
+        return self.first_rank[-1]
+
+    def node_of(self, rank: int) -> int:
+        return self.rank_to_node[rank]
+
+    def local_rank_of(self, rank: int) -> int:
+        if self.local_ranks is not None:
+            return self.local_ranks[rank]
+        return rank - self.first_rank[self.rank_to_node[rank]]
+
+    def locate(self, rank: int) -> Tuple[int, int]:
+        """
+        Returns the (node_rank, local_rank) of a global rank.
+        """
+        return self.rank_to_node[rank], self.local_rank_of(rank)
+
+    def rank_of(self, node: int, local_rank: int) -> int:
+        if not 0 <= local_rank < self.tasks_per_node[node]:
+            raise IndexError(f"Node {node} has no local rank {local_rank}.")
+        if self.node_ranks is not None:
+            return self.node_ranks[self.first_rank[node] + local_rank]
+        return self.first_rank[node] + local_rank
+
+    def ranks_of(self, node: int) -> Sequence[int]:
+        """
+        Ranks hosted by ``node``, in local rank order.
+        """
+        if self.node_ranks is not None:
+            return self.node_ranks[self.first_rank[node] : self.first_rank[node + 1]]
+        return range(self.first_rank[node], self.first_rank[node + 1])
+
+    def host_of(self, rank: int) -> str:
+        if self.hosts is None:
+            raise ValueError("The list of nodes is unknown.")
+        return self.hosts[self.rank_to_node[rank]]
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(num_nodes={self.num_nodes}, "
+            f"world_size={self.world_size}, distribution={self.distribution!r})"
+        )
+
+
+@lru_cache(maxsize=8)
+def _task_map_from_slurm(
+    tasks_per_node: str, nodelist: str, distribution: str
+) -> TaskMap:
+    return TaskMap(
+        parse_tasks_per_node(tasks_per_node),
+        hosts=parse_hostlist(nodelist),
+        distribution=distribution,
+    )
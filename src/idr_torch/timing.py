@@ -0,0 +1,123 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, ContextManager, Dict, Iterator, List, Optional
+
+PHASES = [
+    "launcher_detection",
+    "env_resolution",
+    "store_connection",
+    "backend_init",
+    "first_barrier",
+]
+
+# Filled by the Interface each time the launcher is detected.
+startup_phases: Dict[str, float] = {}
+
+
+def timings_path(path: Optional[str] = None) -> Optional[str]:
+    """
+    Where timings are written, None if they are disabled. Can also be set
+    with IDR_TORCH_INIT_TIMINGS.
+    """
+    return path or os.environ.get("IDR_TORCH_INIT_TIMINGS", None) or None
+
+
+class NullTimer(object):
+    enabled: bool = False
+
+    def phase(self, name: str) -> ContextManager:
+        return nullcontext()
+
+
+class InitTimer(object):
+    """
+    Records the wall time of each phase of init_process_group.
+    """
+
+    enabled: bool = True
+
+    def __init__(self, path: str):
+        self.path = path
+        self.phases: Dict[str, Optional[float]] = {name: None for name in PHASES}
+        self.phases.update(startup_phases)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - start
+
+    def record(self, rank: int, hostname: str) -> Dict[str, Any]:
+        record: Dict[str, Any] = dict(rank=rank, hostname=hostname)
+        record.update(self.phases)
+        record["total"] = sum(value or 0.0 for value in self.phases.values())
+        return record
+
+    def gather_and_report(self, rank: int, world_size: int, hostname: str) -> None:
+        """
+        Collective: rank 0 gathers every record, writes them and prints the
+        aggregated report.
+        """
+        import torch.distributed as dist
+
+        records: List[Optional[Dict[str, Any]]] = [None] * world_size
+        dist.all_gather_object(records, self.record(rank, hostname))
+        if rank == 0:
+            write_records(records, self.path)
+            print(report(records))
+
+
+def write_records(records: List[Dict[str, Any]], path: str) -> None:
+    """
+    Writes the records as CSV if ``path`` ends with .csv, as JSON otherwise.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if path.endswith(".csv"):
+        import csv
+
+        with open(path, "w", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=list(records[0]))
+            writer.writeheader()
+            writer.writerows(records)
+    else:
+        import json
+
+        with open(path, "w") as file:
+            json.dump(records, file, indent=2)
+
+
+def report(records: List[Dict[str, Any]], /, num_slowest: int = 5) -> str:
+    """
+    Min, median and max of every phase over the ranks, with the slowest ranks.
+    """
+    from statistics import median
+
+    lines = [
+        f"{'phase':<20}{'min (s)':>10}{'median (s)':>12}{'max (s)':>10}  slowest ranks"
+    ]
+    for phase in PHASES + ["total"]:
+        values = [
+            (record[phase], record["rank"], record["hostname"])
+            for record in records
+            if record.get(phase) is not None
+        ]
+        if not values:
+            continue
+        values.sort()
+        slowest = ", ".join(
+            f"{rank}@{hostname}" for _, rank, hostname in values[::-1][:num_slowest]
+        )
+        lines.append(
+            f"{phase:<20}{values[0][0]:>10.3f}"
+            f"{median(value for value, _, _ in values):>12.3f}"
+            f"{values[-1][0]:>10.3f}  {slowest}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,256 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import warnings
+from typing import Any, Callable, Dict, List, Optional
+
+from .api.base import API
+
+# Serialized topology inherited by child processes.
+ENV_VARIABLE = "IDR_TORCH_TOPOLOGY"
+# Above this size, the topology is not exported (environments are limited).
+MAX_EXPORT_SIZE = 64 * 1024
+# Variables identifying a rank: a child whose values differ (e.g. an
+# mp.spawn child given its own RANK) resolves its topology again.
+FINGERPRINT_VARIABLES = (
+    "IDR_TORCH_RUN_ID",
+    "TORCHELASTIC_RUN_ID",
+    "TORCHELASTIC_RESTART_COUNT",
+    "SLURM_JOB_ID",
+    "SLURM_STEP_ID",
+    "SLURM_PROCID",
+    "SLURM_RESTART_COUNT",
+    "RANK",
+    "LOCAL_RANK",
+    "WORLD_SIZE",
+)
+
+
+def fingerprint() -> str:
+    return "|".join(os.environ.get(name, "") for name in FINGERPRINT_VARIABLES)
+
+
+class Topology(object):
+    """
+    Immutable snapshot of the values resolved from the launcher API.
+    Fields which could not be resolved are left unset, reading them
+    raises an AttributeError. The port, and fields loaded from a parent
+    process, are only resolved on first access.
+    """
+
+    fields = (
+        "launcher",
+        "rank",
+        "local_rank",
+        "world_size",
+        "local_world_size",
+        "num_nodes",
+        "node_rank",
+        "task_map",
+        "cpus",
+        "gpus",
+        "nodelist",
+        "master_address",
+        "port",
+        "is_master",
+        "hostname",
+    )
+    __slots__ = fields + ("_deferred",)
+
+    # Fields computed by calling the API method of the same name.
+    api_fields = fields[1:]
+    # Fields only resolved when first read: selecting the port may have to
+    # wait for the master, the nodelist and the task map grow with the job.
+    lazy_fields = ("nodelist", "task_map", "port")
+
+    def __init__(
+        self, deferred: Optional[Dict[str, Callable[[], Any]]] = None, /, **values: Any
+    ):
+        object.__setattr__(self, "_deferred", deferred or {})
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called for fields which are not set yet.
+        decode = self._deferred.get(name, None) if name in self.fields else None
+        if decode is None:
+            raise AttributeError(
+                f"{self.__class__.__name__!r} object has no attribute {name!r}"
+            )
+        value = decode()
+        object.__setattr__(self, name, value)
+        return value
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"{self.__class__.__name__} is immutable.")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"{self.__class__.__name__} is immutable.")
+
+    def is_resolved(self, name: str) -> bool:
+        """
+        Whether reading field ``name`` neither calls the API nor waits.
+        """
+        if name in self.lazy_fields and name in self._deferred:
+            try:
+                object.__getattribute__(self, name)
+            except AttributeError:
+                return False
+        return True
+
+    def __repr__(self) -> str:
+        fields = ", ".join(
+            f"{name}={getattr(self, name)!r}"
+            for name in self.fields
+            if self.is_resolved(name) and hasattr(self, name)
+        )
+        return f"{self.__class__.__name__}({fields})"
+
+    @classmethod
+    def from_api(
+        cls, api: API, /, warnings_per_field: Dict[str, List[warnings.WarningMessage]]
+    ) -> "Topology":
+        """
+        Queries every field from the API. Warnings are recorded per field
+        into ``warnings_per_field`` so they can be emitted when the field is
+        first read.
+        """
+        values: Dict[str, Any] = {"launcher": api.name}
+        deferred = {
+            name: _recording(getattr(api, name), name, warnings_per_field)
+            for name in cls.lazy_fields
+        }
+        for name in cls.api_fields:
+            if name in deferred:
+                continue
+            with warnings.catch_warnings(record=True) as warning_list:
+                warnings.simplefilter("always")
+                try:
+                    values[name] = getattr(api, name)()
+                except Exception:
+                    # Left unset: the error is raised again on access.
+                    continue
+            if warning_list:
+                warnings_per_field[name] = warning_list
+        return cls(deferred, **values)
+
+    def dumps(self) -> str:
+        """
+        Compact JSON form: the nodelist and the task map are stored in
+        SLURM's compressed syntax, whatever their size.
+        """
+        from .hostlist import Hostlist, compress_hostlist
+        from .taskmap import format_tasks_per_node
+
+        values: Dict[str, Any] = {"fingerprint": fingerprint()}
+        for name in self.fields:
+            if not self.is_resolved(name):
+                continue
+            try:
+                value = getattr(self, name)
+            except AttributeError:
+                continue
+            if name == "nodelist":
+                value = getattr(value, "compact", None) or compress_hostlist(value)
+            elif name == "task_map":
+                hosts = value.hosts
+                if hosts is not None and not isinstance(hosts, Hostlist):
+                    hosts = compress_hostlist(hosts)
+                value = [
+                    format_tasks_per_node(value.tasks_per_node),
+                    None if hosts is None else str(hosts),
+                    value.distribution,
+                ]
+            values[name] = value
+        return json.dumps(values, separators=(",", ":"))
+
+    @classmethod
+    def loads(cls, text: str) -> "Topology":
+        """
+        Inverse of dumps. The nodelist and the task map are only expanded
+        when first read.
+        """
+        return cls._from_values(json.loads(text))
+
+    @classmethod
+    def _from_values(cls, values: Dict[str, Any]) -> "Topology":
+        values.pop("fingerprint", None)
+        deferred: Dict[str, Callable[[], Any]] = {}
+        if "nodelist" in values:
+            deferred["nodelist"] = _nodelist_decoder(values.pop("nodelist"))
+        if "task_map" in values:
+            deferred["task_map"] = _task_map_decoder(*values.pop("task_map"))
+        return cls(deferred, **values)
+
+    def export(self) -> bool:
+        """
+        Stores the topology in the environment, to be inherited by child
+        processes (DataLoader workers, subprocesses, mp.spawn children...).
+        Returns False if the topology is too large to be exported.
+        """
+        text = self.dumps()
+        if len(text) > MAX_EXPORT_SIZE:
+            return False
+        os.environ[ENV_VARIABLE] = text
+        return True
+
+    @classmethod
+    def inherited(cls) -> Optional["Topology"]:
+        """
+        Topology exported by a parent process of the same rank, if any.
+        """
+        text = os.environ.get(ENV_VARIABLE, None)
+        if not text:
+            return None
+        try:
+            values = json.loads(text)
+            if values.get("fingerprint", None) != fingerprint():
+                return None
+            return cls._from_values(values)
+        except (ValueError, TypeError, AttributeError):
+            return None
+
+
+def _recording(
+    method: Callable[[], Any],
+    name: str,
+    warnings_per_field: Dict[str, List[warnings.WarningMessage]],
+) -> Callable[[], Any]:
+    """
+    Calls ``method`` when a lazy field is first read, recording its warnings
+    like the other fields.
+    """
+
+    def resolve() -> Any:
+        with warnings.catch_warnings(record=True) as warning_list:
+            warnings.simplefilter("always")
+            value = method()
+        if warning_list:
+            warnings_per_field[name] = warning_list
+        return value
+
+    return resolve
+
+
+def _nodelist_decoder(compact: str) -> Callable[[], List[str]]:
+    def decode() -> List[str]:
+        from .hostlist import expand_hostlist
+
+        return expand_hostlist(compact)
+
+    return decode
+
+
+def _task_map_decoder(
+    tasks_per_node: str, hosts: Optional[str], distribution: str = "block"
+) -> Callable:
+    def decode():
+        from .taskmap import TaskMap, parse_tasks_per_node
+
+        if hosts is None:
+            return TaskMap(parse_tasks_per_node(tasks_per_node), None, distribution)
+        return TaskMap.from_slurm(tasks_per_node, hosts, distribution)
+
+    return decode
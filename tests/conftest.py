@@ -0,0 +1,114 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import queue
+import subprocess
+import sys
+import time
+from importlib.util import find_spec
+from typing import Any, Dict, List, Optional
+
+# Directory containing the idr_torch package, given to the child processes.
+SOURCE_DIR = os.path.dirname(find_spec("idr_torch").submodule_search_locations[0])
+# Variables of the launchers, removed so that tests start from a bare shell.
+LAUNCHER_PREFIXES = ("SLURM_", "TORCHELASTIC_", "IDR_TORCH_")
+LAUNCHER_VARIABLES = (
+    "RANK",
+    "LOCAL_RANK",
+    "WORLD_SIZE",
+    "LOCAL_WORLD_SIZE",
+    "MASTER_ADDR",
+    "MASTER_PORT",
+)
+
+
+def clean_environment(**variables: str) -> Dict[str, str]:
+    environment = {
+        name: value
+        for name, value in os.environ.items()
+        if not name.startswith(LAUNCHER_PREFIXES) and name not in LAUNCHER_VARIABLES
+    }
+    path = os.pathsep.join(filter(None, [SOURCE_DIR, os.environ.get("PYTHONPATH")]))
+    environment.update(PYTHONPATH=path, **variables)
+    return environment
+
+
+def run_python(
+    code: str, /, *args: str, env: Optional[Dict[str, str]] = None, timeout: float = 120
+) -> subprocess.CompletedProcess:
+    """
+    Runs ``code`` in a new interpreter, without any launcher variable.
+    """
+    return subprocess.run(
+        [sys.executable, *args, "-c", code],
+        env=clean_environment() if env is None else env,
+        capture_output=True,
+        text=True,
+        timeout=timeout,
+        check=True,
+    )
+
+
+def _run_rank(target, rank, environment, results, args):
+    import traceback
+
+    os.environ.update(environment)
+    try:
+        results.put((rank, True, target(rank, *args)))
+    except BaseException:
+        results.put((rank, False, traceback.format_exc()))
+
+
+def run_ranks(
+    target, world_size: int, /, *args: Any, timeout: float = 120
+) -> List[Any]:
+    """
+    Runs ``target(rank, *args)`` in ``world_size`` new processes, seen by
+    idr_torch as ranks started by ``python -m idr_torch.run``. Returns what
+    each rank returned, in rank order.
+    """
+    import multiprocessing as mp
+
+    from idr_torch.api import DefaultAPI
+    from idr_torch.run import rank_environment
+
+    context = mp.get_context("spawn")
+    results = context.Queue()
+    port = DefaultAPI.find_available_port()
+    run_id = f"tests-{os.getpid()}-{port}"
+    processes = [
+        context.Process(
+            target=_run_rank,
+            args=(
+                target,
+                rank,
+                rank_environment(rank, world_size, "127.0.0.1", port, run_id),
+                results,
+                args,
+            ),
+        )
+        for rank in range(world_size)
+    ]
+    for process in processes:
+        process.start()
+    outputs: Dict[int, Any] = {}
+    try:
+        deadline = time.monotonic() + timeout
+        while len(outputs) < world_size:
+            try:
+                rank, succeeded, output = results.get(
+                    timeout=max(deadline - time.monotonic(), 0)
+                )
+            except queue.Empty:
+                missing = sorted(set(range(world_size)) - set(outputs))
+                raise AssertionError(f"Ranks {missing} did not finish in {timeout}s.")
+            if not succeeded:
+                raise AssertionError(f"Rank {rank} failed:\n{output}")
+            outputs[rank] = output
+    finally:
+        for process in processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.kill()
+    return [outputs[rank] for rank in range(world_size)]
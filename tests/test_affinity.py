@@ -0,0 +1,101 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+
+import pytest
+
+from idr_torch.affinity import (
+    bind,
+    compute_affinity,
+    format_cpulist,
+    parse_cpulist,
+    read_cores,
+    read_numa_nodes,
+)
+
+# 2 NUMA nodes of 8 cores, 2 hyperthreads per core: cpu i and i + 16.
+NUMA_NODES = {0: "0-7,16-23", 1: "8-15,24-31"}
+ALL_CPUS = range(32)
+
+
+@pytest.fixture
+def sysfs(tmp_path) -> str:
+    for node, cpulist in NUMA_NODES.items():
+        directory = tmp_path / "node" / f"node{node}"
+        directory.mkdir(parents=True)
+        (directory / "cpulist").write_text(cpulist + "\n")
+    for cpu in ALL_CPUS:
+        directory = tmp_path / "cpu" / f"cpu{cpu}" / "topology"
+        directory.mkdir(parents=True)
+        core = cpu % 16
+        (directory / "thread_siblings_list").write_text(f"{core},{core + 16}\n")
+    return str(tmp_path)
+
+
+def numa_of(cpu: int) -> int:
+    return (cpu % 16) // 8
+
+
+def test_cpulists():
+    assert parse_cpulist("0-3,8,10-11\n") == [0, 1, 2, 3, 8, 10, 11]
+    assert format_cpulist([11, 0, 1, 2, 3, 8, 10]) == "0-3,8,10-11"
+    assert parse_cpulist("") == []
+
+
+def test_read_sysfs(sysfs):
+    assert read_numa_nodes(sysfs) == {
+        node: parse_cpulist(cpulist) for node, cpulist in NUMA_NODES.items()
+    }
+    assert read_cores([0, 16, 3], sysfs) == [(0, 16), (3,)]
+
+
+@pytest.mark.parametrize("local_world_size", [2, 3, 4, 8])
+def test_ranks_get_disjoint_numa_local_cores(sysfs, local_world_size):
+    affinity = compute_affinity(0, local_world_size, pool=ALL_CPUS, sysfs_root=sysfs)
+    assert len(affinity.cpus) == local_world_size
+    seen = set()
+    for cpus, numa_nodes, num_threads in zip(
+        affinity.cpus, affinity.numa_nodes, affinity.num_threads
+    ):
+        assert cpus and seen.isdisjoint(cpus)
+        seen.update(cpus)
+        # Whole cores, within a single NUMA node.
+        cores = {cpu % 16 for cpu in cpus}
+        assert sorted(cpus) == sorted([*cores, *(core + 16 for core in cores)])
+        assert {numa_of(cpu) for cpu in cpus} == set(numa_nodes)
+        assert len(numa_nodes) == 1
+        assert num_threads == len(cpus) // 2
+    assert seen == set(ALL_CPUS)
+
+
+def test_single_rank_spans_the_numa_nodes(sysfs):
+    affinity = compute_affinity(0, 1, pool=ALL_CPUS, sysfs_root=sysfs)
+    assert affinity.cpus == [list(ALL_CPUS)]
+    assert affinity.numa_nodes == [[0, 1]]
+    assert affinity.num_threads == [16]
+
+
+def test_pool_restricts_the_cpus(sysfs):
+    affinity = compute_affinity(1, 2, pool=[8, 9, 24, 25], sysfs_root=sysfs)
+    assert affinity.cpus == [[8, 24], [9, 25]]
+    assert affinity.numa_nodes == [[1], [1]]
+    assert affinity.local_rank == 1
+
+
+def test_without_sysfs_every_cpu_is_a_core(tmp_path):
+    affinity = compute_affinity(0, 2, pool=range(4), sysfs_root=str(tmp_path))
+    assert affinity.cpus == [[0, 1], [2, 3]]
+    assert affinity.numa_nodes == [[0], [0]]
+    assert affinity.num_threads == [2, 2]
+
+
+def test_bind_pins_the_process(tmp_path, monkeypatch):
+    monkeypatch.setenv("OMP_NUM_THREADS", "")
+    initial = os.sched_getaffinity(0)
+    try:
+        affinity = bind(0, 1, pool=initial, sysfs_root=str(tmp_path))
+        assert os.sched_getaffinity(0) == set(affinity.cpus[0]) == initial
+        assert os.environ["OMP_NUM_THREADS"] == str(len(initial))
+    finally:
+        os.sched_setaffinity(0, initial)
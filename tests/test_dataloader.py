@@ -0,0 +1,42 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+
+import pytest
+
+from idr_torch.dataloader import dataloader_kwargs, rank_cpus
+
+torch = pytest.importorskip("torch")
+
+
+@pytest.fixture
+def eight_cpus(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(os, "sched_getaffinity", lambda pid: set(range(8)))
+
+
+def test_workers_get_their_own_cpus(eight_cpus):
+    kwargs = dataloader_kwargs(4, 1, torch.device("cpu"), use_cache=False)
+    assert kwargs["num_workers"] == 3
+    assert kwargs["prefetch_factor"] == 2
+    assert kwargs["persistent_workers"]
+    assert kwargs["worker_init_fn"].cpus_per_worker == [[5], [6], [7]]
+
+
+@pytest.mark.parametrize("cpus", [1, 3, 4, 5, 7, 8, 9])
+def test_unpinned_ranks_get_disjoint_cpus(eight_cpus, cpus):
+    num_ranks = max(8 // cpus, 1)
+    slices = [rank_cpus(cpus, local_rank) for local_rank in range(num_ranks)]
+    # The 8 % num_ranks first ranks get one of the CPUs left over.
+    assert [len(part) for part in slices] == [
+        8 // num_ranks + (local_rank < 8 % num_ranks) for local_rank in range(num_ranks)
+    ]
+    assert [cpu for part in slices for cpu in part] == list(range(8))
+
+
+def test_no_prefetch_factor_without_workers(eight_cpus):
+    kwargs = dataloader_kwargs(1, 0, torch.device("cpu"), use_cache=False)
+    assert kwargs["num_workers"] == 0
+    assert "prefetch_factor" not in kwargs
+    loader = torch.utils.data.DataLoader(list(range(4)), batch_size=2, **kwargs)
+    assert [batch.tolist() for batch in loader] == [[0, 1], [2, 3]]
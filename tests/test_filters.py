@@ -0,0 +1,69 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+
+pytest.importorskip("torch")
+
+from idr_torch.profiler.filters import EventFilter, StepSampler  # noqa: E402
+
+
+def make_trace(num_steps: int, launches_per_step: int):
+    """
+    Events in Kineto's order: host events sorted by start time, then the
+    kernels and the end of their flows, which run after their step.
+    """
+    host, device = [], []
+    correlation = 0
+    for step in range(num_steps):
+        start = step * 100
+        host.append(
+            {"ph": "X", "name": f"ProfilerStep#{step}", "ts": start, "dur": 100}
+        )
+        for launch in range(launches_per_step):
+            correlation += 1
+            ts = start + 10 + 50 * launch / launches_per_step
+            host.append(
+                {
+                    "ph": "X",
+                    "cat": "cuda_runtime",
+                    "name": "cudaLaunchKernel",
+                    "ts": ts,
+                    "dur": 1,
+                    "args": {"correlation": correlation, "step": step},
+                }
+            )
+            host.append({"ph": "s", "cat": "ac2g", "id": correlation, "ts": ts})
+            # Late kernels, running during the next step.
+            ts += 150
+            device.append(
+                {
+                    "ph": "X",
+                    "cat": "kernel",
+                    "name": "gemm",
+                    "ts": ts,
+                    "dur": 5,
+                    "args": {"correlation": correlation, "step": step},
+                }
+            )
+            device.append({"ph": "f", "cat": "ac2g", "id": correlation, "ts": ts})
+    return host + device
+
+
+def test_kernels_follow_their_launch():
+    keep = EventFilter(sample_steps=3).predicate()
+    kept = [event for event in make_trace(10, 50) if keep(event)]
+    steps = {event["args"]["step"] for event in kept if "args" in event}
+    assert steps == {0, 3, 6, 9}
+    names = [event["name"] for event in kept if event.get("name", "").startswith("P")]
+    assert names == [f"ProfilerStep#{step}" for step in (0, 3, 6, 9)]
+    # Every launch of a kept step keeps its kernel and both ends of its flow.
+    assert len(kept) == 4 * (1 + 4 * 50)
+
+
+def test_memory_grows_with_steps():
+    sampler = StepSampler(2)
+    for event in make_trace(10, 1000):
+        sampler(event)
+    assert len(sampler.starts) == 10
+    assert len(sampler.run_starts) == 10
@@ -0,0 +1,100 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+from conftest import run_ranks
+
+from idr_torch.groups import enumerate_groups
+from idr_torch.taskmap import TaskMap
+
+# 4 ranks placed on 2 nodes as "3,1".
+TASKS_PER_NODE = [3, 1]
+
+
+def test_enumerate_groups():
+    groups = enumerate_groups(TaskMap(TASKS_PER_NODE))
+    assert groups == dict(
+        intra_node=[[0, 1, 2], [3]],
+        inter_node=[[0, 3], [1], [2]],
+        node_leaders=[[0, 3]],
+    )
+
+
+def check_groups(rank: int) -> dict:
+    import torch
+    import torch.distributed as dist
+
+    import idr_torch
+    from idr_torch.groups import make_process_groups
+
+    idr_torch.init_process_group(backend="gloo")
+    task_map = TaskMap(TASKS_PER_NODE)
+    groups = make_process_groups(task_map, rank)
+    sums = {}
+    for name in ("intra_node", "inter_node", "node_leaders"):
+        group = getattr(groups, name)
+        if group is None:
+            sums[name] = None
+            continue
+        tensor = torch.tensor([rank])
+        dist.all_reduce(tensor, group=group)
+        sums[name] = tensor.item()
+    cached = make_process_groups(task_map, rank) is groups
+    dist.destroy_process_group()
+    return dict(
+        sums=sums,
+        cached=cached,
+        ranks=[
+            groups.intra_node_ranks,
+            groups.inter_node_ranks,
+            groups.node_leaders_ranks,
+        ],
+    )
+
+
+def test_process_groups_with_gloo():
+    pytest.importorskip("torch.distributed")
+    results = run_ranks(check_groups, 4)
+    expected_sums = [
+        dict(intra_node=3, inter_node=3, node_leaders=3),
+        dict(intra_node=3, inter_node=1, node_leaders=None),
+        dict(intra_node=3, inter_node=2, node_leaders=None),
+        dict(intra_node=3, inter_node=3, node_leaders=3),
+    ]
+    assert [result["sums"] for result in results] == expected_sums
+    assert all(result["cached"] for result in results)
+    assert results[1]["ranks"] == [[0, 1, 2], [1], [0, 3]]
+
+
+def check_cyclic_groups(rank: int) -> dict:
+    import torch.distributed as dist
+
+    import idr_torch
+    from idr_torch.groups import make_process_groups
+
+    idr_torch.init_process_group(backend="gloo")
+    # --distribution=cyclic on "3,1": the block task map is wrong, the node
+    # reported by each rank is right.
+    node_rank = [0, 1, 0, 0][rank]
+    groups = make_process_groups(TaskMap(TASKS_PER_NODE), rank, node_rank=node_rank)
+    dist.destroy_process_group()
+    return dict(
+        intra_node=groups.intra_node_ranks,
+        inter_node=groups.inter_node_ranks,
+        node_leaders=groups.node_leaders_ranks,
+        leader=groups.node_leaders is not None,
+    )
+
+
+def test_groups_follow_the_reported_nodes():
+    pytest.importorskip("torch.distributed")
+    results = run_ranks(check_cyclic_groups, 4)
+    assert [result["intra_node"] for result in results] == [
+        [0, 2, 3],
+        [1],
+        [0, 2, 3],
+        [0, 2, 3],
+    ]
+    assert [result["inter_node"] for result in results] == [[0, 1], [0, 1], [2], [3]]
+    assert all(result["node_leaders"] == [0, 1] for result in results)
+    assert [result["leader"] for result in results] == [True, True, False, False]
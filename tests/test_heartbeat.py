@@ -0,0 +1,55 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+from conftest import run_ranks
+
+STALLED_RANK = 1
+
+
+def stuck_in_io(seconds: float) -> None:
+    import time
+
+    time.sleep(seconds)
+
+
+def train_with_watchdog(rank: int) -> list:
+    import time
+
+    import torch.distributed as dist
+
+    import idr_torch
+
+    idr_torch.init_process_group(backend="gloo")
+    reports = []
+    watchdog = idr_torch.watchdog(interval=0.2, timeout=1.5, on_stall=reports.append)
+    if rank == STALLED_RANK:
+        watchdog.step()
+        stuck_in_io(4)
+    else:
+        deadline = time.monotonic() + 4
+        while time.monotonic() < deadline:
+            watchdog.step()
+            time.sleep(0.01)
+    dist.barrier()
+    watchdog.close()
+    dist.destroy_process_group()
+    return reports
+
+
+def test_stalled_rank_is_reported():
+    pytest.importorskip("torch.distributed")
+    results = run_ranks(train_with_watchdog, 3)
+    # Only the master reports, once per stall.
+    assert results[1:] == [[], []]
+    assert len(results[0]) == 1
+    report = results[0][0]
+    assert report["num_alive"] == 3
+    assert report["max_progress"] > 1
+    (entry,) = report["stalled"]
+    assert entry["rank"] == STALLED_RANK
+    assert entry["progress"] == 1
+    assert entry["stalled_for"] >= 1.5
+    # Its watchdog thread still beats, and shows where the rank is stuck.
+    assert entry["responsive"]
+    assert "stuck_in_io" in entry["stacks"]
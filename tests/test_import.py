@@ -0,0 +1,95 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+from typing import Dict
+
+from conftest import clean_environment, run_python
+
+# Self time of the idr_torch modules during `import idr_torch`, in ms. The
+# remainder (typing, json...) is shared with any application.
+IMPORT_BUDGET_MS = float(os.environ.get("IDR_TORCH_IMPORT_BUDGET_MS", 50))
+# Only loaded when used.
+DEFERRED_MODULES = (
+    "torch",
+    "numpy",
+    "ipyparallel",
+    "importlib.metadata",
+    "idr_torch.api.slurm",
+    "idr_torch.api.torchelastic",
+    "idr_torch.api.modifiers",
+    "idr_torch.hostlist",
+    "idr_torch.taskmap",
+    "idr_torch.timing",
+    "idr_torch.profiler",
+    "idr_torch.notebook",
+)
+
+
+def import_times() -> Dict[str, int]:
+    """
+    Self time of each module imported by `import idr_torch`, in µs, as
+    reported by -X importtime.
+    """
+    result = run_python("import idr_torch", "-X", "importtime")
+    times: Dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_time, _, name = line[len("import time:") :].split("|")
+        if self_time.strip().isdigit():
+            times[name.strip()] = int(self_time)
+    return times
+
+
+def test_import_does_not_load_deferred_modules():
+    imported = import_times()
+    assert "idr_torch" in imported
+    loaded = [name for name in DEFERRED_MODULES if name in imported]
+    assert not loaded, f"import idr_torch loaded {loaded}"
+
+
+def test_import_time_budget():
+    # Best of a few runs, to ignore a busy machine.
+    best = min(
+        sum(
+            time
+            for name, time in import_times().items()
+            if name.startswith("idr_torch")
+        )
+        for _ in range(3)
+    )
+    assert best / 1000 < IMPORT_BUDGET_MS
+
+
+def test_reading_values_does_not_import_torch():
+    code = (
+        "import sys, idr_torch\n"
+        "idr_torch.rank, idr_torch.world_size, idr_torch.local_rank\n"
+        "print(sorted(name for name in ('torch', 'numpy') if name in sys.modules))\n"
+    )
+    assert run_python(code).stdout.strip() == "[]"
+
+
+def test_reading_the_rank_does_not_expand_the_nodelist(tmp_path):
+    environment = clean_environment(
+        SLURM_STEP_ID="0",
+        SLURM_JOB_ID="1234",
+        SLURM_PROCID="5",
+        SLURM_LOCALID="1",
+        SLURM_NODEID="1",
+        SLURM_STEP_NUM_TASKS="400000",
+        SLURM_STEP_NUM_NODES="100000",
+        SLURM_STEP_TASKS_PER_NODE="4(x100000)",
+        SLURM_STEP_NODELIST="node[000000-099999]",
+        IDR_TORCH_PORT_DIR=str(tmp_path),
+    )
+    code = (
+        "import idr_torch\n"
+        "print(idr_torch.rank, idr_torch.local_world_size)\n"
+        "topology = idr_torch.topology\n"
+        "print([topology.is_resolved(name) for name in topology.lazy_fields])\n"
+        "print(len(idr_torch.nodelist), idr_torch.task_map.host_of(5))\n"
+    )
+    output = run_python(code, env=environment).stdout.splitlines()
+    assert output == ["5 4", "[False, False, False]", "100000 node000001"]
@@ -0,0 +1,54 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+from conftest import run_ranks
+
+# Rank 1 joins the rendezvous this late, so rank 0 has to wait for it.
+LATE_JOIN = 3.0
+WORK = 1.0
+
+
+def init_async(rank: int) -> dict:
+    import time
+
+    import torch
+    import torch.distributed as dist
+
+    import idr_torch
+
+    if rank == 1:
+        time.sleep(LATE_JOIN)
+    start = time.monotonic()
+    future = idr_torch.init_process_group_async(backend="gloo")
+    returned_after = time.monotonic() - start
+    pending_at_return = not future.done()
+    # Work done meanwhile, reading values from the main thread.
+    time.sleep(WORK)
+    world_size = idr_torch.world_size
+    pending_after_work = not future.done()
+    device = future.result(timeout=60)
+    tensor = torch.tensor([rank + 1])
+    dist.all_reduce(tensor)
+    dist.destroy_process_group()
+    return dict(
+        returned_after=returned_after,
+        pending_at_return=pending_at_return,
+        pending_after_work=pending_after_work,
+        world_size=world_size,
+        device=str(device),
+        expected_device=str(idr_torch.device),
+        sum=tensor.item(),
+    )
+
+
+def test_init_overlaps_with_work():
+    pytest.importorskip("torch.distributed")
+    master, late = run_ranks(init_async, 2)
+    # The rendezvous ran in the background during the work of rank 0.
+    assert master["returned_after"] < WORK
+    assert master["pending_at_return"] and master["pending_after_work"]
+    for result in (master, late):
+        assert result["world_size"] == 2
+        assert result["device"] == result["expected_device"]
+        assert result["sum"] == 3
@@ -0,0 +1,134 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import gzip
+import json
+import time
+
+import pytest
+from conftest import run_python
+
+pytest.importorskip("torch")
+
+from idr_torch import IdrTorchWarning  # noqa: E402
+from idr_torch.profiler import clock  # noqa: E402
+from idr_torch.profiler.merge import (  # noqa: E402
+    FLOW_ID_STRIDE,
+    PID_STRIDE,
+    clock_shift,
+    merge_traces,
+)
+
+BASE_TIME_NS = 1_700_000_000_000_000_000
+SYNC_NS = BASE_TIME_NS + 5_000_000_000
+
+
+def rank_trace(rank: int, clock_offset_us: int, base_offset_us: int) -> dict:
+    """
+    Trace of a rank whose clock is ``clock_offset_us`` ahead of rank 0's and
+    whose base time is ``base_offset_us`` after rank 0's (on its own clock).
+    Its "compute" event starts at the same instant as rank 0's, 100 µs after
+    rank 0's base time.
+    """
+    ts = 100 + clock_offset_us - base_offset_us
+    return {
+        "idr_torch": dict(
+            rank=rank,
+            node_rank=rank,
+            local_rank=0,
+            hostname=f"node{rank}",
+            base_time_ns=BASE_TIME_NS + 1000 * base_offset_us,
+            clock_sync_ns=SYNC_NS + 1000 * clock_offset_us,
+        ),
+        "traceEvents": [
+            {"ph": "M", "name": "process_name", "pid": 0, "args": {"name": "CPU"}},
+            {"ph": "M", "name": "process_sort_index", "pid": 0, "args": {}},
+            {"ph": "X", "name": "compute", "pid": 0, "tid": 1, "ts": ts, "dur": 5},
+            {"ph": "s", "id": 7, "pid": 0, "tid": 1, "ts": ts},
+            {"ph": "f", "id": 7, "pid": "GPU 0", "tid": 7, "ts": ts + 2},
+        ],
+    }
+
+
+@pytest.mark.parametrize("module", ["merge", "analyze"])
+def test_command_line_does_not_warn(module):
+    # runpy warns when the module was already imported by its package.
+    code = (
+        "import runpy, sys\n"
+        "sys.argv = ['idr_torch', '--help']\n"
+        f"runpy.run_module('idr_torch.profiler.{module}', run_name='__main__')\n"
+    )
+    result = run_python(code, "-W", "error::RuntimeWarning")
+    assert "usage" in result.stdout
+
+
+def test_merge_aligns_and_separates_the_ranks(tmp_path):
+    traces = {1: rank_trace(1, 3000, 2000), 0: rank_trace(0, 0, 0)}
+    paths = []
+    for rank, trace in traces.items():
+        path = tmp_path / f"rank{rank}.1.pt.trace.json"
+        path.write_text(json.dumps(trace))
+        paths.append(str(path))
+    headers = merge_traces(paths, str(tmp_path / "merged.json.gz"))
+    assert [header["rank"] for header in headers] == [0, 1]
+    assert [header["shift_us"] for header in headers] == [0, 2000 - 3000]
+    assert [header["num_events"] for header in headers] == [4, 4]
+
+    with gzip.open(tmp_path / "merged.json.gz") as file:
+        merged = json.load(file)
+    assert merged["baseTimeNanoseconds"] == BASE_TIME_NS
+    events = merged["traceEvents"]
+    compute = [event for event in events if event.get("name") == "compute"]
+    assert [(event["pid"], event["ts"]) for event in compute] == [
+        (0, 100),
+        (PID_STRIDE, 100),
+    ]
+    flows = [
+        (event["ph"], event["id"], event["pid"]) for event in events if "id" in event
+    ]
+    assert flows == [
+        ("s", 7, 0),
+        ("f", 7, 1),
+        ("s", 7 + FLOW_ID_STRIDE, PID_STRIDE),
+        ("f", 7 + FLOW_ID_STRIDE, PID_STRIDE + 1),
+    ]
+    names = {
+        event["pid"]: event["args"]["name"]
+        for event in events
+        if event.get("name") == "process_name"
+    }
+    assert names[PID_STRIDE] == "rank 1 | node 1 (node1) | local_rank 0 | CPU"
+    assert names[PID_STRIDE + 1] == "rank 1 | node 1 (node1) | local_rank 0 | GPU 0"
+    # One sort index per lane, the ranks' own ones are dropped.
+    sort_indices = [
+        event["args"]["sort_index"]
+        for event in events
+        if event.get("name") == "process_sort_index"
+    ]
+    assert sort_indices == [0, 1, PID_STRIDE, PID_STRIDE + 1]
+
+
+def test_clock_shift_without_clock_sync():
+    reference = dict(base_time_ns=BASE_TIME_NS, clock_sync_ns=SYNC_NS)
+    header = dict(base_time_ns=BASE_TIME_NS + 2_000_000, clock_sync_ns=None)
+    # Wall clocks are trusted.
+    assert clock_shift(header, reference) == 2000
+    header["clock_sync_ns"] = SYNC_NS + 500_000
+    assert clock_shift(header, reference) == 1500
+
+
+def test_traces_without_header_are_merged_unaligned(tmp_path):
+    path = tmp_path / "other.json"
+    path.write_text(json.dumps({"traceEvents": [{"ph": "X", "pid": 3, "ts": 1}]}))
+    with pytest.warns(IdrTorchWarning):
+        headers = merge_traces([str(path)], str(tmp_path / "merged.json"))
+    assert headers[0]["rank"] == 0 and headers[0]["shift_us"] == 0
+
+
+def test_clock_sync_without_process_group(monkeypatch):
+    monkeypatch.setattr(clock, "_clock_sync_ns", None)
+    assert clock.last_clock_sync() is None
+    before = time.time_ns()
+    sync = clock.clock_sync()
+    assert before <= sync <= time.time_ns()
+    assert clock.last_clock_sync() == sync
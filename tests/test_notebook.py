@@ -0,0 +1,192 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import shutil
+import warnings
+from importlib.util import find_spec
+
+import pytest
+from conftest import SOURCE_DIR, clean_environment, run_python
+
+BENCHMARKS_DIR = os.path.join(os.path.dirname(SOURCE_DIR), "benchmarks")
+
+if find_spec("torch") is not None:
+    import torch
+
+    class Tagged(torch.Tensor):
+        """
+        Subclass keeping the default pickling of tensors.
+        """
+
+
+# Launches 2 local engines sharing a gloo process group, then reduces values
+# which are not tensors on the engines.
+PULL_REDUCE = """
+import json, os, sys, tempfile
+
+sys.path.insert(0, {benchmarks!r})
+from IPython.core.interactiveshell import InteractiveShell
+from notebook_startup import LOCAL_SRUN
+
+import idr_torch.notebook as notebook
+
+InteractiveShell.instance()
+directory = tempfile.mkdtemp()
+srun = os.path.join(directory, "srun")
+with open(srun, "w") as file:
+    file.write(LOCAL_SRUN.format(python=sys.executable))
+os.chmod(srun, 0o755)
+os.environ["PATH"] = directory + os.pathsep + os.environ["PATH"]
+os.environ["SLURM_NTASKS"] = "2"
+notebook.launch(120)
+try:
+    notebook._parallel_interface.rc[:].execute(
+        '''
+import os, torch.distributed as dist
+rank = int(os.environ["SLURM_PROCID"])
+dist.init_process_group(
+    "gloo", init_method="tcp://127.0.0.1:{port}", rank=rank, world_size=2
+)
+scalar = rank + 1
+values = [rank, rank]
+mixed = 1.5 if rank else 1
+''',
+        block=True,
+    )
+    pulled = notebook.pull("scalar", "values", reduce="cat")
+    results = dict(
+        scalar=pulled["scalar"].tolist(),
+        values=pulled["values"].tolist(),
+        chunks=[
+            chunk.tolist()
+            for chunk in notebook.pull("values", reduce="cat", chunk_size=1)["values"]
+        ],
+        sum=notebook.pull("values", reduce="sum")["values"].tolist(),
+    )
+    try:
+        notebook.pull("mixed", reduce="sum")
+    except ValueError as error:
+        results["mixed"] = str(error)
+    print(json.dumps(results))
+finally:
+    notebook.cleanup()
+"""
+
+
+def test_pull_reduce_of_python_values():
+    pytest.importorskip("torch.distributed")
+    pytest.importorskip("ipyparallel")
+    if shutil.which("ipcontroller") is None:
+        pytest.skip("ipcontroller is not on the PATH.")
+    from idr_torch.api import DefaultAPI
+
+    code = PULL_REDUCE.format(
+        benchmarks=BENCHMARKS_DIR, port=DefaultAPI.find_available_port()
+    )
+    output = run_python(code, env=clean_environment(), timeout=300).stdout
+    results = json.loads(output.strip().splitlines()[-1])
+    assert results["scalar"] == [1, 2]
+    assert results["values"] == [0, 0, 1, 1]
+    assert results["chunks"] == [[0], [0], [1], [1]]
+    assert results["sum"] == [1, 1]
+    assert "mixed does not have the same dtype on all ranks" in results["mixed"]
+
+
+@pytest.fixture(scope="module")
+def notebook():
+    pytest.importorskip("torch")
+    pytest.importorskip("IPython")
+    with warnings.catch_warnings():
+        # ipyparallel is not needed to share objects.
+        warnings.simplefilter("ignore")
+        import idr_torch.notebook as notebook
+    return notebook
+
+
+def round_trip(notebook, directory, obj):
+    payload, buffers = notebook.dumps_shared(obj)
+    path = os.path.join(directory, "shared")
+    notebook.write_shared(path, payload, buffers)
+    return notebook.load_shared(path), buffers, path
+
+
+def make_tensors():
+    import torch
+
+    return dict(
+        bfloat16=torch.randn(5, 3).to(torch.bfloat16),
+        bool=torch.arange(7) % 3 == 0,
+        transposed=torch.arange(24, dtype=torch.int16).reshape(4, 6).t(),
+        offset=torch.arange(10.0)[3:7],
+        empty=torch.zeros(0, 3),
+        scalar=torch.tensor(3.5, dtype=torch.float64),
+    )
+
+
+def test_tensors_round_trip(notebook, tmp_path):
+    import torch
+
+    tensors = make_tensors()
+    loaded, buffers, _ = round_trip(notebook, tmp_path, tensors)
+    # Every tensor goes out-of-band, even empty ones.
+    assert len(buffers) == len(tensors)
+    for name, tensor in tensors.items():
+        assert type(loaded[name]) is torch.Tensor
+        assert loaded[name].dtype == tensor.dtype
+        assert loaded[name].shape == tensor.shape
+        assert torch.equal(loaded[name], tensor), name
+
+
+def test_buffers_are_aligned(notebook, tmp_path):
+    import numpy as np
+    import torch
+
+    objects = [torch.ones(size, dtype=torch.uint8) for size in (1, 3, 65, 130)]
+    objects.append(np.ones(7, dtype=np.uint8))
+    loaded, _, _ = round_trip(notebook, tmp_path, objects)
+    addresses = [tensor.data_ptr() for tensor in loaded[:-1]]
+    addresses.append(loaded[-1].ctypes.data)
+    assert [address % 64 for address in addresses] == [0] * len(objects)
+
+
+def test_loaded_tensors_are_copied_on_write(notebook, tmp_path):
+    import numpy as np
+    import torch
+
+    shared = dict(tensor=torch.arange(4.0), array=np.arange(4))
+    loaded, _, path = round_trip(notebook, tmp_path, shared)
+    loaded["tensor"].add_(1)
+    loaded["array"] += 1
+    assert loaded["tensor"].tolist() == [1, 2, 3, 4]
+    assert loaded["array"].tolist() == [1, 2, 3, 4]
+    # Neither the file nor other mappings of it see the writes.
+    again = notebook.load_shared(path)
+    assert again["tensor"].tolist() == [0, 1, 2, 3]
+    assert again["array"].tolist() == [0, 1, 2, 3]
+
+
+def test_tensor_subclasses(notebook, tmp_path):
+    import torch
+
+    tagged = torch.arange(6.0).reshape(2, 3).as_subclass(Tagged)
+    tagged.tag = "weights"
+    parameter = torch.nn.Parameter(torch.ones(3, 2).t())
+    shared = dict(tagged=tagged, parameter=parameter)
+    payload, buffers = notebook.dumps_shared(shared)
+    # The data of both goes out-of-band.
+    assert sorted(memoryview(buffer).nbytes for buffer in buffers) == [24, 24]
+    loaded, _, _ = round_trip(notebook, tmp_path, shared)
+    assert type(loaded["tagged"]) is Tagged and loaded["tagged"].tag == "weights"
+    assert torch.equal(loaded["tagged"].as_subclass(torch.Tensor), tagged.detach())
+    assert type(loaded["parameter"]) is torch.nn.Parameter
+    assert loaded["parameter"].requires_grad and loaded["parameter"].is_leaf
+    assert torch.equal(loaded["parameter"].detach(), parameter.detach())
+
+
+def test_requires_grad_is_kept(notebook, tmp_path):
+    import torch
+
+    loaded, _, _ = round_trip(notebook, tmp_path, torch.ones(3, requires_grad=True))
+    assert loaded.requires_grad and loaded.is_leaf
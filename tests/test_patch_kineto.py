@@ -0,0 +1,57 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import re
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from conftest import clean_environment  # noqa: E402
+
+from idr_torch.profiler.patch_kineto import (  # noqa: E402
+    run_id,
+    tensorboard_trace_handler,
+)
+
+
+@pytest.mark.parametrize(
+    "variables, expected",
+    [
+        (dict(SLURM_JOB_ID="123", SLURM_STEP_ID="0"), "job123-0"),
+        (dict(SLURM_JOB_ID="123", SLURM_RESTART_COUNT="2"), "job123-x-r2"),
+        (dict(TORCHELASTIC_RUN_ID="abc.1"), "abc-1"),
+        (dict(TORCHELASTIC_RUN_ID="abc", TORCHELASTIC_RESTART_COUNT="1"), "abc-r1"),
+    ],
+)
+def test_run_id(monkeypatch, variables, expected):
+    monkeypatch.setattr(os, "environ", clean_environment(**variables))
+    assert run_id.__wrapped__() == expected
+
+
+@pytest.mark.parametrize("variables", [{}, dict(TORCHELASTIC_RUN_ID="none")])
+def test_run_id_falls_back_to_the_time(monkeypatch, variables):
+    monkeypatch.setattr(os, "environ", clean_environment(**variables))
+    assert re.fullmatch(r"\d{8}-\d{6}", run_id.__wrapped__())
+
+
+def profile(handler) -> None:
+    with torch.profiler.profile(
+        activities=[torch.profiler.ProfilerActivity.CPU], on_trace_ready=handler
+    ):
+        torch.ones(8).sum()
+
+
+def test_traces_are_not_overwritten(tmp_path, monkeypatch):
+    monkeypatch.setattr(os, "environ", clean_environment(SLURM_JOB_ID="42"))
+    run_id.cache_clear()
+    try:
+        profile(tensorboard_trace_handler(str(tmp_path)))
+        (trace,) = os.listdir(tmp_path)
+        assert re.fullmatch(r"rank0_job42-x\.\d+\.pt\.trace\.json", trace)
+        with pytest.raises(FileExistsError):
+            profile(tensorboard_trace_handler(str(tmp_path)))
+        assert os.listdir(tmp_path) == [trace]
+    finally:
+        run_id.cache_clear()
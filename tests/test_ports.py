@@ -0,0 +1,126 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import socket
+import time
+from contextlib import closing
+
+import pytest
+from conftest import clean_environment, run_python
+
+from idr_torch import ports
+
+KEY = "1234-x-x-0-0"
+
+
+@pytest.fixture
+def port_dir(tmp_path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("IDR_TORCH_PORT_DIR", str(tmp_path))
+    monkeypatch.delenv(ports.ENV_VARIABLE, raising=False)
+    return tmp_path
+
+
+def free_candidates(num_candidates: int = 8):
+    return [
+        port
+        for port in ports.candidate_ports(KEY, num_candidates=64)
+        if ports.is_port_available(port)
+    ][:num_candidates]
+
+
+def test_master_probes_again_over_a_published_port(port_dir):
+    candidates = free_candidates()
+    with closing(socket.socket()) as busy:
+        busy.bind(("", candidates[0]))
+        busy.listen()
+        # Left by a previous run, and now in use.
+        ports.publish_port(KEY, candidates[0])
+        port = ports.select_port(KEY, candidates, is_master=True)
+    assert port == candidates[1]
+    assert ports.read_published_port(KEY) == candidates[1]
+
+
+def test_other_ranks_read_the_published_port(port_dir, monkeypatch):
+    candidates = free_candidates()
+    port = ports.select_port(KEY, candidates, is_master=True)
+    monkeypatch.delenv(ports.ENV_VARIABLE)
+    assert ports.select_port(KEY, candidates[::-1], is_master=False) == port
+
+
+def test_other_ranks_raise_when_nothing_is_published(port_dir, monkeypatch):
+    monkeypatch.setenv("IDR_TORCH_PORT_TIMEOUT", "0.2")
+    with pytest.raises(TimeoutError):
+        ports.select_port(KEY, free_candidates(), is_master=False)
+
+
+def test_children_reuse_the_port_of_their_parent(port_dir):
+    candidates = free_candidates()
+    port = ports.select_port(KEY, candidates, is_master=True)
+    # The port is taken now, a new master would select another one.
+    with closing(socket.socket()) as busy:
+        busy.bind(("", port))
+        busy.listen()
+        assert ports.select_port(KEY, candidates, is_master=True) == port
+
+
+def test_reading_values_does_not_wait_for_the_master(tmp_path):
+    environment = clean_environment(
+        SLURM_STEP_ID="0",
+        SLURM_JOB_ID="1234",
+        SLURM_PROCID="1",
+        SLURM_LOCALID="1",
+        SLURM_NODEID="0",
+        SLURM_STEP_NUM_TASKS="2",
+        SLURM_STEP_NUM_NODES="1",
+        SLURM_STEP_TASKS_PER_NODE="2",
+        SLURM_STEP_NODELIST="node01",
+        IDR_TORCH_PORT_DIR=str(tmp_path),
+        IDR_TORCH_PORT_TIMEOUT="1",
+    )
+    code = (
+        "import os, idr_torch\n"
+        "print(idr_torch.rank, idr_torch.local_world_size, idr_torch.master_addr)\n"
+        "print('MASTER_PORT' in os.environ)\n"
+        "try:\n"
+        "    idr_torch.master_port\n"
+        "except TimeoutError:\n"
+        "    print('timeout')\n"
+    )
+    start = time.monotonic()
+    output = run_python(code, env=environment).stdout.split("\n")
+    assert output[:3] == ["1 2 node01", "False", "timeout"]
+    assert time.monotonic() - start < 30
+
+
+def test_port_is_exported_with_the_other_variables(tmp_path):
+    environment = clean_environment(
+        SLURM_STEP_ID="0",
+        SLURM_JOB_ID="1234",
+        SLURM_NODEID="0",
+        SLURM_STEP_NUM_TASKS="2",
+        SLURM_STEP_NUM_NODES="1",
+        SLURM_STEP_TASKS_PER_NODE="2",
+        SLURM_STEP_NODELIST="node01",
+        IDR_TORCH_PORT_DIR=str(tmp_path),
+        IDR_TORCH_PORT_TIMEOUT="1",
+    )
+    code = (
+        "import os, idr_torch\n"
+        "idr_torch.rank\n"
+        "print(os.environ.get('MASTER_PORT'))\n"
+        "try:\n"
+        "    print(idr_torch.master_port)\n"
+        "except TimeoutError:\n"
+        "    print('timeout')\n"
+    )
+
+    def exported(rank: int):
+        env = dict(environment, SLURM_PROCID=str(rank), SLURM_LOCALID=str(rank))
+        return run_python(code, env=env).stdout.split()
+
+    # Nothing published yet: the other rank does not wait.
+    assert exported(1) == ["None", "timeout"]
+    master_port, port = exported(0)
+    assert master_port == port
+    # Once the master published its port, the other rank exports it as well.
+    assert exported(1) == [port, port]
@@ -0,0 +1,24 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+import idr_torch.profiler  # noqa: E402
+from idr_torch.profiler.selective import is_profiled  # noqa: E402
+from idr_torch.topology import Topology  # noqa: E402
+
+
+def test_torch_profile_is_not_hidden():
+    assert idr_torch.profiler.profile is torch.profiler.profile
+
+
+def test_null_profiler_mimics_profile():
+    assert not is_profiled("master", topology=Topology(rank=1, world_size=2))
+    with idr_torch.profiler.NullProfiler() as prof:
+        prof.step()
+    assert prof.step_num == 0
+    assert len(prof.key_averages()) == 0
+    assert len(prof.events()) == 0
+    assert prof.key_averages().table() == ""
@@ -0,0 +1,63 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from idr_torch.api.slurm import SlurmAPI
+
+# 4 tasks on 2 nodes, laid out as "3,1".
+STEP = {
+    "SLURM_STEP_ID": "0",
+    "SLURM_JOB_ID": "1234",
+    "SLURM_STEP_NUM_TASKS": "4",
+    "SLURM_STEP_NUM_NODES": "2",
+    "SLURM_STEP_TASKS_PER_NODE": "3,1",
+    "SLURM_STEP_NODELIST": "node[07-08]",
+}
+
+
+@pytest.fixture
+def slurm_step(monkeypatch: pytest.MonkeyPatch):
+    def as_task(
+        rank: int, node: int, local_rank: int, distribution: str = "block"
+    ) -> SlurmAPI:
+        for name, value in STEP.items():
+            monkeypatch.setenv(name, value)
+        monkeypatch.setenv("SLURM_DISTRIBUTION", distribution)
+        monkeypatch.setenv("SLURM_PROCID", str(rank))
+        monkeypatch.setenv("SLURM_NODEID", str(node))
+        monkeypatch.setenv("SLURM_LOCALID", str(local_rank))
+        return SlurmAPI()
+
+    return as_task
+
+
+@pytest.mark.parametrize(
+    "rank, node, local_rank, distribution",
+    [
+        # --distribution=block: ranks 0-2 on node07, rank 3 on node08.
+        (2, 0, 2, "block"),
+        (3, 1, 0, "block:cyclic"),
+        # --distribution=cyclic: ranks 0, 2, 3 on node07, rank 1 on node08.
+        (1, 1, 0, "cyclic"),
+        (3, 0, 2, "cyclic:block"),
+    ],
+)
+def test_node_layout_follows_the_distribution(
+    slurm_step, rank, node, local_rank, distribution
+):
+    api = slurm_step(rank, node, local_rank, distribution)
+    assert api.node_rank() == node
+    assert api.local_world_size() == (3, 1)[node]
+    assert api.num_nodes() == 2
+    assert api.nodelist() == ["node07", "node08"]
+    task_map = api.task_map()
+    assert task_map.locate(rank) == (node, local_rank)
+    assert task_map.rank_of(node, local_rank) == rank
+    assert task_map.host_of(rank) == ("node07", "node08")[node]
+
+
+def test_arbitrary_distribution_is_refused(slurm_step):
+    api = slurm_step(0, 0, 0, "arbitrary")
+    with pytest.raises(ValueError, match="not supported"):
+        api.task_map()
@@ -0,0 +1,58 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+from conftest import run_ranks
+
+from idr_torch.taskmap import TaskMap
+
+# 4 ranks placed on 2 nodes as "3,1".
+TASKS_PER_NODE = [3, 1]
+HOSTS = ["node0", "node1"]
+
+
+def time_in_group(rank: int) -> dict:
+    import time
+
+    import torch.distributed as dist
+
+    import idr_torch
+    from idr_torch.steptimer import StepTimer
+
+    idr_torch.init_process_group(backend="gloo")
+    # Every rank creates the group, only its members time their steps.
+    group = dist.new_group([1, 3])
+    report = None
+    if rank in (1, 3):
+        timer = StepTimer(
+            every=2,
+            rank=rank,
+            world_size=4,
+            task_map=TaskMap(TASKS_PER_NODE, HOSTS),
+            group=group,
+            report=lambda report: None,
+        )
+        for _ in range(2):
+            with timer.step:
+                time.sleep(0.05 if rank == 3 else 0.01)
+        report = timer.last_report
+        report = dict(
+            is_master=timer.is_master,
+            slow_ranks=None if report is None else report["slow_ranks"],
+            table=None
+            if report is None
+            else [(row["rank"], row["host"]) for row in report["table"]],
+        )
+    dist.destroy_process_group()
+    return report
+
+
+def test_group_ranks_are_global():
+    pytest.importorskip("torch.distributed")
+    results = run_ranks(time_in_group, 4)
+    assert results[0] is None and results[2] is None
+    # Rank 1 is the rank 0 of the group.
+    assert results[1] == dict(
+        is_master=True, slow_ranks=[3], table=[(1, "node0"), (3, "node1")]
+    )
+    assert results[3] == dict(is_master=False, slow_ranks=None, table=None)
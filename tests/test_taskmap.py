@@ -0,0 +1,55 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from idr_torch.taskmap import TaskMap, parse_distribution
+from idr_torch.topology import Topology
+
+
+def layout(task_map: TaskMap):
+    return [list(task_map.ranks_of(node)) for node in range(task_map.num_nodes)]
+
+
+@pytest.mark.parametrize(
+    "distribution, expected",
+    [
+        ("block", [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]),
+        ("cyclic", [[0, 3, 6, 8], [1, 4, 7, 9], [2, 5]]),
+        ("plane=2", [[0, 1, 6, 7], [2, 3, 8, 9], [4, 5]]),
+        ("plane=3", [[0, 1, 2, 8], [3, 4, 5, 9], [6, 7]]),
+    ],
+)
+def test_distributions(distribution, expected):
+    task_map = TaskMap([4, 4, 2], ["a", "b", "c"], distribution)
+    assert layout(task_map) == expected
+    for node, ranks in enumerate(expected):
+        for local_rank, rank in enumerate(ranks):
+            assert task_map.locate(rank) == (node, local_rank)
+            assert task_map.rank_of(node, local_rank) == rank
+            assert task_map.host_of(rank) == "abc"[node]
+
+
+def test_parse_distribution():
+    assert parse_distribution(None, None) == "block"
+    assert parse_distribution("cyclic:cyclic,Pack", None) == "cyclic"
+    assert parse_distribution("plane", "4") == "plane=4"
+    with pytest.raises(ValueError):
+        parse_distribution("plane", None)
+    with pytest.raises(ValueError):
+        parse_distribution("arbitrary", None)
+
+
+def test_distribution_is_exported():
+    task_map = TaskMap.from_slurm("3,1", "node[07-08]", "cyclic")
+    topology = Topology.loads(Topology(task_map=task_map).dumps())
+    assert topology.task_map.distribution == "cyclic"
+    assert layout(topology.task_map) == [[0, 2, 3], [1]]
+
+
+def test_from_nodes():
+    task_map = TaskMap.from_nodes([1, 0, 1, 1], ["a", "b"])
+    assert task_map.distribution == "arbitrary"
+    assert layout(task_map) == [[1], [0, 2, 3]]
+    assert task_map.locate(3) == (1, 2)
+    assert TaskMap.from_nodes([0, 0, 1]).distribution == "block"
@@ -0,0 +1,86 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import gzip
+import io
+import json
+
+import pytest
+
+pytest.importorskip("torch")
+
+from idr_torch.profiler.trace import (  # noqa: E402
+    iter_trace,
+    read_header,
+    replace_stream,
+    rewrite_trace,
+)
+
+TRACE = {
+    "schemaVersion": 1,
+    "traceEvents": [
+        {"ph": "X", "cat": "user_annotation", "name": "ProfilerStep#0", "ts": 1},
+        {"ph": "X", "cat": "cuda_runtime", "name": "cudaLaunchKernel", "ts": 2.5},
+        {"ph": "X", "cat": "kernel", "name": 'gémm "quoted"', "ts": 3e-05},
+    ],
+    "baseTimeNanoseconds": 1700000000000000000,
+}
+EXPECTED_CATEGORIES = ["cpu_op", "runtime", "kernel"]
+
+
+def rewritten(data: bytes, **kwargs) -> dict:
+    output = io.BytesIO()
+    replace_stream(io.BytesIO(data), output, **kwargs)
+    return json.loads(output.getvalue())
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 16, 1 << 20])
+def test_patterns_split_across_chunks(chunk_size):
+    data = json.dumps(TRACE, indent=1).encode()
+    result = rewritten(data, chunk_size=chunk_size)
+    categories = [event["cat"] for event in result["traceEvents"]]
+    assert categories == EXPECTED_CATEGORIES
+    assert result["traceEvents"][2]["name"] == TRACE["traceEvents"][2]["name"]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 1 << 20])
+@pytest.mark.parametrize("text", [json.dumps(TRACE), "  {}", '{ "a" : 1 }'])
+def test_header_is_injected_first(chunk_size, text):
+    header = {"idr_torch": {"rank": 3}, "extra": [1, 2]}
+    result = rewritten(text.encode(), chunk_size=chunk_size, header=header)
+    assert list(result)[:2] == ["idr_torch", "extra"]
+    assert result["idr_torch"] == {"rank": 3}
+    assert len(result) == 2 + len(json.loads(text))
+
+
+@pytest.mark.parametrize("source_name", ["trace.json", "trace.json.gz"])
+@pytest.mark.parametrize("destination_name", ["out.json", "out.json.gz"])
+def test_gzip_in_and_out(tmp_path, source_name, destination_name):
+    source = tmp_path / source_name
+    data = json.dumps(TRACE).encode()
+    source.write_bytes(gzip.compress(data) if source_name.endswith(".gz") else data)
+    destination = tmp_path / destination_name
+    rewrite_trace(
+        str(source), str(destination), chunk_size=8, header={"idr_torch": {"rank": 1}}
+    )
+    output = destination.read_bytes()
+    assert output.startswith(b"\x1f\x8b") == destination_name.endswith(".gz")
+    assert read_header(str(destination)) == {"rank": 1}
+    events = [
+        event for key, event in iter_trace(str(destination)) if key == "traceEvents"
+    ]
+    assert [event["cat"] for event in events] == EXPECTED_CATEGORIES
+    # No temporary file is left behind.
+    assert sorted(path.name for path in tmp_path.iterdir()) == sorted(
+        {source_name, destination_name}
+    )
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 64])
+def test_incremental_parsing(tmp_path, chunk_size):
+    path = tmp_path / "trace.json.gz"
+    path.write_bytes(gzip.compress(json.dumps(TRACE, indent=2).encode()))
+    entries = list(iter_trace(str(path), chunk_size=chunk_size))
+    assert entries == [("schemaVersion", 1)] + [
+        ("traceEvents", event) for event in TRACE["traceEvents"]
+    ] + [("baseTimeNanoseconds", TRACE["baseTimeNanoseconds"])]
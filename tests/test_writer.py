@@ -0,0 +1,98 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import os
+
+import pytest
+from conftest import run_python
+
+pytest.importorskip("torch")
+
+from idr_torch import IdrTorchWarning  # noqa: E402
+from idr_torch.profiler.trace import iter_trace, read_header  # noqa: E402
+from idr_torch.profiler.writer import BackgroundTraceWriter  # noqa: E402
+
+
+class Recorder(object):
+    """
+    Event filter recording the names of the events of each rewritten trace,
+    in the order the traces are processed.
+    """
+
+    def __init__(self):
+        self.traces = []
+
+    def predicate(self):
+        names = []
+        self.traces.append(names)
+        return lambda event: names.append(event["name"]) or True
+
+
+def write_raw(directory, index: int) -> str:
+    path = os.path.join(directory, f".trace{index}.raw.json")
+    with open(path, "w") as file:
+        json.dump({"traceEvents": [{"ph": "X", "name": f"step{index}", "ts": 0}]}, file)
+    return path
+
+
+def test_traces_are_written_in_order(tmp_path):
+    recorder = Recorder()
+    writer = BackgroundTraceWriter(1, rewrite_kwargs=dict(event_filter=recorder))
+    for index in range(6):
+        writer.submit(
+            write_raw(tmp_path, index),
+            str(tmp_path / f"trace{index}.json.gz"),
+            header={"idr_torch": {"rank": index}},
+        )
+    writer.flush()
+    assert recorder.traces == [[f"step{index}"] for index in range(6)]
+    for index in range(6):
+        path = str(tmp_path / f"trace{index}.json.gz")
+        assert read_header(path) == {"rank": index}
+        events = [event for key, event in iter_trace(path) if key == "traceEvents"]
+        assert [event["name"] for event in events] == [f"step{index}"]
+    # Raw traces are removed once written.
+    assert sorted(os.listdir(tmp_path)) == [f"trace{i}.json.gz" for i in range(6)]
+    writer.close()
+
+
+def test_errors_are_reported_and_do_not_stop_the_writer(tmp_path):
+    writer = BackgroundTraceWriter(rewrite_kwargs=dict(event_filter=Recorder()))
+    broken = tmp_path / ".broken.raw.json"
+    broken.write_text('{"traceEvents": [{"name": ')
+    with pytest.warns(IdrTorchWarning, match="Could not write the trace"):
+        writer.submit(str(tmp_path / ".missing.raw.json"), str(tmp_path / "a.json"))
+        writer.submit(str(broken), str(tmp_path / "b.json"))
+        writer.submit(write_raw(tmp_path, 0), str(tmp_path / "c.json"))
+        writer.flush()
+    assert [type(error) for error in writer.errors[:1]] == [FileNotFoundError]
+    assert len(writer.errors) == 2
+    # Nothing is left of the broken traces, the next one is written.
+    assert os.listdir(tmp_path) == ["c.json"]
+    writer.close()
+
+
+def test_close_flushes_pending_traces(tmp_path):
+    writer = BackgroundTraceWriter()
+    for index in range(3):
+        writer.submit(write_raw(tmp_path, index), str(tmp_path / f"t{index}.json"))
+    writer.close()
+    assert sorted(os.listdir(tmp_path)) == ["t0.json", "t1.json", "t2.json"]
+    assert writer._thread is None
+    # The writer starts again on the next submission.
+    writer.submit(write_raw(tmp_path, 3), str(tmp_path / "t3.json"))
+    writer.close()
+    assert os.path.exists(tmp_path / "t3.json")
+
+
+def test_pending_traces_are_flushed_at_exit(tmp_path):
+    raw_paths = [write_raw(tmp_path, index) for index in range(3)]
+    code = (
+        "from idr_torch.profiler.writer import BackgroundTraceWriter\n"
+        "writer = BackgroundTraceWriter(1)\n"
+        f"for index, raw_path in enumerate({raw_paths!r}):\n"
+        f"    writer.submit(raw_path, f'{tmp_path}/t{{index}}.json.gz')\n"
+    )
+    run_python(code)
+    assert sorted(os.listdir(tmp_path)) == ["t0.json.gz", "t1.json.gz", "t2.json.gz"]